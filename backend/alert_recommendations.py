@@ -1,48 +1,84 @@
 from __future__ import annotations
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import os
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 
 from .models import Alert, CHI, Event, KPI
-from sqlalchemy import select, desc
+from .llm_client import post_chat_completion, apost_chat_completion
+from .llm_cache import cached_completion, acached_completion
+from sqlalchemy import select, desc, func
 
 # Load environment variables from .env file
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(env_path)
 
 
-def generate_ai_recommendations_for_alert(db: Session, alert: Alert) -> List[str]:
+def _completion_text(data: dict) -> Optional[str]:
     """
-    Generate AI-powered recommendations for a specific alert using Groq API.
-    Analyzes the alert context, recent events, CHI data, and KPIs to provide
-    data-driven recommendations.
+    Extract the message content from Groq's chat-completions response.
     """
+    if isinstance(data, dict) and "choices" in data:
+        choices = data["choices"]
+        if choices and isinstance(choices, list) and len(choices) > 0:
+            choice = choices[0]
+            if "message" in choice:
+                return choice["message"].get("content")
+    return None
+
+
+ALERT_AI_CONCURRENCY = int(os.getenv("ALERT_AI_CONCURRENCY", "8"))
+ALERT_AI_DEADLINE_S = float(os.getenv("ALERT_AI_DEADLINE_S", "12"))
+
+RECOMMENDATIONS_SYSTEM_PROMPT = (
+    "You are a network operations expert for T-Mobile. Analyze alert data and provide "
+    "3-5 specific, actionable recommendations. Focus on data-driven insights and prioritize "
+    "actions that will have the most impact. Return only a JSON object with a 'recommendations' "
+    "array containing short recommendation strings (each 1-2 sentences)."
+)
+
+
+def _groq_settings() -> Tuple[Optional[str], str]:
     groq_key = os.environ.get("GROQ_API_KEY")
     groq_model = os.environ.get("GROQ_MODEL", "llama-3.1-70b-versatile")
-    
     # Validate API key
     if not groq_key or groq_key == "your-groq-api-key-here" or groq_key.strip() == "":
-        return []  # Return empty if no API key
-    
-    # Collect context for the alert
+        groq_key = None
+    return groq_key, groq_model
+
+
+def _chi_change_text(alert: Alert) -> str:
+    # KPI-only rules store alerts without CHI values
+    before, after = alert.chi_before, alert.chi_after
+    if before is not None and after is not None:
+        return f"CHI dropped from {before:.1f} to {after:.1f} (drop of {before - after:.1f} points)"
+    if after is not None:
+        return f"CHI at alert time: {after:.1f}"
+    if before is not None:
+        return f"CHI before alert: {before:.1f}"
+    return "CHI values not recorded for this alert"
+
+
+def _alert_context_text(alert: Alert, latest_chi: Optional[CHI], recent_events: List[Event], recent_kpis: List[KPI]) -> str:
+    """
+    Prompt context for one alert from its latest CHI row, recent events (newest first)
+    and the two latest KPI rows.
+    """
     context_parts = []
     
     # Alert details
     context_parts.append(f"Alert Region: {alert.region}")
-    context_parts.append(f"CHI dropped from {alert.chi_before:.1f} to {alert.chi_after:.1f}")
+    context_parts.append(_chi_change_text(alert))
     context_parts.append(f"Reason: {alert.reason}")
     
-    # Get recent CHI data for the region
-    latest_chi = db.scalars(
-        select(CHI).where(CHI.region == alert.region).order_by(desc(CHI.ts)).limit(1)
-    ).first()
-    
     if latest_chi and latest_chi.drivers_json:
         drivers = latest_chi.drivers_json
         context_parts.append(f"Sentiment: {drivers.get('sentiment', 0):.2f}")
@@ -50,17 +86,6 @@ def generate_ai_recommendations_for_alert(db: Session, alert: Alert) -> List[str
         if drivers.get('top_keywords'):
             context_parts.append(f"Top keywords: {', '.join(drivers.get('top_keywords', [])[:5])}")
     
-    # Get recent events for the region (last 2 hours)
-    recent_events = list(
-        db.scalars(
-            select(Event)
-            .where(Event.region == alert.region)
-            .where(Event.ts >= alert.ts - timedelta(hours=2))
-            .order_by(desc(Event.ts))
-            .limit(20)
-        )
-    )
-    
     if recent_events:
         negative_events = [e for e in recent_events if (e.sentiment or 0) < -0.2]
         if negative_events:
@@ -68,16 +93,6 @@ def generate_ai_recommendations_for_alert(db: Session, alert: Alert) -> List[str
             sample_texts = [e.text[:100] for e in negative_events[:3]]
             context_parts.append(f"Sample issues: {', '.join(sample_texts)}")
     
-    # Get recent KPI data
-    recent_kpis = list(
-        db.scalars(
-            select(KPI)
-            .where(KPI.region == alert.region)
-            .order_by(desc(KPI.ts))
-            .limit(2)
-        )
-    )
-    
     if len(recent_kpis) >= 2:
         latest_kpi, prev_kpi = recent_kpis[0], recent_kpis[1]
         if prev_kpi.download_mbps > 0:
@@ -87,85 +102,264 @@ def generate_ai_recommendations_for_alert(db: Session, alert: Alert) -> List[str
             latency_change = ((latest_kpi.latency_ms - prev_kpi.latency_ms) / prev_kpi.latency_ms) * 100
             context_parts.append(f"Latency change: {latency_change:.1f}%")
     
-    # Build the prompt
-    context_text = "\n".join(context_parts)
-    
-    system_prompt = (
-        "You are a network operations expert for T-Mobile. Analyze alert data and provide "
-        "3-5 specific, actionable recommendations. Focus on data-driven insights and prioritize "
-        "actions that will have the most impact. Return only a JSON object with a 'recommendations' "
-        "array containing short recommendation strings (each 1-2 sentences)."
-    )
-    
+    return "\n".join(context_parts)
+
+
+def _recommendations_request(context_text: str, groq_model: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build (user_prompt, request body) for the recommendations call.
+    """
     user_prompt = (
         f"Alert Context:\n{context_text}\n\n"
         f"Based on this alert data, provide specific recommendations to address the issue. "
         f"Consider the CHI drop, sentiment trends, recent events, and KPI changes. "
         f"Provide actionable steps that operations teams can take immediately."
     )
+    body = {
+        "model": groq_model,
+        "messages": [
+            {"role": "system", "content": RECOMMENDATIONS_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 400,
+        "response_format": {"type": "json_object"}
+    }
+    return user_prompt, body
+
+
+def _parse_recommendations(text_out: Optional[str]) -> List[str]:
+    # Parse JSON from the model's response
+    if text_out:
+        try:
+            # Try to extract JSON from markdown code blocks if present
+            text_clean = text_out.strip()
+            if "```json" in text_clean:
+                start = text_clean.find("```json") + 7
+                end = text_clean.find("```", start)
+                if end > start:
+                    text_clean = text_clean[start:end].strip()
+            elif "```" in text_clean:
+                start = text_clean.find("```") + 3
+                end = text_clean.find("```", start)
+                if end > start:
+                    text_clean = text_clean[start:end].strip()
+            
+            parsed = json.loads(text_clean)
+            if isinstance(parsed, dict):
+                recommendations = parsed.get("recommendations", [])
+                if isinstance(recommendations, list):
+                    return recommendations
+        except json.JSONDecodeError:
+            pass
+    return []
+
+
+def generate_ai_recommendations_for_alert(db: Session, alert: Alert) -> List[str]:
+    """
+    Generate AI-powered recommendations for a specific alert using Groq API.
+    Analyzes the alert context, recent events, CHI data, and KPIs to provide
+    data-driven recommendations.
+    """
+    groq_key, groq_model = _groq_settings()
+    if not groq_key:
+        return []  # Return empty if no API key
+    
+    # Get recent CHI data for the region
+    latest_chi = db.scalars(
+        select(CHI).where(CHI.region == alert.region).order_by(desc(CHI.ts)).limit(1)
+    ).first()
+    
+    # Get recent events for the region (last 2 hours)
+    recent_events = list(
+        db.scalars(
+            select(Event)
+            .where(Event.region == alert.region)
+            .where(Event.ts >= alert.ts - timedelta(hours=2))
+            .order_by(desc(Event.ts))
+            .limit(20)
+        )
+    )
+    
+    # Get recent KPI data
+    recent_kpis = list(
+        db.scalars(
+            select(KPI)
+            .where(KPI.region == alert.region)
+            .order_by(desc(KPI.ts))
+            .limit(2)
+        )
+    )
+    
+    context_text = _alert_context_text(alert, latest_chi, recent_events, recent_kpis)
+    user_prompt, body = _recommendations_request(context_text, groq_model)
     
     try:
-        groq_url = "https://api.groq.com/openai/v1/chat/completions"
-        
-        headers = {
-            "Authorization": f"Bearer {groq_key}",
-            "Content-Type": "application/json"
-        }
-        
-        body = {
-            "model": groq_model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 400,
-            "response_format": {"type": "json_object"}
-        }
-        
-        resp = requests.post(groq_url, headers=headers, json=body, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        # Extract content from Groq's response
-        text_out = None
-        if isinstance(data, dict) and "choices" in data:
-            choices = data["choices"]
-            if choices and isinstance(choices, list) and len(choices) > 0:
-                choice = choices[0]
-                if "message" in choice:
-                    text_out = choice["message"].get("content")
-        
-        # Parse JSON from the model's response
-        if text_out:
-            try:
-                # Try to extract JSON from markdown code blocks if present
-                text_clean = text_out.strip()
-                if "```json" in text_clean:
-                    start = text_clean.find("```json") + 7
-                    end = text_clean.find("```", start)
-                    if end > start:
-                        text_clean = text_clean[start:end].strip()
-                elif "```" in text_clean:
-                    start = text_clean.find("```") + 3
-                    end = text_clean.find("```", start)
-                    if end > start:
-                        text_clean = text_clean[start:end].strip()
-                
-                parsed = json.loads(text_clean)
-                if isinstance(parsed, dict):
-                    recommendations = parsed.get("recommendations", [])
-                    if isinstance(recommendations, list):
-                        return recommendations
-            except json.JSONDecodeError:
-                pass
-        
-        return []
+        def call() -> Optional[str]:
+            # Pooled keep-alive connection shared with the other LLM callers
+            return _completion_text(post_chat_completion(body, api_key=groq_key, timeout=15))
+
+        # Same alert context within the cache TTL reuses the stored response
+        text_out = cached_completion(groq_model, RECOMMENDATIONS_SYSTEM_PROMPT, user_prompt, call)
+        return _parse_recommendations(text_out)
     except Exception as e:
         print(f"[Alert AI] Error generating recommendations: {str(e)}")
         return []
 
 
+def _latest_per_region(db: Session, model: Any, regions: List[str], n: int) -> Dict[str, List[Any]]:
+    """
+    Latest `n` rows of `model` for each region in one query (ROW_NUMBER window).
+    """
+    if not regions:
+        return {}
+    rn = func.row_number().over(partition_by=model.region, order_by=desc(model.ts)).label("rn")
+    ranked = select(model.id, rn).where(model.region.in_(regions)).subquery()
+    rows = db.scalars(
+        select(model)
+        .join(ranked, model.id == ranked.c.id)
+        .where(ranked.c.rn <= n)
+        .order_by(model.region, desc(model.ts))
+    )
+    out: Dict[str, List[Any]] = {}
+    for row in rows:
+        out.setdefault(row.region, []).append(row)
+    return out
+
+
+def gather_alert_contexts(db: Session, alerts: List[Alert]) -> Dict[int, str]:
+    """
+    Prompt context for many alerts with three batched queries instead of three per alert.
+    """
+    if not alerts:
+        return {}
+    regions = sorted({a.region for a in alerts})
+    chi_by_region = _latest_per_region(db, CHI, regions, 1)
+    kpis_by_region = _latest_per_region(db, KPI, regions, 2)
+    # One scan of events covering every alert's 2-hour window
+    since = min(a.ts for a in alerts) - timedelta(hours=2)
+    events_by_region: Dict[str, List[Event]] = {}
+    for e in db.scalars(
+        select(Event)
+        .where(Event.region.in_(regions))
+        .where(Event.ts >= since)
+        .order_by(desc(Event.ts))
+    ):
+        events_by_region.setdefault(e.region, []).append(e)
+
+    contexts: Dict[int, str] = {}
+    for a in alerts:
+        window_start = a.ts - timedelta(hours=2)
+        recent_events = [e for e in events_by_region.get(a.region, []) if e.ts >= window_start][:20]
+        chi_rows = chi_by_region.get(a.region) or [None]
+        try:
+            contexts[a.id] = _alert_context_text(a, chi_rows[0], recent_events, kpis_by_region.get(a.region, []))
+        except Exception as e:
+            # One malformed alert must not abort the batch; fall back to the bare alert
+            print(f"[Alert AI] Context for alert {a.id} failed: {e}")
+            contexts[a.id] = f"Alert Region: {a.region}\nReason: {a.reason}"
+    return contexts
+
+
+async def _recommend_async(context_text: str, groq_key: str, groq_model: str,
+                           slots: asyncio.Semaphore) -> List[str]:
+    user_prompt, body = _recommendations_request(context_text, groq_model)
+
+    async def call() -> Optional[str]:
+        async with slots:
+            return _completion_text(await apost_chat_completion(body, api_key=groq_key, timeout=15))
+
+    text_out = await acached_completion(groq_model, RECOMMENDATIONS_SYSTEM_PROMPT, user_prompt, call)
+    return _parse_recommendations(text_out)
+
+
+def _log_late_failure(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[Alert AI] Background recommendation failed: {task.exception()}")
+
+
+async def agenerate_ai_recommendations_for_alerts(
+    contexts: Dict[int, str],
+    deadline_s: float = ALERT_AI_DEADLINE_S,
+    concurrency: int = ALERT_AI_CONCURRENCY,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Run the LLM calls for prepared alert contexts concurrently (at most `concurrency`
+    in flight). Every alert id gets {"status", "recommendations"}; calls still running
+    at the deadline are reported as "pending" and keep running, so their results land
+    in the LLM cache for the next request.
+    """
+    groq_key, groq_model = _groq_settings()
+    if not groq_key:
+        return {aid: {"status": "unavailable", "recommendations": []} for aid in contexts}
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks = {
+        asyncio.ensure_future(_recommend_async(ctx, groq_key, groq_model, slots)): aid
+        for aid, ctx in contexts.items()
+    }
+    results: Dict[int, Dict[str, Any]] = {}
+    if not tasks:
+        return results
+    done, pending = await asyncio.wait(tasks.keys(), timeout=max(0.0, deadline_s))
+    for task in pending:
+        task.add_done_callback(_log_late_failure)
+        results[tasks[task]] = {"status": "pending", "recommendations": []}
+    for task in done:
+        aid = tasks[task]
+        err = task.exception()
+        if err is not None:
+            print(f"[Alert AI] Error generating recommendations for alert {aid}: {err}")
+            results[aid] = {"status": "error", "recommendations": [], "error": str(err)[:200]}
+        else:
+            recs = task.result()
+            results[aid] = {"status": "ok" if recs else "empty", "recommendations": recs}
+    return results
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop for LLM fan-out: keeps the pooled async HTTP client warm
+    across requests and lets calls outlive the request deadline.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="alert-ai-loop", daemon=True).start()
+        return _loop
+
+
+def generate_ai_recommendations_for_alerts(
+    db: Session,
+    alerts: List[Alert],
+    deadline_s: Optional[float] = None,
+    concurrency: int = ALERT_AI_CONCURRENCY,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Fan-out version of generate_ai_recommendations_for_alert for a list of alerts:
+    batched context queries, concurrent LLM calls, partial results at the deadline.
+    """
+    t0 = time.perf_counter()
+    contexts = gather_alert_contexts(db, alerts)
+    budget = ALERT_AI_DEADLINE_S if deadline_s is None else deadline_s
+    # The context queries count against the deadline too
+    remaining = max(0.0, budget - (time.perf_counter() - t0))
+    future = asyncio.run_coroutine_threadsafe(
+        agenerate_ai_recommendations_for_alerts(contexts, remaining, concurrency), _background_loop()
+    )
+    results = future.result()
+    statuses = [r["status"] for r in results.values()]
+    print(
+        f"[Alert AI] {len(alerts)} alerts in {time.perf_counter() - t0:.2f}s: "
+        + ", ".join(f"{s}={statuses.count(s)}" for s in sorted(set(statuses)))
+    )
+    return results
+
+
 def generate_detailed_analysis_for_alert(db: Session, alert: Alert) -> dict:
     """
     Generate a comprehensive AI-powered analysis and tailored recommendations for a specific alert.
@@ -187,11 +381,10 @@ def generate_detailed_analysis_for_alert(db: Session, alert: Alert) -> dict:
     context_parts = []
     
     # Alert details
-    chi_drop = (alert.chi_before - alert.chi_after) if alert.chi_before else 0
     context_parts.append(f"=== ALERT DETAILS ===")
     context_parts.append(f"Region: {alert.region}")
     context_parts.append(f"Timestamp: {alert.ts.isoformat()}")
-    context_parts.append(f"CHI dropped from {alert.chi_before:.1f} to {alert.chi_after:.1f} (drop of {chi_drop:.1f} points)")
+    context_parts.append(_chi_change_text(alert))
     context_parts.append(f"Alert Reason: {alert.reason}")
     
     # Get recent CHI data for the region
@@ -297,13 +490,6 @@ def generate_detailed_analysis_for_alert(db: Session, alert: Alert) -> dict:
     )
     
     try:
-        groq_url = "https://api.groq.com/openai/v1/chat/completions"
-        
-        headers = {
-            "Authorization": f"Bearer {groq_key}",
-            "Content-Type": "application/json"
-        }
-        
         body = {
             "model": groq_model,
             "messages": [
@@ -315,18 +501,10 @@ def generate_detailed_analysis_for_alert(db: Session, alert: Alert) -> dict:
             "response_format": {"type": "json_object"}
         }
         
-        resp = requests.post(groq_url, headers=headers, json=body, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        # Extract content from Groq's response
-        text_out = None
-        if isinstance(data, dict) and "choices" in data:
-            choices = data["choices"]
-            if choices and isinstance(choices, list) and len(choices) > 0:
-                choice = choices[0]
-                if "message" in choice:
-                    text_out = choice["message"].get("content")
+        def call() -> Optional[str]:
+            return _completion_text(post_chat_completion(body, api_key=groq_key, timeout=20))
+
+        text_out = cached_completion(groq_model, system_prompt, user_prompt, call)
         
         # Parse JSON from the model's response
         if text_out:
@@ -370,3 +548,150 @@ def generate_detailed_analysis_for_alert(db: Session, alert: Alert) -> dict:
             "impact_assessment": ""
         }
 
+
+
+_store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-ai-store")
+ALERT_AI_BACKGROUND_DEADLINE_S = float(os.getenv("ALERT_AI_BACKGROUND_DEADLINE_S", "180"))
+# A run still "pending" after this long is presumed lost (worker died, process restarted)
+ALERT_AI_PENDING_TIMEOUT_S = float(os.getenv("ALERT_AI_PENDING_TIMEOUT_S", "600"))
+# Runs that fell short are retried after ALERT_AI_RETRY_BACKOFF_S, doubling per attempt
+ALERT_AI_RETRY_BACKOFF_S = float(os.getenv("ALERT_AI_RETRY_BACKOFF_S", "300"))
+ALERT_AI_MAX_ATTEMPTS = int(os.getenv("ALERT_AI_MAX_ATTEMPTS", "5"))
+_RETRY_STATUSES = ("partial", "empty", "error")
+
+
+def _mark_attempt(alert: Alert, status: str, now: datetime) -> None:
+    alert.ai_status = status
+    alert.ai_attempts = (alert.ai_attempts or 0) + 1
+    alert.ai_failed_at = None if status == "ok" else now
+
+
+def generate_and_store_alert_ai(alert_ids: List[int]) -> None:
+    """
+    Generate recommendations and detailed analysis for the given alerts once and
+    persist them on the Alert rows. Runs in its own session (background thread).
+    Parts stored by an earlier run are kept; only the missing ones are generated.
+    """
+    from .database import SessionLocal
+
+    if not alert_ids:
+        return
+    groq_key, groq_model = _groq_settings()
+    db = SessionLocal()
+    try:
+        alerts = list(db.scalars(select(Alert).where(Alert.id.in_(alert_ids))))
+        if not groq_key:
+            for a in alerts:
+                a.ai_status = "unavailable"
+            db.commit()
+            return
+        need_recs = [a for a in alerts if not a.ai_recommendations]
+        recs = generate_ai_recommendations_for_alerts(db, need_recs, deadline_s=ALERT_AI_BACKGROUND_DEADLINE_S)
+        for a in alerts:
+            if a.ai_recommendations:
+                rec = {"status": "ok", "recommendations": a.ai_recommendations}
+            else:
+                rec = recs.get(a.id) or {"status": "error", "recommendations": []}
+            analysis = a.ai_analysis or generate_detailed_analysis_for_alert(db, a)
+            analysis_ok = bool(analysis.get("recommendations") or analysis.get("root_causes"))
+            now = datetime.utcnow()
+            a.ai_recommendations = rec["recommendations"]
+            a.ai_analysis = analysis if analysis_ok else None
+            a.ai_model = groq_model
+            a.ai_generated_at = now
+            recs_ok = rec["status"] == "ok"
+            if recs_ok and analysis_ok:
+                status = "ok"
+            elif recs_ok or analysis_ok:
+                # e.g. recommendations still running at the deadline: retried, not final
+                status = "partial"
+            else:
+                status = "empty" if rec["status"] == "empty" else "error"
+            _mark_attempt(a, status, now)
+            # Commit per alert so finished results are visible while the rest run
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[Alert AI] Background generation failed for alerts {alert_ids}: {e}")
+        try:
+            now = datetime.utcnow()
+            for a in db.scalars(select(Alert).where(Alert.id.in_(alert_ids)).where(Alert.ai_status == "pending")):
+                _mark_attempt(a, "error", now)
+            db.commit()
+        except Exception:
+            db.rollback()
+    finally:
+        db.close()
+
+
+def schedule_alert_ai(alert_ids: List[int]) -> None:
+    """
+    Queue background AI generation for newly created (or never processed) alerts.
+    """
+    if alert_ids:
+        _store_pool.submit(generate_and_store_alert_ai, list(alert_ids))
+
+
+def _needs_ai(alert: Alert, now: datetime) -> bool:
+    if alert.ai_status is None:
+        return True
+    if alert.ai_status == "pending":
+        stale_before = now - timedelta(seconds=ALERT_AI_PENDING_TIMEOUT_S)
+        return alert.ai_requested_at is None or alert.ai_requested_at < stale_before
+    if alert.ai_status in _RETRY_STATUSES:
+        attempts = alert.ai_attempts or 1
+        if attempts >= ALERT_AI_MAX_ATTEMPTS:
+            return False
+        failed_at = alert.ai_failed_at or alert.ai_generated_at or datetime.min
+        return now >= failed_at + timedelta(seconds=ALERT_AI_RETRY_BACKOFF_S * 2 ** (attempts - 1))
+    return False
+
+
+def claim_alert_ai(db: Session, alerts: List[Alert]) -> List[int]:
+    """
+    Queue AI generation for alerts never processed, stuck in "pending" longer than
+    ALERT_AI_PENDING_TIMEOUT_S, or whose last partial/failed run is past its retry
+    backoff. Returns the ids queued; the caller only ever reads stored results.
+    """
+    now = datetime.utcnow()
+    claimed = [a for a in alerts if _needs_ai(a, now)]
+    if not claimed:
+        return []
+    for a in claimed:
+        a.ai_status = "pending"
+        a.ai_requested_at = now
+    db.commit()
+    ids = [a.id for a in claimed]
+    schedule_alert_ai(ids)
+    return ids
+
+
+def requeue_pending_alert_ai() -> int:
+    """
+    Startup hook: runs queued by a previous process died with it, so every pending alert is queued again.
+    """
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        alerts = list(db.scalars(select(Alert).where(Alert.ai_status == "pending")))
+        for a in alerts:
+            a.ai_requested_at = None  # force the claim
+        ids = claim_alert_ai(db, alerts)
+    finally:
+        db.close()
+    if ids:
+        print(f"[Alert AI] Requeued {len(ids)} alert(s) left pending by a previous run")
+    return len(ids)
+
+
+def stored_ai_payload(alert: Alert) -> Dict[str, Any]:
+    """
+    Persisted AI fields of an alert, as returned by the API.
+    """
+    return {
+        "ai_recommendations": alert.ai_recommendations or [],
+        "ai_status": alert.ai_status or "pending",
+        "ai_model": alert.ai_model,
+        "ai_generated_at": alert.ai_generated_at.isoformat() if alert.ai_generated_at else None,
+    }
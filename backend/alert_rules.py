@@ -0,0 +1,236 @@
+"""
+Declarative alert rules compiled into vectorized predicates.
+
+Rules live in data/alert_rules.json (ALERT_RULES_PATH). Each rule combines
+conditions with "all"/"any" (nestable); a condition compares a feature array to a
+named threshold parameter:
+
+    {"field": "chi_after", "op": "<", "param": "max_chi"}
+
+Per-market thresholds go under "markets", e.g.
+    "markets": {"Dallas": {"chi_drop": {"max_chi": 55}, "volume_spike": {"enabled": false}}}
+and are resolved into one threshold array per parameter, so every rule is a
+handful of NumPy operations over all regions whatever the market count.
+
+Features: chi_after, chi_before, chi_drop, download_mbps, latency_ms,
+download_change, latency_change (fractional change vs the previous KPI row),
+drivers.<key> for any numeric key of the latest CHI drivers_json, and the online
+detector scores anomaly.{chi,download,latency}_{z,cusum} (positive = worse).
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .anomaly import FEATURES as ANOMALY_FEATURES
+
+ALERT_RULES_PATH = os.getenv(
+    "ALERT_RULES_PATH", str(Path(__file__).resolve().parent.parent / "data" / "alert_rules.json")
+)
+
+FEATURES = (
+    "chi_after", "chi_before", "chi_drop",
+    "download_mbps", "latency_ms", "download_change", "latency_change",
+) + ANOMALY_FEATURES
+
+_OPS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# (features, thresholds per param) -> boolean mask over regions
+Predicate = Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], np.ndarray]
+
+
+def _compile(node: Dict[str, Any], params: Dict[str, float], rule: str) -> Predicate:
+    if "all" in node or "any" in node:
+        combine = np.logical_and if "all" in node else np.logical_or
+        parts = [_compile(child, params, rule) for child in node.get("all", node.get("any"))]
+        if not parts:
+            raise ValueError(f"Rule {rule!r}: empty condition group")
+
+        def group(features: Dict[str, np.ndarray], thresholds: Dict[str, np.ndarray]) -> np.ndarray:
+            mask = parts[0](features, thresholds)
+            for part in parts[1:]:
+                mask = combine(mask, part(features, thresholds))
+            return mask
+
+        return group
+
+    field, op, param = node.get("field"), node.get("op"), node.get("param")
+    if op not in _OPS:
+        raise ValueError(f"Rule {rule!r}: unknown operator {op!r}")
+    if field not in FEATURES and not str(field).startswith("drivers."):
+        raise ValueError(f"Rule {rule!r}: unknown field {field!r}")
+    if param not in params:
+        raise ValueError(f"Rule {rule!r}: parameter {param!r} has no default in 'params'")
+    fn = _OPS[op]
+
+    def condition(features: Dict[str, np.ndarray], thresholds: Dict[str, np.ndarray]) -> np.ndarray:
+        # Missing data (NaN) never satisfies a condition
+        values = features[field]
+        return fn(values, thresholds[param]) & ~np.isnan(values)
+
+    return condition
+
+
+class Rule:
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.name: str = spec["name"]
+        self.reason: str = spec.get("reason", self.name)
+        self.enabled: bool = bool(spec.get("enabled", True))
+        self.params: Dict[str, float] = {k: float(v) for k, v in (spec.get("params") or {}).items()}
+        self.predicate = _compile(spec, self.params, self.name)
+        self.fields = sorted(_fields(spec))
+        self.spec = spec
+
+
+def _fields(node: Dict[str, Any]) -> set:
+    if "all" in node or "any" in node:
+        out: set = set()
+        for child in node.get("all", node.get("any")):
+            out |= _fields(child)
+        return out
+    return {node["field"]}
+
+
+class RuleEngine:
+    """
+    Compiled rule set. `evaluate` takes feature arrays aligned with `regions` and
+    returns {rule name: boolean mask}; hit counts and timings accumulate per rule.
+    """
+
+    def __init__(self, config: Dict[str, Any], source: Optional[str] = None) -> None:
+        self.source = source
+        self.rules: List[Rule] = [Rule(spec) for spec in config.get("rules", [])]
+        names = [r.name for r in self.rules]
+        if len(names) != len(set(names)):
+            raise ValueError("Alert rule names must be unique")
+        self.markets: Dict[str, Dict[str, Dict[str, Any]]] = config.get("markets") or {}
+        for market, overrides in self.markets.items():
+            for rule_name in overrides:
+                if rule_name not in names:
+                    raise ValueError(f"Market {market!r} overrides unknown rule {rule_name!r}")
+        self._lock = threading.Lock()
+        # Threshold arrays per region list; markets rarely change between ticks
+        self._thresholds: Dict[Tuple[str, ...], Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]]] = {}
+        self.hits: Dict[str, int] = {r.name: 0 for r in self.rules}
+        self.time_s: Dict[str, float] = {r.name: 0.0 for r in self.rules}
+        self.evaluations = 0
+        self.regions_evaluated = 0
+        self.last_eval_ms = 0.0
+
+    @classmethod
+    def from_file(cls, path: str = ALERT_RULES_PATH) -> "RuleEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), source=path)
+
+    @property
+    def driver_keys(self) -> List[str]:
+        """
+        drivers_json keys referenced by any rule (features the caller must supply).
+        """
+        keys = {f.split(".", 1)[1] for r in self.rules for f in r.fields if f.startswith("drivers.")}
+        return sorted(keys)
+
+    def _resolve(self, regions: Tuple[str, ...]) -> Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]]:
+        cached = self._thresholds.get(regions)
+        if cached is not None:
+            return cached
+        out: Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]] = {}
+        for rule in self.rules:
+            thresholds = {p: np.full(len(regions), v) for p, v in rule.params.items()}
+            enabled = np.full(len(regions), rule.enabled)
+            for i, region in enumerate(regions):
+                override = self.markets.get(region, {}).get(rule.name)
+                if not override:
+                    continue
+                for key, value in override.items():
+                    if key == "enabled":
+                        enabled[i] = bool(value)
+                    elif key in thresholds:
+                        thresholds[key][i] = float(value)
+            out[rule.name] = (thresholds, enabled)
+        if len(self._thresholds) >= 32:
+            self._thresholds.clear()
+        self._thresholds[regions] = out
+        return out
+
+    def evaluate(self, features: Dict[str, np.ndarray], regions: List[str]) -> Dict[str, np.ndarray]:
+        start = time.perf_counter()
+        with self._lock:
+            resolved = self._resolve(tuple(regions))
+        masks: Dict[str, np.ndarray] = {}
+        timings: Dict[str, float] = {}
+        with np.errstate(invalid="ignore"):
+            for rule in self.rules:
+                t0 = time.perf_counter()
+                thresholds, enabled = resolved[rule.name]
+                masks[rule.name] = rule.predicate(features, thresholds) & enabled
+                timings[rule.name] = time.perf_counter() - t0
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            for name, mask in masks.items():
+                self.hits[name] += int(mask.sum())
+                self.time_s[name] += timings[name]
+            self.evaluations += 1
+            self.regions_evaluated += len(regions)
+            self.last_eval_ms = elapsed * 1000
+        return masks
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = max(1, self.evaluations)
+            return {
+                "source": self.source,
+                "evaluations": self.evaluations,
+                "regions_evaluated": self.regions_evaluated,
+                "last_eval_ms": round(self.last_eval_ms, 3),
+                "markets_with_overrides": len(self.markets),
+                "rules": [
+                    {
+                        "name": r.name,
+                        "reason": r.reason,
+                        "enabled": r.enabled,
+                        "params": r.params,
+                        "fields": r.fields,
+                        "hits": self.hits[r.name],
+                        "avg_eval_ms": round(self.time_s[r.name] * 1000 / n, 4),
+                    }
+                    for r in self.rules
+                ],
+            }
+
+
+_engine: Optional[RuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine.from_file()
+            print(f"[DEBUG] Loaded {len(_engine.rules)} alert rule(s) from {_engine.source}")
+        return _engine
+
+
+def reload_rule_engine() -> RuleEngine:
+    """
+    Re-read the rules file; the previous engine stays active if the new one fails to compile.
+    """
+    global _engine
+    engine = RuleEngine.from_file()
+    with _engine_lock:
+        _engine = engine
+    print(f"[DEBUG] Reloaded {len(engine.rules)} alert rule(s) from {engine.source}")
+    return engine
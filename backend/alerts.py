@@ -1,83 +1,181 @@
 from __future__ import annotations
+import os
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import select, desc
+import numpy as np
+from sqlalchemy import select, desc, func, update
 from sqlalchemy.orm import Session
 
 from .models import Alert, CHI, KPI
+from .alert_rules import get_rule_engine
+from .anomaly import get_detector
 
+# A repeat of an open incident within this many minutes of its last sighting updates it in place
+ALERT_SUPPRESSION_MINUTES = float(os.getenv("ALERT_SUPPRESSION_MINUTES", "30"))
+# Open incidents not seen for this long are resolved
+ALERT_AUTO_RESOLVE_MINUTES = float(os.getenv("ALERT_AUTO_RESOLVE_MINUTES", "60"))
 
-def _latest_chi(db: Session, region: str) -> Optional[CHI]:
-    return db.scalars(
-        select(CHI).where(CHI.region == region).order_by(desc(CHI.ts)).limit(1)
-    ).first()
 
+def _last_two(db: Session, model: Any, columns: List[Any], regions: List[str]) -> Dict[str, List[Tuple]]:
+    """
+    Latest two rows (newest first) of `columns` for every region, in one ROW_NUMBER query.
+    """
+    rn = func.row_number().over(partition_by=model.region, order_by=desc(model.ts)).label("rn")
+    ranked = select(model.region, rn, *columns).where(model.region.in_(regions)).subquery()
+    rows = db.execute(
+        select(ranked).where(ranked.c.rn <= 2).order_by(ranked.c.region, ranked.c.rn)
+    ).all()
+    out: Dict[str, List[Tuple]] = {}
+    for row in rows:
+        out.setdefault(row[0], []).append(tuple(row[2:]))
+    return out
+
+
+def _column(by_region: Dict[str, List[Tuple]], regions: List[str], pos: int, field: int) -> np.ndarray:
+    """
+    Array of `field` from the `pos`-th latest row per region (NaN where missing).
+    """
+    values = np.full(len(regions), np.nan)
+    for i, region in enumerate(regions):
+        rows = by_region.get(region, ())
+        if len(rows) > pos and rows[pos][field] is not None:
+            values[i] = rows[pos][field]
+    return values
 
-def _previous_chi(db: Session, region: str) -> Optional[CHI]:
-<<<<<<< HEAD
-    # Get 2nd latest
-=======
 
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
-    rows = list(
-        db.scalars(
-            select(CHI).where(CHI.region == region).order_by(desc(CHI.ts)).limit(2)
-        )
+def alert_features(db: Session, regions: List[str], driver_keys: List[str]) -> Tuple[Dict[str, np.ndarray], List[Dict[str, Any]]]:
+    """
+    Feature arrays aligned with `regions` from one window query for the last two CHI
+    rows and one for the last two KPI rows, plus the anomaly detector scores.
+    Also returns the latest drivers per region.
+    """
+    chi = _last_two(db, CHI, [CHI.score, CHI.drivers_json], regions)
+    kpi = _last_two(db, KPI, [KPI.download_mbps, KPI.latency_ms], regions)
+
+    chi_after = _column(chi, regions, 0, 0)
+    chi_before = _column(chi, regions, 1, 0)
+    drivers = [(chi[r][0][1] or {}) if r in chi else {} for r in regions]
+    dl_now, dl_prev = _column(kpi, regions, 0, 0), _column(kpi, regions, 1, 0)
+    lat_now, lat_prev = _column(kpi, regions, 0, 1), _column(kpi, regions, 1, 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features = {
+            "chi_after": chi_after,
+            "chi_before": chi_before,
+            # A region with a single CHI row has no drop
+            "chi_drop": np.where(np.isnan(chi_before), 0.0, chi_before - chi_after),
+            "download_mbps": dl_now,
+            "latency_ms": lat_now,
+            "download_change": np.where(dl_prev > 0, (dl_now - dl_prev) / dl_prev, np.nan),
+            "latency_change": np.where(lat_prev > 0, (lat_now - lat_prev) / lat_prev, np.nan),
+        }
+    for key in driver_keys:
+        # Missing drivers count as 0, as the original hard-coded checks did
+        features[f"drivers.{key}"] = np.array([_as_float(d.get(key, 0)) for d in drivers])
+    # Online detector state: consumes only rows written since the previous tick
+    detector = get_detector()
+    detector.sync(db)
+    features.update(detector.features(regions))
+    return features, drivers
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def evaluate_alert_rules(db: Session, regions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evaluate the configured alert rules (see alert_rules.py) for all regions at once.
+    Returns one dict per region that triggered (region, chi_before, chi_after, rules, reasons, drivers),
+    with rules/reasons in rule-file order.
+    """
+    regions = sorted(set(regions))
+    if not regions:
+        return []
+    engine = get_rule_engine()
+    features, drivers = alert_features(db, regions, engine.driver_keys)
+    masks = engine.evaluate(features, regions)
+
+    fired = np.zeros(len(regions), dtype=bool)
+    for mask in masks.values():
+        fired |= mask
+    # Alerts describe a CHI change, so regions without a CHI row never alert
+    fired &= ~np.isnan(features["chi_after"])
+
+    out: List[Dict[str, Any]] = []
+    for i in np.flatnonzero(fired):
+        before = features["chi_before"][i]
+        out.append({
+            "region": regions[i],
+            "chi_before": None if np.isnan(before) else float(before),
+            "chi_after": float(features["chi_after"][i]),
+            "rules": [rule.name for rule in engine.rules if masks[rule.name][i]],
+            "reasons": [rule.reason for rule in engine.rules if masks[rule.name][i]],
+            "drivers": drivers[i],
+        })
+    return out
+
+
+def resolve_stale_incidents(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Mark open incidents not seen within ALERT_AUTO_RESOLVE_MINUTES as resolved (not committed).
+    """
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(Alert)
+        .where(Alert.status == "open", Alert.last_seen < now - timedelta(minutes=ALERT_AUTO_RESOLVE_MINUTES))
+        .values(status="resolved", resolved_at=now)
     )
-    if len(rows) < 2:
-        return None
-    return rows[1]
+    return result.rowcount or 0
 
 
-def _kpi_drop_25(db: Session, region: str) -> bool:
-<<<<<<< HEAD
-    # Compare last two KPI snapshots
-=======
-
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
-    rows = list(
-        db.scalars(
-            select(KPI).where(KPI.region == region).order_by(desc(KPI.ts)).limit(2)
-        )
+def _open_incidents(db: Session, regions: List[str]) -> Dict[Tuple[str, str], Alert]:
+    if not regions:
+        return {}
+    rows = db.scalars(
+        select(Alert).where(Alert.status == "open", Alert.region.in_(regions)).order_by(Alert.last_seen)
     )
-    if len(rows) < 2:
-        return False
-    latest, prev = rows[0], rows[1]
-    if prev.download_mbps > 0 and latest.download_mbps < 0.75 * prev.download_mbps:
-        return True
-    if prev.latency_ms > 0 and latest.latency_ms > 1.25 * prev.latency_ms:
-        return True
-    return False
+    # An incident is reachable through every rule that has fired in it; newest wins
+    return {(a.region, name): a for a in rows for name in (a.incident_key or "").split(",")}
 
 
 def generate_alerts_for_regions(db: Session, regions: List[str]) -> List[Alert]:
     """
     Based on most recent CHI rows per region, generate alerts if thresholds are met.
+    Incidents are keyed by region + the rules that have fired in them: while any of those
+    rules fires again the open row is updated (last_seen, occurrences, latest CHI, reasons)
+    instead of inserting a new one, so rules joining or dropping out do not split it.
+    Returns new alerts only.
     """
     created: List[Alert] = []
     now = datetime.utcnow()
-    for region in regions:
-        latest = _latest_chi(db, region)
-        if latest is None:
-            continue
-        prev = _previous_chi(db, region)
-        chi_before = prev.score if prev else None
-        chi_after = latest.score
-        drop = (chi_before - chi_after) if (chi_before is not None) else 0.0
-
-        reason_parts: List[str] = []
-        if chi_after < 60.0 and drop >= 10.0:
-            reason_parts.append("CHI drop ≥10 and <60")
-        if (latest.drivers_json or {}).get("volume_z", 0) >= 2.0:
-            reason_parts.append("Volume spike ≥2σ")
-        if _kpi_drop_25(db, region):
-            reason_parts.append("KPI degraded ≥25%")
-
-        if not reason_parts:
+    resolved = resolve_stale_incidents(db, now)
+    hits = evaluate_alert_rules(db, regions)
+    open_incidents = _open_incidents(db, [hit["region"] for hit in hits])
+    suppress_after = now - timedelta(minutes=ALERT_SUPPRESSION_MINUTES)
+    updated = 0
+    for hit in hits:
+        top_topics = hit["drivers"].get("top_keywords", [])[:3]
+        reason = " + ".join(hit["reasons"]) + (f" | topics: {', '.join(top_topics)}" if top_topics else "")
+        matches = [open_incidents[(hit["region"], name)] for name in hit["rules"] if (hit["region"], name) in open_incidents]
+        incident = next((a for a in matches if a.last_seen and a.last_seen >= suppress_after), None)
+        if incident is not None:
+            # Same ongoing incident: chi_before stays at the value it started from
+            incident.last_seen = now
+            incident.occurrences = (incident.occurrences or 1) + 1
+            incident.chi_after = hit["chi_after"]
+            incident.reason = reason
+            incident.incident_key = ",".join(dict.fromkeys(incident.incident_key.split(",") + hit["rules"]))
+            updated += 1
             continue
-
-        top_topics = (latest.drivers_json or {}).get("top_keywords", [])[:3]
+        for stale in matches:
+            stale.status = "resolved"
+            stale.resolved_at = now
+            resolved += 1
         recommendation = [
             "Investigate local towers",
             "Notify customers via SMS",
@@ -85,17 +183,45 @@ def generate_alerts_for_regions(db: Session, regions: List[str]) -> List[Alert]:
         ]
         alert = Alert(
             ts=now,
-            region=region,
-            chi_before=chi_before,
-            chi_after=chi_after,
-            reason=" + ".join(reason_parts) + (f" | topics: {', '.join(top_topics)}" if top_topics else ""),
+            region=hit["region"],
+            chi_before=hit["chi_before"],
+            chi_after=hit["chi_after"],
+            reason=reason,
             recommendation=recommendation,
+            ai_status="pending",
+            ai_requested_at=now,
+            incident_key=",".join(hit["rules"]),
+            status="open",
+            last_seen=now,
+            occurrences=1,
         )
         db.add(alert)
         created.append(alert)
 
-    if created:
+    if created or updated or resolved:
         db.commit()
+    if updated or resolved:
+        print(f"[DEBUG] Alerts: {len(created)} new, {updated} suppressed into open incidents, {resolved} resolved")
+    if created:
+        _schedule_ai([a.id for a in created])
     return created
 
 
+def incident_payload(alert: Alert) -> Dict[str, Any]:
+    return {
+        "status": alert.status,
+        "last_seen": alert.last_seen.isoformat() if alert.last_seen else None,
+        "occurrences": alert.occurrences,
+        "resolved_at": alert.resolved_at.isoformat() if alert.resolved_at else None,
+    }
+
+
+def _schedule_ai(alert_ids: List[int]) -> None:
+    # AI recommendations/analysis are generated once, off the request path
+    try:
+        from .alert_recommendations import schedule_alert_ai
+        schedule_alert_ai(alert_ids)
+    except Exception as e:
+        print(f"[Alert AI] Could not schedule generation for alerts {alert_ids}: {e}")
+
+
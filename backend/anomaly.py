@@ -0,0 +1,154 @@
+"""
+Online anomaly detection for CHI and KPI series.
+
+Each (region, metric) keeps O(1) state: an EWMA mean and EWM variance as the
+baseline, and a one-sided CUSUM of standardized deviations in the "bad"
+direction (CHI or download falling, latency rising). A sudden break shows up in
+the z-score; a slow degradation that never trips a two-point rule accumulates
+in the CUSUM.
+
+State is fed incrementally: `sync` reads only CHI/KPI rows with an id above the
+last one seen (rows written by any process), so no history is re-queried after
+the first call, which replays the last ANOMALY_BOOTSTRAP_HOURS.
+"""
+from __future__ import annotations
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import CHI, KPI
+
+ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.1"))  # EWMA smoothing per point
+ANOMALY_CUSUM_K = float(os.getenv("ANOMALY_CUSUM_K", "0.5"))  # slack, in standard deviations
+ANOMALY_WARMUP = int(os.getenv("ANOMALY_WARMUP", "8"))  # points before scores are reported
+ANOMALY_BOOTSTRAP_HOURS = float(os.getenv("ANOMALY_BOOTSTRAP_HOURS", "48"))
+
+# metric -> (source table, column, direction); direction +1 means higher is worse
+METRICS: Dict[str, Tuple[Any, Any, int]] = {
+    "chi": (CHI, CHI.score, -1),
+    "download": (KPI, KPI.download_mbps, -1),
+    "latency": (KPI, KPI.latency_ms, 1),
+}
+
+# Feature names exposed to the alert rule engine
+FEATURES = tuple(f"anomaly.{m}_{stat}" for m in METRICS for stat in ("z", "cusum"))
+
+
+class SeriesState:
+    __slots__ = ("mean", "var", "n", "cusum", "z")
+
+    def __init__(self) -> None:
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+        self.cusum = 0.0
+        self.z = 0.0
+
+    def update(self, x: float, direction: int, alpha: float, k: float, warmup: int) -> None:
+        if self.n == 0:
+            self.mean, self.n = x, 1
+            return
+        # Floor the deviation so a flat baseline does not turn tiny wiggles into huge z-scores
+        std = max(math.sqrt(self.var), 0.01 * abs(self.mean), 1e-6)
+        self.z = direction * (x - self.mean) / std
+        if self.n >= warmup:
+            self.cusum = max(0.0, self.cusum + self.z - k)
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1 - alpha) * (self.var + diff * incr)
+        self.n += 1
+
+
+class AnomalyDetector:
+    def __init__(self, alpha: float = ANOMALY_ALPHA, k: float = ANOMALY_CUSUM_K, warmup: int = ANOMALY_WARMUP) -> None:
+        self.alpha = alpha
+        self.k = k
+        self.warmup = warmup
+        self._series: Dict[Tuple[str, str], SeriesState] = {}
+        self._watermarks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.points = 0
+
+    def observe(self, region: str, metric: str, value: float) -> None:
+        if value is None or metric not in METRICS:
+            return
+        with self._lock:
+            self._observe(region, metric, float(value))
+
+    def _observe(self, region: str, metric: str, value: float) -> None:
+        state = self._series.get((region, metric))
+        if state is None:
+            state = self._series[(region, metric)] = SeriesState()
+        state.update(value, METRICS[metric][2], self.alpha, self.k, self.warmup)
+        self.points += 1
+
+    def sync(self, db: Session) -> int:
+        """
+        Feed CHI/KPI rows written since the last sync. Returns the number of rows consumed.
+        """
+        consumed = 0
+        with self._lock:
+            for model in (CHI, KPI):
+                metrics = [(m, col) for m, (table, col, _) in METRICS.items() if table is model]
+                last_id = self._watermarks.get(model.__tablename__)
+                query = select(model.id, model.region, *[col for _, col in metrics])
+                if last_id is None:
+                    since = datetime.utcnow() - timedelta(hours=ANOMALY_BOOTSTRAP_HOURS)
+                    query = query.where(model.ts >= since)
+                else:
+                    query = query.where(model.id > last_id)
+                rows = db.execute(query.order_by(model.id)).all()
+                for row in rows:
+                    for (metric, _), value in zip(metrics, row[2:]):
+                        if value is not None:
+                            self._observe(row[1], metric, float(value))
+                if rows:
+                    last_id = rows[-1][0]
+                elif last_id is None:
+                    last_id = db.scalar(select(model.id).order_by(model.id.desc()).limit(1)) or 0
+                self._watermarks[model.__tablename__] = last_id
+                consumed += len(rows)
+        return consumed
+
+    def features(self, regions: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Current z-score and CUSUM per metric aligned with `regions` (NaN until warmed up).
+        """
+        out = {name: np.full(len(regions), np.nan) for name in FEATURES}
+        with self._lock:
+            for i, region in enumerate(regions):
+                for metric in METRICS:
+                    state = self._series.get((region, metric))
+                    if state is None or state.n <= self.warmup:
+                        continue
+                    out[f"anomaly.{metric}_z"][i] = state.z
+                    out[f"anomaly.{metric}_cusum"][i] = state.cusum
+        return out
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            out: Dict[str, Dict[str, Dict[str, float]]] = {}
+            for (region, metric), s in self._series.items():
+                out.setdefault(region, {})[metric] = {
+                    "baseline": round(s.mean, 3),
+                    "std": round(math.sqrt(s.var), 3),
+                    "z": round(s.z, 3),
+                    "cusum": round(s.cusum, 3),
+                    "points": s.n,
+                    "warm": s.n > self.warmup,
+                }
+            return out
+
+
+_detector: AnomalyDetector = AnomalyDetector()
+
+
+def get_detector() -> AnomalyDetector:
+    return _detector
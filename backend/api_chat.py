@@ -2,9 +2,11 @@
 API routes for chat and recommendations.
 """
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from .recommendations import get_recommendations
+from .recommendations import get_recommendations, stream_recommendations
+from .streaming import SSE_HEADERS, sse_stream
 
 router = APIRouter()
 
@@ -24,7 +26,22 @@ def recommendations(req: RecsReq):
     Generate AI recommendations for an alert/incident.
     Returns GROQ-generated recommendations with fallback.
     """
-    context = {
+    text, source = get_recommendations(_context(req))
+    return {"recommendations": text, "source": source}
+
+
+@router.post("/recommendations/stream")
+def recommendations_stream(req: RecsReq):
+    """
+    Server-sent-event version of /recommendations: tokens as they are generated,
+    then a "done" event with the /recommendations body.
+    """
+    return StreamingResponse(sse_stream(stream_recommendations(_context(req))),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _context(req: RecsReq) -> dict:
+    return {
         "region": req.region,
         "current_chi": req.current_chi,
         "prev_chi": req.prev_chi,
@@ -32,6 +49,4 @@ def recommendations(req: RecsReq):
         "kpi": req.kpi or {},
         "time": req.time
     }
-    text, source = get_recommendations(context)
-    return {"recommendations": text, "source": source}
 
@@ -0,0 +1,163 @@
+"""
+Rolling-origin backtest of CHI forecasters over the stored `chi` history.
+
+    python -m backend.backtest --days 90 --window 24 --steps 4
+
+For every region and every origin with `window` points of history, each model
+forecasts the value `steps` points ahead and is scored against the stored row:
+MAE, RMSE, prediction-interval coverage and width, and runtime. Window sums come
+from cumulative sums, so a model costs a few array operations per region rather
+than one refit per origin.
+
+Models:
+- linear: the production trend fit (see predict.ols_forecast)
+- mean: window mean, interval from the window standard deviation
+- persistence: last value, interval from the RMS of in-window `steps`-ahead changes
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import CHI
+from .predict import FORECAST_INTERVAL_LEVEL, FORECAST_POINTS, ols_forecast, t_quantile
+
+MODELS = ("linear", "mean", "persistence")
+
+
+def _window_sums(a: np.ndarray, window: int) -> np.ndarray:
+    # Sum of every length-`window` slice; element k covers a[k:k + window]
+    c = np.concatenate(([0.0], np.cumsum(a)))
+    return c[window:] - c[:-window]
+
+
+def evaluate_series(
+    y: np.ndarray, window: int, steps: int, level: float = FORECAST_INTERVAL_LEVEL
+) -> Tuple[np.ndarray, Dict[str, Tuple[np.ndarray, np.ndarray, float]]]:
+    """
+    Forecast y[t + steps] from y[t - window + 1 .. t] for every valid origin t.
+    Returns (actuals, {model: (predictions, interval half widths, seconds)}).
+    """
+    m = len(y) - window - steps + 1
+    if m <= 0:
+        return np.empty(0), {}
+    actual = y[window - 1 + steps:window - 1 + steps + m]
+    out: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+    q_linear, q_mean, z = (float(q) for q in t_quantile(np.array([window - 2, window - 1, np.inf]), level))
+
+    start = time.perf_counter()
+    s0 = _window_sums(y, window)[:m]
+    s1 = _window_sums(np.arange(len(y)) * y, window)[:m] - np.arange(m) * s0  # local x = 0..window-1
+    s2 = _window_sums(y * y, window)[:m]
+    pred, half = ols_forecast(window, s0, s1, s2, window - 1 + steps, q_linear)
+    out["linear"] = (np.clip(pred, 0.0, 100.0), half, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    mean = s0 / window
+    sd = np.sqrt(np.maximum(s2 - s0 * mean, 0.0) / (window - 1))
+    out["mean"] = (mean, q_mean * sd * np.sqrt(1 + 1 / window), time.perf_counter() - start)
+
+    if window > steps:
+        start = time.perf_counter()
+        last = y[window - 1:window - 1 + m]
+        diffs = y[steps:] - y[:-steps]
+        # Changes observable inside each window: those ending at positions t - window + 1 + steps .. t
+        rms = np.sqrt(_window_sums(diffs * diffs, window - steps)[:m] / (window - steps))
+        out["persistence"] = (last, z * rms, time.perf_counter() - start)
+    return actual, out
+
+
+def load_history(db: Session, days: float, regions: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    CHI scores per region in time order, in one query.
+    """
+    query = select(CHI.region, CHI.score).where(CHI.ts >= datetime.utcnow() - timedelta(days=days))
+    if regions:
+        query = query.where(CHI.region.in_(regions))
+    series: Dict[str, List[float]] = {}
+    for region, score in db.execute(query.order_by(CHI.region, CHI.ts, CHI.id)):
+        series.setdefault(region, []).append(float(score))
+    return {r: np.asarray(v, dtype=float) for r, v in series.items()}
+
+
+def run_backtest(
+    history: Dict[str, np.ndarray],
+    window: int = FORECAST_POINTS,
+    steps: int = 4,
+    level: float = FORECAST_INTERVAL_LEVEL,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate metrics per model across all regions.
+    """
+    totals = {m: {"n": 0, "abs_err": 0.0, "sq_err": 0.0, "covered": 0, "width": 0.0, "seconds": 0.0} for m in MODELS}
+    regions_used = 0
+    for y in history.values():
+        actual, results = evaluate_series(y, window, steps, level)
+        if not results:
+            continue
+        regions_used += 1
+        for model, (pred, half, seconds) in results.items():
+            err = actual - pred
+            t = totals[model]
+            t["n"] += len(actual)
+            t["abs_err"] += float(np.abs(err).sum())
+            t["sq_err"] += float((err * err).sum())
+            t["covered"] += int((np.abs(err) <= half).sum())
+            t["width"] += float((2 * half).sum())
+            t["seconds"] += seconds
+
+    report: Dict[str, Dict[str, float]] = {}
+    for model, t in totals.items():
+        n = t["n"]
+        report[model] = {
+            "forecasts": n,
+            "regions": regions_used,
+            "mae": round(t["abs_err"] / n, 3) if n else float("nan"),
+            "rmse": round(float(np.sqrt(t["sq_err"] / n)), 3) if n else float("nan"),
+            "coverage": round(t["covered"] / n, 3) if n else float("nan"),
+            "mean_interval_width": round(t["width"] / n, 3) if n else float("nan"),
+            "runtime_ms": round(t["seconds"] * 1000, 2),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of CHI forecasters")
+    parser.add_argument("--days", type=float, default=30.0, help="history to replay")
+    parser.add_argument("--window", type=int, default=FORECAST_POINTS, help="points per fit")
+    parser.add_argument("--steps", type=int, default=4, help="points ahead to forecast (4 = 1h at 15 min)")
+    parser.add_argument("--level", type=float, default=FORECAST_INTERVAL_LEVEL, help="prediction interval level")
+    parser.add_argument("--region", action="append", help="limit to region (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        history = load_history(db, args.days, args.region)
+        load_s = time.perf_counter() - start
+    finally:
+        db.close()
+    report = run_backtest(history, args.window, args.steps, args.level)
+    if args.json:
+        print(json.dumps({"load_ms": round(load_s * 1000, 2), "models": report}, indent=2))
+        return
+    points = sum(len(v) for v in history.values())
+    print(f"{len(history)} regions, {points} CHI rows loaded in {load_s * 1000:.1f} ms "
+          f"(window={args.window}, steps={args.steps}, level={args.level})")
+    print(f"{'model':<12}{'forecasts':>10}{'MAE':>9}{'RMSE':>9}{'coverage':>10}{'width':>9}{'ms':>9}")
+    for model, r in report.items():
+        print(f"{model:<12}{r['forecasts']:>10}{r['mae']:>9}{r['rmse']:>9}{r['coverage']:>10}"
+              f"{r['mean_interval_width']:>9}{r['runtime_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,5 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
-<<<<<<< HEAD
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator
 import os
 import json
 
@@ -17,79 +15,25 @@ try:
     load_dotenv(override=False)
 except ImportError:
     pass  # dotenv not available, rely on system env vars
-=======
-from typing import List, Tuple
-import os
-import json
-from pathlib import Path
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sqlalchemy import select, desc
 from sqlalchemy.orm import Session
-<<<<<<< HEAD
 
-from .models import Event, Alert, Runbook, CHI
+from .models import CHI
 try:
     from .vectorstore import query_text as pine_query
 except Exception:  # pragma: no cover
     pine_query = None  # type: ignore
-=======
-import requests
-from dotenv import load_dotenv
-
-from .models import Event, Alert, Runbook, CHI
-
-# Load environment variables from .env file
-env_path = Path(__file__).resolve().parent.parent / ".env"
-load_dotenv(env_path)
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
-
-
-def _collect_context(db: Session, lookback_hours: int = 24) -> List[Tuple[str, str]]:
-    """
-    Returns list of (type, text) items to feed into retrieval.
-    """
-    now = datetime.utcnow()
-    start = now - timedelta(hours=lookback_hours)
-    docs: List[Tuple[str, str]] = []
-    # Recent alerts
-    alerts = list(
-        db.scalars(select(Alert).where(Alert.ts >= start).order_by(desc(Alert.ts)))
-    )
-    for a in alerts:
-        docs.append(("alert", f"[{a.region}] {a.reason} | recs: {', '.join(a.recommendation or [])}"))
-    # Recent events (sample strongest negative/positive)
-    events = list(
-        db.scalars(
-            select(Event)
-            .where(Event.ts >= start)
-            .order_by(desc(Event.ts))
-            .limit(500)
-        )
-    )
-    for e in events:
-        docs.append(("event", f"[{e.region}] sent={e.sentiment:.2f} topic={e.topic or 'other'} text={e.text[:240]}"))
-    # Runbook
-    runbooks = list(db.scalars(select(Runbook)))
-    for r in runbooks:
-        docs.append(("runbook", f"Runbook for {r.issue}: steps={'; '.join(r.steps)}"))
-    # Latest CHI per region
-    regions = sorted({e.region for e in events})
-    for region in regions:
-        row = db.scalars(
-            select(CHI).where(CHI.region == region).order_by(desc(CHI.ts)).limit(1)
-        ).first()
-        if row:
-            drivers = row.drivers_json or {}
-            docs.append(("chi", f"[{region}] CHI={row.score:.1f} sentiment={drivers.get('sentiment', 0):.2f} "
-                                 f"kpi={drivers.get('kpi_health', 0):.2f} top={', '.join(drivers.get('top_keywords', [])[:5])}"))
-    return docs
+try:
+    from .retrieval import hybrid_search, search_context
+except Exception:  # pragma: no cover
+    hybrid_search = None  # type: ignore
+    search_context = None  # type: ignore
+from .llm_cache import cached_completion, cached_stream, data_snapshot
+from .streaming import JSONStringFieldStream, StreamEvent
+from .prompt_budget import budget_for, estimate_tokens, pack_context
 
 
-<<<<<<< HEAD
 def _get_state_from_region(region: str) -> str:
     """
     Extract state from region name if it's in format "City, ST" or "City, State".
@@ -181,23 +125,25 @@ def _answer_chi_query(db: Session, question: str, query_type: str) -> dict:
     }
 
 
-def answer_question(db: Session, question: str) -> dict:
+def _direct_chi_answer(db: Session, question: str) -> Optional[dict]:
     """
-    Simple chatbot: Query Pinecone for relevant data, then use GROQ to answer.
-    Also handles direct CHI queries by querying the database.
+    Answer highest/lowest CHI questions straight from the database, or None.
     """
     question_lower = question.lower().strip()
-    
-    # Step 0: Handle direct CHI queries (highest/lowest CHI)
     if "highest chi" in question_lower or "top chi" in question_lower or "best chi" in question_lower:
         return _answer_chi_query(db, question, "highest")
     
     if "lowest chi" in question_lower or "worst chi" in question_lower or "bottom chi" in question_lower:
         return _answer_chi_query(db, question, "lowest")
-    
-    # Step 1: Query Pinecone for relevant customer reviews/data
+    return None
+
+
+def _retrieve_context(db: Session, question: str) -> List[Dict[str, Any]]:
+    """
+    Hybrid retrieval (BM25 over events/alerts/runbooks + Pinecone reviews) for a question.
+    """
     context_data = []
-    if pine_query is not None:
+    if hybrid_search is not None:
         try:
             # Extract filters from question
             question_lower = question.lower()
@@ -224,9 +170,8 @@ def answer_question(db: Session, question: str) -> dict:
             elif "support" in question_lower or "service" in question_lower:
                 issue_type_filter = "customer_support"
             
-            # Query Pinecone
-            matches = pine_query(question, top_k=5, namespace="default", 
-                               region_filter=region_filter, issue_type_filter=issue_type_filter)
+            matches = hybrid_search(db, question, top_k=5,
+                                    region_filter=region_filter, issue_type_filter=issue_type_filter)
             
             for m in matches:
                 text = m.get("text", "").strip()
@@ -239,15 +184,186 @@ def answer_question(db: Session, question: str) -> dict:
                         "issue_type": metadata.get("issue_type", "")
                     })
         except Exception as e:
-            print(f"[ERROR] Pinecone query failed: {e}")
+            print(f"[ERROR] Retrieval failed: {e}")
+    
+    return context_data
+
+
+def _groq_key() -> Optional[str]:
+    key = (os.getenv("GROQ_API_KEY") or "").strip()
+    # The .env.example placeholder counts as not configured
+    return key if key and key != "your-groq-api-key-here" else None
+
+
+def _retrieval_answer(db: Session, question: str) -> dict:
+    """
+    Answer without an LLM: BM25 evidence from the maintained sparse index over recent
+    alerts, events, runbooks and CHI. Used when no GROQ key is configured.
+    """
+    top_docs = search_context(db, question, top_k=8) if search_context is not None else []
+    if not top_docs:
+        return {"summary": "No data available.", "drivers": {"evidence": []}, "actions": []}
+    regions = sorted({
+        text[1:text.index("]")]
+        for kind, text in top_docs
+        if kind in ("alert", "chi", "event") and text.startswith("[") and "]" in text
+    })
+    return {
+        "summary": "Top regions: " + (", ".join(regions) if regions else "No hotspots."),
+        "drivers": {"evidence": [f"{kind}: {text}" for kind, text in top_docs[:5]]},
+        "actions": [
+            "Check tower health and restart impacted cells",
+            "Notify customers in affected regions",
+            "Open incident and assign on-call engineer",
+        ],
+    }
+
+
+def answer_question(db: Session, question: str) -> dict:
+    """
+    Simple chatbot: Hybrid sparse + Pinecone retrieval for relevant data, then use GROQ to answer.
+    Also handles direct CHI queries by querying the database, and answers from the sparse
+    index alone when GROQ is not configured.
+    """
+    # Step 0: Handle direct CHI queries (highest/lowest CHI)
+    direct = _direct_chi_answer(db, question)
+    if direct is not None:
+        return direct
+    if _groq_key() is None:
+        return _retrieval_answer(db, question)
+    
+    # Step 1: Hybrid retrieval
+    context_data = _retrieve_context(db, question)
     
     # Step 2: Use GROQ to generate answer from context
-    return _simple_groq_answer(question, context_data)
+    return _simple_groq_answer(question, context_data, snapshot=data_snapshot(db))
+
+
+def stream_answer(db: Session, question: str) -> Iterator[StreamEvent]:
+    """
+    Streaming variant of answer_question: yields ("evidence", ...) as soon as retrieval
+    finishes, then ("token", {"text": ...}) as the summary is generated, and finally
+    ("done", ...) with the same body answer_question returns.
+    """
+    direct = _direct_chi_answer(db, question)
+    if direct is not None:
+        yield "done", direct
+        return
+    if _groq_key() is None:
+        yield "done", _retrieval_answer(db, question)
+        return
+    
+    context_data = _retrieve_context(db, question)
+    yield "evidence", {"evidence": context_data}
+    
+    system_msg, user_msg, context_lines = _qa_prompt(question, context_data)
+    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    try:
+        from .llm_client import chat_completion, get_groq_client
+        client = get_groq_client()
+    except Exception:
+        # Setup problems are reported exactly as the non-streaming path does
+        yield "done", _simple_groq_answer(question, context_data, snapshot=data_snapshot(db))
+        return
 
+    def stream() -> Iterator[str]:
+        completion = chat_completion(
+            client,
+            model=model,
+            messages=[
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg}
+            ],
+            temperature=0.2,
+            response_format={"type": "json_object"},
+            stream=True
+        )
+        for chunk in completion:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
 
-def _simple_groq_answer(question: str, context_data: List[Dict[str, Any]]) -> dict:
+    summary = JSONStringFieldStream("summary")
+    parts: List[str] = []
+    try:
+        for chunk in cached_stream(model, system_msg, user_msg, stream,
+                                   question=question, scope="qa", snapshot=data_snapshot(db)):
+            parts.append(chunk)
+            text = summary.feed(chunk)
+            if text:
+                yield "token", {"text": text}
+    except Exception as e:
+        yield "done", {
+            "summary": f"Error calling GROQ API: {str(e)}",
+            "drivers": {"evidence": context_lines[:3] if context_lines else []},
+            "actions": []
+        }
+        return
+    yield "done", _qa_result("".join(parts), context_lines)
+
+
+def _qa_prompt(question: str, context_data: List[Dict[str, Any]]) -> Tuple[str, str, List[str]]:
+    """
+    Build the (system, user) messages for a Q&A call plus the formatted context lines.
+    """
+    # Build context string from Pinecone data
+    context_lines = []
+    for item in context_data:
+        text = item.get("text", "")
+        region = item.get("region", "")
+        rating = item.get("rating")
+        issue = item.get("issue_type", "")
+        
+        line = text
+        if region:
+            line += f" [Region: {region}]"
+        if rating is not None:
+            line += f" [Rating: {rating}/5]"
+        if issue:
+            line += f" [Issue: {issue}]"
+        context_lines.append(line)
+    
+    budget = budget_for(os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"))
+    context_lines = [line for _, line in pack_context(context_lines, budget)]
+    context = "\n".join(context_lines) if context_lines else "No specific context available."
+    
+    # Simple prompt
+    system_msg = (
+        "You are a helpful T-Mobile customer service assistant. "
+        "Answer questions based on the provided customer review data. "
+        "Return JSON with: summary (concise answer), drivers.evidence (list of relevant quotes), "
+        "and actions (list of 3-5 recommendations)."
+    )
+    
+    user_msg = f"Question: {question}\n\nCustomer Review Data:\n{context}\n\nProvide a helpful answer."
+    return system_msg, user_msg, context_lines
+
+
+def _qa_result(content: str, context_lines: List[str]) -> dict:
+    """
+    Shape a Q&A completion into the /qa response body.
+    """
+    parsed = _extract_json(content)
+    
+    if isinstance(parsed, dict):
+        return {
+            "summary": parsed.get("summary", "No summary available."),
+            "drivers": {"evidence": parsed.get("drivers", {}).get("evidence", [])},
+            "actions": parsed.get("actions", [])
+        }
+    else:
+        # If JSON parsing fails, use raw content
+        return {
+            "summary": content[:500] if content else "No response generated.",
+            "drivers": {"evidence": context_lines[:3]},
+            "actions": []
+        }
+
+
+def _simple_groq_answer(question: str, context_data: List[Dict[str, Any]], snapshot: Optional[str] = None) -> dict:
     """
     Simple GROQ answer generator using context from Pinecone.
+    `snapshot` identifies the data state, enabling semantic reuse of cached answers.
     """
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
@@ -258,7 +374,7 @@ def _simple_groq_answer(question: str, context_data: List[Dict[str, Any]]) -> di
         }
     
     try:
-        from .llm_client import get_groq_client
+        from .llm_client import chat_completion, get_groq_client
         client = get_groq_client()
     except ImportError:
         return {
@@ -294,38 +410,14 @@ def _simple_groq_answer(question: str, context_data: List[Dict[str, Any]]) -> di
             "actions": []
         }
     
-    # Build context string from Pinecone data
-    context_lines = []
-    for item in context_data:
-        text = item.get("text", "")
-        region = item.get("region", "")
-        rating = item.get("rating")
-        issue = item.get("issue_type", "")
-        
-        line = text
-        if region:
-            line += f" [Region: {region}]"
-        if rating is not None:
-            line += f" [Rating: {rating}/5]"
-        if issue:
-            line += f" [Issue: {issue}]"
-        context_lines.append(line)
-    
-    context = "\n".join(context_lines) if context_lines else "No specific context available."
-    
-    # Simple prompt
-    system_msg = (
-        "You are a helpful T-Mobile customer service assistant. "
-        "Answer questions based on the provided customer review data. "
-        "Return JSON with: summary (concise answer), drivers.evidence (list of relevant quotes), "
-        "and actions (list of 3-5 recommendations)."
-    )
-    
-    user_msg = f"Question: {question}\n\nCustomer Review Data:\n{context}\n\nProvide a helpful answer."
+    system_msg, user_msg, context_lines = _qa_prompt(question, context_data)
     
-    try:
-        completion = client.chat.completions.create(
-            model=os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+    def call() -> str:
+        completion = chat_completion(
+            client,
+            model=model,
             messages=[
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": user_msg}
@@ -333,23 +425,12 @@ def _simple_groq_answer(question: str, context_data: List[Dict[str, Any]]) -> di
             temperature=0.2,
             response_format={"type": "json_object"}
         )
-        
-        content = completion.choices[0].message.content or ""
-        parsed = _extract_json(content)
-        
-        if isinstance(parsed, dict):
-            return {
-                "summary": parsed.get("summary", "No summary available."),
-                "drivers": {"evidence": parsed.get("drivers", {}).get("evidence", [])},
-                "actions": parsed.get("actions", [])
-            }
-        else:
-            # If JSON parsing fails, use raw content
-            return {
-                "summary": content[:500] if content else "No response generated.",
-                "drivers": {"evidence": context_lines[:3]},
-                "actions": []
-            }
+        return completion.choices[0].message.content or ""
+
+    try:
+        content = cached_completion(model, system_msg, user_msg, call,
+                                    question=question, scope="qa", snapshot=snapshot) or ""
+        return _qa_result(content, context_lines)
     except Exception as e:
         return {
             "summary": f"Error calling GROQ API: {str(e)}",
@@ -364,41 +445,51 @@ def _try_answer_with_groq(question: str, top_docs: List[Tuple[str, str]], pine_m
         print("[DEBUG] GROQ_API_KEY not set, skipping GROQ")
         return None
     try:
-        from .llm_client import get_groq_client
+        from .llm_client import chat_completion, get_groq_client
     except Exception as e:
         print(f"[DEBUG] Failed to import groq client: {e}")
         return None
     
     # Collect CHI data for general queries
-    chi_data = ""
+    chi_lines: List[str] = []
     if db is not None:
         try:
             from .models import CHI
             from sqlalchemy import select, desc
             chi_records = list(db.scalars(select(CHI).order_by(desc(CHI.ts)).limit(20)))
-            if chi_records:
-                chi_lines = []
-                for chi in chi_records[:10]:
-                    chi_lines.append(f"Region: {chi.region}, CHI: {chi.score:.1f}, Sentiment: {chi.sentiment:.2f}, KPI Health: {chi.kpi_health:.2f}")
-                chi_data = "\n\nCurrent CHI (Customer Happiness Index) Data:\n" + "\n".join(chi_lines)
+            for chi in chi_records[:10]:
+                chi_lines.append(f"Region: {chi.region}, CHI: {chi.score:.1f}, Sentiment: {chi.sentiment:.2f}, KPI Health: {chi.kpi_health:.2f}")
         except Exception:
             pass
     
+    # Dedup, rank and trim the evidence to the model's context budget:
+    # customer reviews first, then other docs, then CHI rows; retriever order breaks ties
+    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    candidates = list(top_docs) + [("chi_row", line) for line in chi_lines]
+    priority = {"review": 2.0, "chi_row": 0.0}
+    scores = [priority.get(t, 1.0) - 0.01 * rank for rank, (t, _) in enumerate(candidates)]
+    packed = pack_context([text for _, text in candidates], budget_for(model), scores=scores, query=question)
+    
     # Prepare context bullets with source attribution
     # PRIORITIZE Pinecone customer reviews over KPI/CHI data
     context_lines = []
     review_lines = []
     other_lines = []
+    kept_chi_lines = []
     review_count = 0
     
-    for doc_type, text in top_docs[:15]:  # Include more context
+    for idx, text in packed:
+        doc_type = candidates[idx][0]
         if doc_type == "review":
             review_count += 1
             review_lines.append(f"- Customer Review #{review_count}: {text}")
+        elif doc_type == "chi_row":
+            kept_chi_lines.append(text)
         elif doc_type == "chi":
             other_lines.append(f"- CHI Data: {text}")
         else:
             other_lines.append(f"- {doc_type}: {text}")
+    chi_data = "\n\nCurrent CHI (Customer Happiness Index) Data:\n" + "\n".join(kept_chi_lines) if kept_chi_lines else ""
     
     # Put reviews first, then other data
     context_lines = review_lines + other_lines
@@ -477,7 +568,6 @@ def _try_answer_with_groq(question: str, top_docs: List[Tuple[str, str]], pine_m
             "Return only valid JSON. If customer reviews are available, include at least one review quote in evidence. "
             "For negative reviews, provide specific recommendations to address the issues."
     )
-    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
     print(f"[DEBUG] Creating Groq client with API key (length: {len(api_key) if api_key else 0})")
     print(f"[DEBUG] Groq library version check...")
     try:
@@ -515,8 +605,9 @@ def _try_answer_with_groq(question: str, top_docs: List[Tuple[str, str]], pine_m
         }
     
     # Now make the API call (client is created at this point)
-    try:
-        completion = client.chat.completions.create(
+    def call() -> str:
+        completion = chat_completion(
+            client,
             model=model,
             messages=[
                 {"role": "system", "content": system_msg},
@@ -524,7 +615,11 @@ def _try_answer_with_groq(question: str, top_docs: List[Tuple[str, str]], pine_m
             ],
             temperature=0.2,
         )
-        content = completion.choices[0].message.content or ""
+        return completion.choices[0].message.content or ""
+
+    try:
+        content = cached_completion(model, system_msg, user_msg, call, question=question,
+                                    scope="qa_full", snapshot=data_snapshot(db)) or ""
         print(f"[DEBUG] GROQ response received, length: {len(content)}")
         print(f"[DEBUG] GROQ full response: {content}")
         
@@ -720,7 +815,10 @@ def generate_alert_recommendations(
         f"reason: {reason}",
     ]
     context_lines += [f"chi_{line}" for line in drivers_lines]
-    context_lines += [f"doc: {t}" for t in pine_lines]
+    model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    # Retrieved docs get whatever budget the fixed alert facts leave
+    doc_budget = budget_for(model) - estimate_tokens("\n".join(context_lines))
+    context_lines += [f"doc: {t}" for _, t in pack_context(pine_lines, doc_budget, query=f"{region} {reason}")]
     context = "\n".join(context_lines)
     system_msg = (
         "You are a telecom site reliability assistant. Based on the provided context, "
@@ -732,11 +830,12 @@ def generate_alert_recommendations(
     )
     user_msg = f"Context:\n{context}\n\nReturn only JSON with keys analysis, preview, actions."
     try:
-        from .llm_client import get_groq_client
+        from .llm_client import chat_completion, get_groq_client
         # Use helper function that doesn't pass proxies
         client = get_groq_client()
-        completion = client.chat.completions.create(
-            model=os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+        completion = chat_completion(
+            client,
+            model=model,
             messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}],
             temperature=0.2,
         )
@@ -765,167 +864,3 @@ def generate_alert_recommendations(
             "Open incident and assign on-call engineer for triage",
         ],
     }
-=======
-def answer_question(db: Session, question: str) -> dict:
-    docs = _collect_context(db)
-    corpus = [d[1] for d in docs]
-    if not corpus:
-        return {"summary": "No data available.", "drivers": {}, "actions": []}
-    vectorizer = TfidfVectorizer(stop_words="english")
-    X = vectorizer.fit_transform(corpus + [question])
-    sims = cosine_similarity(X[-1:], X[:-1]).ravel()
-    top_idx = np.argsort(sims)[-8:][::-1]
-
-    top_docs = [docs[i] for i in top_idx if sims[i] > 0.05]
-    regions_mentioned = []
-    issues = []
-    for t, text in top_docs:
-        if t in ("alert", "chi", "event"):
-            # naive region extraction [region]
-            if text.startswith("[") and "]" in text:
-                regions_mentioned.append(text[1:text.index("]")])
-        if t in ("alert", "event"):
-            issues.append(text)
-
-    # Craft a concise summary
-    regions_uniq = sorted(set(regions_mentioned))
-    summary = "Top regions: " + (", ".join(regions_uniq) if regions_uniq else "No hotspots.")
-    drivers = {"evidence": [t + ": " + txt for t, txt in top_docs[:5]]}
-    actions = [
-        "Check tower health and restart impacted cells",
-        "Notify customers in affected regions",
-        "Open incident and assign on-call engineer",
-    ]
-
-    # If a Groq API is configured, call it to produce a concise answer + recommendations.
-    groq_key = os.environ.get("GROQ_API_KEY")
-    groq_model = os.environ.get("GROQ_MODEL", "llama-3.1-70b-versatile")  # default to a fast model
-    
-    # Validate API key (check if it's a placeholder)
-    if groq_key and (groq_key == "your-groq-api-key-here" or groq_key.strip() == ""):
-        groq_key = None
-
-    # Build evidence block for the prompt
-    evidence_lines = [f"[{t}] {txt}" for t, txt in top_docs[:12]]
-    system_prompt = (
-        "You are an incident-assistant for T-Mobile's Customer Happiness Index (CHI) system. "
-        "You help engineers understand customer sentiment, regional issues, and provide actionable recommendations. "
-        "Always respond with a JSON object containing two keys: \"summary\" (a concise answer to the question) "
-        "and \"recommendations\" (an array of 2-4 short, actionable recommendation strings). "
-        "Only return valid JSON, no additional text."
-    )
-    user_prompt = (
-        "Evidence from recent alerts, events, and CHI data:\n" + "\n".join(evidence_lines) + "\n\n"
-        f"Question: {question}\n\n"
-        "Provide your response as a JSON object with 'summary' and 'recommendations' keys."
-    )
-
-    if groq_key:
-        print(f"[Groq API] API key found, attempting to use Groq AI (model: {groq_model})")
-        try:
-            # Use Groq's OpenAI-compatible API endpoint
-            groq_url = "https://api.groq.com/openai/v1/chat/completions"
-            
-            headers = {
-                "Authorization": f"Bearer {groq_key}",
-                "Content-Type": "application/json"
-            }
-            
-            body = {
-                "model": groq_model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.2,
-                "max_tokens": 512,
-                "response_format": {"type": "json_object"}  # Request JSON response
-            }
-
-            resp = requests.post(groq_url, headers=headers, json=body, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Debug: Log successful API call
-            print(f"[Groq API] Successfully called Groq API with model: {groq_model}")
-
-            # Extract content from Groq's response format
-            text_out = None
-            if isinstance(data, dict) and "choices" in data:
-                choices = data["choices"]
-                if choices and isinstance(choices, list) and len(choices) > 0:
-                    choice = choices[0]
-                    if "message" in choice:
-                        text_out = choice["message"].get("content")
-                    elif "text" in choice:
-                        text_out = choice.get("text")
-
-            # Parse JSON from the model's response
-            summary_text = None
-            recommendations = []
-            if text_out:
-                try:
-                    # Try to extract JSON from the response (might be wrapped in markdown code blocks)
-                    text_clean = text_out.strip()
-                    if "```json" in text_clean:
-                        # Extract JSON from markdown code block
-                        start = text_clean.find("```json") + 7
-                        end = text_clean.find("```", start)
-                        if end > start:
-                            text_clean = text_clean[start:end].strip()
-                    elif "```" in text_clean:
-                        # Extract from generic code block
-                        start = text_clean.find("```") + 3
-                        end = text_clean.find("```", start)
-                        if end > start:
-                            text_clean = text_clean[start:end].strip()
-                    
-                    parsed = json.loads(text_clean)
-                    if isinstance(parsed, dict):
-                        summary_text = parsed.get("summary")
-                        recommendations = parsed.get("recommendations", [])
-                        if not isinstance(recommendations, list):
-                            recommendations = []
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, try to extract summary from text
-                    summary_text = text_out.strip()
-                    # Try to find recommendations in the text
-                    if "recommendations" in text_out.lower():
-                        # Fallback: use the full text as summary
-                        summary_text = text_out.strip()
-
-            result = {
-                "summary": summary_text or summary,
-                "recommendations": recommendations if recommendations else actions,
-                "drivers": drivers
-            }
-            return result
-        except requests.exceptions.RequestException as e:
-            # If the external call fails, fall back to retrieval-only response
-            error_msg = f"Groq API error: {str(e)}"
-            print(f"[Groq API ERROR] {error_msg}")
-            print(f"[Groq API ERROR] Response status: {getattr(e.response, 'status_code', 'N/A') if hasattr(e, 'response') else 'N/A'}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_detail = e.response.text[:200]
-                    print(f"[Groq API ERROR] Response body: {error_detail}")
-                except:
-                    pass
-            drivers["error"] = error_msg
-            return {"summary": summary, "drivers": drivers, "actions": actions, "recommendations": actions}
-        except Exception as e:
-            # Catch any other errors
-            error_msg = f"Groq call failed: {str(e)}"
-            print(f"[Groq API ERROR] {error_msg}")
-            import traceback
-            print(f"[Groq API ERROR] Traceback: {traceback.format_exc()}")
-            drivers["error"] = error_msg
-            return {"summary": summary, "drivers": drivers, "actions": actions, "recommendations": actions}
-    else:
-        print("[Groq API] No valid API key found, using fallback mode")
-
-    # No Groq configured — return the retrieval-only result
-    return {"summary": summary, "drivers": drivers, "actions": actions, "recommendations": actions}
-
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
-
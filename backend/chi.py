@@ -1,7 +1,7 @@
 from __future__ import annotations
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from sqlalchemy import select, func, desc
@@ -24,11 +24,11 @@ def _normalize_kpi(download_mbps: float, latency_ms: float) -> float:
     return float((dl + lt) / 2.0)
 
 
-def _volume_zscore(db: Session, region: str, window: timedelta) -> float:
+def _volume_zscore(db: Session, region: str, window: timedelta, now: Optional[datetime] = None) -> float:
     """
     Compute z-score for event volume in the given window vs the last 24h baseline for the region.
     """
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     start = now - window
     past_24h = now - timedelta(hours=24)
 
@@ -79,12 +79,14 @@ def _kudos_count(events: List[Event]) -> int:
     return int(sum(1 for e in events if (e.sentiment or 0) > 0.6))
 
 
-def compute_chi_for_region(db: Session, region: str, window_minutes: int = 15) -> Tuple[float, dict]:
+def compute_chi_for_region(
+    db: Session, region: str, window_minutes: int = 15, as_of: Optional[datetime] = None
+) -> Tuple[float, dict]:
     """
-    Compute CHI for a single region using the last `window_minutes`.
+    Compute CHI for a single region using the `window_minutes` before `as_of` (default now).
     Returns (chi_score, drivers_json)
     """
-    now = datetime.utcnow()
+    now = as_of or datetime.utcnow()
     start = now - timedelta(minutes=window_minutes)
     events: List[Event] = list(
         db.scalars(
@@ -100,12 +102,10 @@ def compute_chi_for_region(db: Session, region: str, window_minutes: int = 15) -
 
     # Volume factor V (not directly used in formula; used via zscore)
     # Compute KPI health K from latest KPI
-    kpi = db.scalars(
-        select(KPI)
-        .where(KPI.region == region)
-        .order_by(desc(KPI.ts))
-        .limit(1)
-    ).first()
+    kpi_query = select(KPI).where(KPI.region == region)
+    if as_of is not None:
+        kpi_query = kpi_query.where(KPI.ts <= as_of)
+    kpi = db.scalars(kpi_query.order_by(desc(KPI.ts)).limit(1)).first()
     if kpi is None:
         K = 0.5  # neutral if unknown
     else:
@@ -118,7 +118,7 @@ def compute_chi_for_region(db: Session, region: str, window_minutes: int = 15) -
     kudos = _kudos_count(events)
 
     # Spike penalty from z-score
-    z = _volume_zscore(db, region, timedelta(minutes=window_minutes))
+    z = _volume_zscore(db, region, timedelta(minutes=window_minutes), now)
 
     base = 50.0 + 50.0 * (0.55 * S + 0.25 * (K - 0.5) * 2.0 + 0.20 * (1.0 - T))
     boost = min(10.0, 5.0 * kudos)
@@ -143,15 +143,18 @@ def compute_chi_for_region(db: Session, region: str, window_minutes: int = 15) -
     return chi_score, drivers
 
 
-def recompute_and_store_chi(db: Session, regions: List[str], window_minutes: int = 15) -> List[CHI]:
+def recompute_and_store_chi(
+    db: Session, regions: List[str], window_minutes: int = 15, as_of: Optional[datetime] = None
+) -> List[CHI]:
     """
-    Recompute CHI for the given regions and store a new row for each region.
+    Recompute CHI for the given regions and store a new row for each region, stamped
+    `as_of` (default now; a past time scores the window before it, for backfills).
     Returns created CHI rows.
     """
-    now = datetime.utcnow()
+    now = as_of or datetime.utcnow()
     created: List[CHI] = []
     for region in regions:
-        score, drivers = compute_chi_for_region(db, region, window_minutes=window_minutes)
+        score, drivers = compute_chi_for_region(db, region, window_minutes=window_minutes, as_of=as_of)
         row = CHI(ts=now, region=region, score=score, drivers_json=drivers)
         db.add(row)
         created.append(row)
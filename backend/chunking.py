@@ -0,0 +1,111 @@
+"""
+Sentence-aware chunking bounded by the embedder's token limit.
+
+Chunks are built from whole sentences until the next one would exceed
+`max_tokens`; the trailing sentences (up to `overlap_tokens`) are carried into
+the next chunk. Sentences longer than the limit are split on word boundaries.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Callable, List, Optional
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+def approx_token_counts(texts: List[str]) -> List[int]:
+    # ~4 characters per token for English with WordPiece/SentencePiece vocabularies
+    return [max(1, (len(t) + 3) // 4) for t in texts]
+
+
+def tokenizer_counter(tokenizer: Any) -> TokenCounter:
+    """
+    Token counter backed by a Hugging Face tokenizer (no special tokens).
+    """
+
+    def count(texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        ids = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(x) for x in ids]
+
+    return count
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text or "") if s and s.strip()]
+
+
+def _split_long(sentence: str, max_tokens: int, count: TokenCounter) -> List[str]:
+    """
+    Halve an over-long sentence on word boundaries until every piece fits.
+    """
+    words = sentence.split()
+    if len(words) <= 1:
+        return [sentence]
+    mid = len(words) // 2
+    pieces = [" ".join(words[:mid]), " ".join(words[mid:])]
+    out: List[str] = []
+    for piece, n in zip(pieces, count(pieces)):
+        out.extend([piece] if n <= max_tokens else _split_long(piece, max_tokens, count))
+    return out
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = 480,
+    overlap_tokens: int = 48,
+    count_tokens: Optional[TokenCounter] = None,
+    max_chars: Optional[int] = None,
+) -> List[str]:
+    """
+    Split `text` into chunks of whole sentences that fit in `max_tokens`
+    (and `max_chars`, if given), overlapping by up to `overlap_tokens`.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    count = count_tokens or approx_token_counts
+    sentences = split_sentences(text)
+    lengths = count(sentences)
+    units: List[str] = []
+    unit_lengths: List[int] = []
+    for sentence, n in zip(sentences, lengths):
+        if n <= max_tokens and (max_chars is None or len(sentence) <= max_chars):
+            units.append(sentence)
+            unit_lengths.append(n)
+            continue
+        pieces = _split_long(sentence, max_tokens, count)
+        if max_chars is not None:
+            pieces = [p[i:i + max_chars] for p in pieces for i in range(0, len(p), max_chars)]
+        units.extend(pieces)
+        unit_lengths.extend(count(pieces))
+
+    chunks: List[str] = []
+    current: List[int] = []  # indices into units
+    tokens = 0
+    chars = 0
+    for i, n in enumerate(unit_lengths):
+        fits = tokens + n <= max_tokens and (max_chars is None or chars + len(units[i]) + 1 <= max_chars)
+        if current and not fits:
+            chunks.append(" ".join(units[j] for j in current))
+            # Carry trailing sentences into the next chunk as overlap
+            carry: List[int] = []
+            carried = 0
+            for j in reversed(current):
+                if carried + unit_lengths[j] > overlap_tokens:
+                    break
+                carry.insert(0, j)
+                carried += unit_lengths[j]
+            current = carry
+            tokens = carried
+            chars = sum(len(units[j]) + 1 for j in carry)
+            if current and (tokens + n > max_tokens or (max_chars is not None and chars + len(units[i]) + 1 > max_chars)):
+                current, tokens, chars = [], 0, 0
+        current.append(i)
+        tokens += n
+        chars += len(units[i]) + 1
+    if current:
+        chunks.append(" ".join(units[j] for j in current))
+    return chunks
@@ -0,0 +1,118 @@
+"""
+Near-duplicate detection with 64-bit SimHash.
+
+Texts whose fingerprints differ in at most `max_distance` bits are treated as
+duplicates. Fingerprints are split into `max_distance + 1` bands, so any two
+near-duplicates share at least one band exactly and only same-band candidates
+are compared (no all-pairs scan). dedup_records only compares records that
+share region and issue_type, so no record's filter metadata is lost.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1").lower() not in ("0", "false", "no")
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_BITS = 64
+
+
+def _features(text: str) -> List[str]:
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    # Words plus word bigrams, so reordering matters a little but not much
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def simhash(text: str) -> int:
+    weights = [0] * _BITS
+    for feat in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    fp = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            fp |= 1 << bit
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """
+    Incremental SimHash index: `add` returns the key of an earlier near-duplicate, or None.
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE) -> None:
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = _BITS // self.bands
+        self._tables: List[Dict[int, List[Tuple[int, Any]]]] = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, fp: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        keys = []
+        for b in range(self.bands):
+            shift = b * self.band_bits
+            # The last band takes the remaining high bits
+            width_mask = mask if b < self.bands - 1 else (1 << (_BITS - shift)) - 1
+            keys.append((fp >> shift) & width_mask)
+        return keys
+
+    def find(self, fp: int) -> Optional[Any]:
+        for table, key in zip(self._tables, self._band_keys(fp)):
+            for other_fp, other_key in table.get(key, ()):
+                if hamming(fp, other_fp) <= self.max_distance:
+                    return other_key
+        return None
+
+    def add(self, fp: int, key: Any) -> Optional[Any]:
+        dup = self.find(fp)
+        if dup is not None:
+            return dup
+        for table, band in zip(self._tables, self._band_keys(fp)):
+            table.setdefault(band, []).append((fp, key))
+        return None
+
+
+# Metadata that retrieval filters on; records differing in these are never merged
+DEDUP_GROUP_FIELDS = ("region", "issue_type")
+
+
+def _filter_group(rec: Any) -> Tuple[str, ...]:
+    meta = (rec.get("metadata") or rec) if isinstance(rec, dict) else {}
+    return tuple(str(meta.get(f) or "").strip().lower() for f in DEDUP_GROUP_FIELDS)
+
+
+def dedup_records(
+    records: Sequence[Any],
+    text_of: Callable[[Any], str] = lambda r: r.get("text") or "",
+    max_distance: int = DEDUP_MAX_DISTANCE,
+    group_of: Callable[[Any], Any] = _filter_group,
+) -> Tuple[List[Any], int]:
+    """
+    Keep the first of each group of near-duplicate records. Returns (kept, dropped_count).
+    Only records in the same `group_of` group (default: region and issue_type) are
+    compared, so the same text from two regions keeps both records' metadata.
+    """
+    if not DEDUP_ENABLED:
+        return list(records), 0
+    indexes: Dict[Any, NearDuplicateIndex] = {}
+    kept: List[Any] = []
+    for i, rec in enumerate(records):
+        text = text_of(rec)
+        if not text.strip():
+            kept.append(rec)
+            continue
+        group = group_of(rec)
+        index = indexes.get(group)
+        if index is None:
+            index = indexes[group] = NearDuplicateIndex(max_distance)
+        if index.add(simhash(text), i) is None:
+            kept.append(rec)
+    return kept, len(records) - len(kept)
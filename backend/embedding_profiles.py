@@ -0,0 +1,90 @@
+"""
+Embedding profiles: which model to load, how to load it, and which Pinecone
+index holds vectors of the matching dimension.
+
+Select with EMBEDDINGS_PROFILE (default "e5-large"). Setting EMBEDDINGS_MODEL
+still works and overrides the model name of the selected profile.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Optional
+
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Reference model, full precision
+    "e5-large": {"model": "intfloat/multilingual-e5-large", "dim": 1024, "backend": "torch", "quantize": None},
+    # Same vector space as e5-large (same index); Linear layers quantized to int8 on CPU
+    "e5-large-int8": {"model": "intfloat/multilingual-e5-large", "dim": 1024, "backend": "torch", "quantize": "int8"},
+    # ONNX Runtime export of e5-large; needs sentence-transformers>=3.2 and optimum[onnxruntime]
+    "e5-large-onnx": {"model": "intfloat/multilingual-e5-large", "dim": 1024, "backend": "onnx", "quantize": None},
+    # Smaller variants have their own vector space, so they use their own index
+    "e5-base": {"model": "intfloat/multilingual-e5-base", "dim": 768, "backend": "torch", "quantize": None, "index_suffix": "e5-base"},
+    "e5-small": {"model": "intfloat/multilingual-e5-small", "dim": 384, "backend": "torch", "quantize": None, "index_suffix": "e5-small"},
+}
+
+DEFAULT_PROFILE = "e5-large"
+
+
+def get_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resolve a profile by name (or EMBEDDINGS_PROFILE). Returns a copy with a "name" key.
+    """
+    name = name or os.getenv("EMBEDDINGS_PROFILE", DEFAULT_PROFILE)
+    if name not in PROFILES:
+        raise RuntimeError(f"Unknown EMBEDDINGS_PROFILE '{name}'. Available: {', '.join(PROFILES)}")
+    profile = dict(PROFILES[name])
+    profile["name"] = name
+    override = os.getenv("EMBEDDINGS_MODEL")
+    if override and name == os.getenv("EMBEDDINGS_PROFILE", DEFAULT_PROFILE):
+        profile["model"] = override
+    return profile
+
+
+def index_name_for(profile: Dict[str, Any]) -> str:
+    """
+    Pinecone index for a profile: PINECONE_INDEX, suffixed for profiles whose
+    dimension differs from the reference model.
+    """
+    base = os.getenv("PINECONE_INDEX", "t-mobile")
+    suffix = profile.get("index_suffix")
+    return f"{base}-{suffix}" if suffix else base
+
+
+def query_prefix(profile: Dict[str, Any]) -> str:
+    # E5 models expect "query: " for queries and "passage: " for documents
+    return "query: " if "e5" in profile["model"].lower() else ""
+
+
+def passage_prefix(profile: Dict[str, Any]) -> str:
+    return "passage: " if "e5" in profile["model"].lower() else ""
+
+
+def load_model(profile: Dict[str, Any]) -> Any:
+    """
+    Load a SentenceTransformer for the profile.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if profile["backend"] == "onnx":
+        try:
+            return SentenceTransformer(profile["model"], backend="onnx")
+        except TypeError:
+            raise RuntimeError(
+                "The ONNX profile needs sentence-transformers>=3.2. Run: "
+                "pip install -U 'sentence-transformers[onnx]'"
+            )
+    model = SentenceTransformer(profile["model"], device="cpu" if profile.get("quantize") else None)
+    if profile.get("quantize") == "int8":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def load_tokenizer(profile: Dict[str, Any]) -> Any:
+    """
+    Load only the Hugging Face tokenizer of the profile's model (no weights).
+    """
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(profile["model"])
@@ -0,0 +1,114 @@
+"""
+Micro-batching scheduler for embedding requests.
+
+Concurrent callers each submit a handful of texts; a single worker thread
+collects whatever arrives within a short window and runs one batched
+forward pass, then hands each caller its own rows back.
+"""
+from __future__ import annotations
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent encode requests into batched calls of `encode_fn`.
+    `encode_fn` takes a list of strings and returns an (n, dim) array.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Any],
+        max_batch: int = EMBED_BATCH_MAX,
+        max_wait_ms: float = EMBED_BATCH_WAIT_MS,
+    ) -> None:
+        self._encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Counters for /embed stats and benchmarks
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """
+        Queue `texts` for encoding. The returned future resolves to an (n, dim) array.
+        """
+        fut: Future = Future()
+        texts = list(texts)
+        if not texts:
+            fut.set_result(np.zeros((0, 0), dtype=np.float32))
+            return fut
+        self._ensure_worker()
+        self._queue.put((texts, fut))
+        return fut
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(texts).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            flat: List[str] = [t for texts, _ in pending for t in texts]
+            try:
+                vectors = np.asarray(self._encode_fn(flat))
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(pending)
+            self.texts += len(flat)
+            offset = 0
+            for texts, fut in pending:
+                if not fut.done():
+                    fut.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
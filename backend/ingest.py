@@ -2,7 +2,7 @@ from __future__ import annotations
 import argparse
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 from sqlalchemy import select
@@ -10,7 +10,7 @@ from sqlalchemy.orm import Session
 
 from .database import init_db, SessionLocal
 from .models import Source, Event, KPI, Runbook
-from .utils import clean_text, compute_sentiment, extract_keywords_texts
+from .utils import clean_text, compute_sentiment, extract_keywords_texts, classify_topic_from_keywords
 
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
@@ -30,6 +30,55 @@ def _source_id(db: Session, name: str) -> Optional[int]:
     return row.id if row else None
 
 
+def ingest_events(db: Session, records: List[Dict[str, Any]], commit: bool = True) -> List[Event]:
+    """
+    Live ingest path for events (used by POST /ingest and the scenario engine).
+    Each record has region and text, optionally ts (datetime or ISO string), source_id and rating.
+    """
+    created: List[Event] = []
+    for rec in records:
+        ts = rec.get("ts")
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        text_clean = clean_text(rec.get("text") or "")
+        sentiment = compute_sentiment(text_clean)
+        keywords_list = extract_keywords_texts([text_clean], top_k=5)
+        keywords = keywords_list[0] if keywords_list else []
+        e = Event(
+            ts=ts or datetime.utcnow(),
+            region=rec["region"],
+            source_id=rec.get("source_id"),
+            text=text_clean,
+            rating=rec.get("rating"),
+            keywords=keywords,
+            sentiment=sentiment,
+            topic=classify_topic_from_keywords(keywords),
+        )
+        db.add(e)
+        created.append(e)
+    if commit and created:
+        db.commit()
+    return created
+
+
+def ingest_kpis(db: Session, records: List[Dict[str, Any]], commit: bool = True) -> int:
+    """
+    Store KPI samples: region, download_mbps, latency_ms and optionally ts.
+    """
+    for rec in records:
+        db.add(
+            KPI(
+                ts=rec.get("ts") or datetime.utcnow(),
+                region=rec["region"],
+                download_mbps=float(rec["download_mbps"]),
+                latency_ms=float(rec["latency_ms"]),
+            )
+        )
+    if commit and records:
+        db.commit()
+    return len(records)
+
+
 def seed_events(db: Session) -> int:
     csv = DATA_DIR / "events_seed.csv"
     if not csv.exists():
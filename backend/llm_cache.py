@@ -0,0 +1,350 @@
+"""
+SQLite-backed cache of LLM responses.
+
+Exact tier: key = sha256(model + system prompt + whitespace-normalized user
+prompt), so a call whose full context is unchanged is answered from disk.
+
+Semantic tier (off by default, LLM_CACHE_SEMANTIC=1): for Q&A callers that pass the
+user's question and a data snapshot id, a previous answer is reused when the
+question embedding is within LLM_CACHE_SIM_THRESHOLD cosine similarity, the
+snapshot (DB row high-water marks + vector index version) is the same, and the
+prompt minus the question (the retrieved, region-filtered context) is identical,
+so a paraphrase reuses an answer but a question about another region does not.
+The question is only embedded once dense retrieval has loaded the embedding
+model; a lookup never loads it, so keyword questions answered from the sparse
+index stay embedding-free.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0").lower() not in ("0", "false", "no")
+LLM_CACHE_SIM_THRESHOLD = float(os.getenv("LLM_CACHE_SIM_THRESHOLD", "0.95"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    system_hash TEXT NOT NULL,
+    scope TEXT,
+    snapshot TEXT,
+    context_hash TEXT,
+    question TEXT,
+    embedding BLOB,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WS_RE.sub(" ", (text or "").strip())
+
+
+def _sha(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def cache_key(model: str, system: str, prompt: str) -> str:
+    return _sha(model, _normalize(system), _normalize(prompt))
+
+
+def context_hash(prompt: str, question: str) -> str:
+    """
+    Hash of the prompt with the question removed, i.e. of the context the answer was grounded on.
+    """
+    return _sha(_normalize(prompt).replace(_normalize(question), "", 1))
+
+
+def _embed_question(question: str) -> Optional[np.ndarray]:
+    try:
+        from . import vectorstore
+        if vectorstore._embedder is None:
+            # Loading e5 costs more than the LLM call the cache would save
+            return None
+        return np.asarray(vectorstore.embed_queries([question.strip().lower()])[0], dtype=np.float32)
+    except Exception as e:
+        print(f"[DEBUG] LLM cache: semantic tier unavailable ({e})")
+        return None
+
+
+def data_snapshot(db: Any = None) -> str:
+    """
+    Identifier of the data an answer was grounded on: latest Event/CHI/Alert ids
+    and the vector index version of this process.
+    """
+    parts: List[str] = []
+    if db is not None:
+        try:
+            from sqlalchemy import func, select
+            from .models import Alert, CHI, Event
+            for model in (Event, CHI, Alert):
+                parts.append(str(db.scalar(select(func.max(model.id))) or 0))
+        except Exception:
+            pass
+    try:
+        from . import vectorstore
+        parts.append(f"v{vectorstore._index_version}")
+    except Exception:
+        pass
+    return "-".join(parts)
+
+
+class LLMCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.stats_counts = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(llm_cache)")}
+            if "context_hash" not in columns:
+                conn.execute("ALTER TABLE llm_cache ADD COLUMN context_hash TEXT")
+            conn.execute("DROP INDEX IF EXISTS ix_llm_cache_semantic")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_context "
+                "ON llm_cache (scope, snapshot, context_hash, model, system_hash)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats_counts[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE llm_cache SET hits = hits + 1 WHERE key = ?", (key,))
+        return row[0]
+
+    def get_similar(self, model: str, system: str, question: str, scope: str, snapshot: str,
+                    context: str, embedding: Optional[np.ndarray] = None) -> Optional[str]:
+        vec = embedding if embedding is not None else _embed_question(question)
+        if vec is None:
+            return None
+        rows = self._conn().execute(
+            "SELECT key, embedding, response FROM llm_cache "
+            "WHERE scope = ? AND snapshot = ? AND context_hash = ? AND model = ? AND system_hash = ? "
+            "AND embedding IS NOT NULL AND created_at >= ?",
+            (scope, snapshot, context, model, _sha(_normalize(system)), time.time() - self.ttl),
+        ).fetchall()
+        if not rows:
+            return None
+        mat = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+        if mat.shape[1] != vec.shape[0]:
+            return None
+        sims = mat @ vec
+        best = int(np.argmax(sims))
+        if float(sims[best]) < LLM_CACHE_SIM_THRESHOLD:
+            return None
+        print(f"[DEBUG] LLM cache: semantic hit (similarity {float(sims[best]):.3f})")
+        return rows[best][2]
+
+    def put(self, key: str, model: str, system: str, response: str, question: Optional[str] = None,
+            scope: Optional[str] = None, snapshot: Optional[str] = None, embedding: Optional[np.ndarray] = None,
+            context: Optional[str] = None) -> None:
+        blob = embedding.astype(np.float32).tobytes() if embedding is not None else None
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, system_hash, scope, snapshot, context_hash, question, embedding, response, created_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, _sha(_normalize(system)), scope, snapshot, context, question, blob, response, time.time()),
+            )
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % 100 == 0
+        if prune:
+            with conn:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            out: Dict[str, Any] = dict(self.stats_counts)
+        out.update({"entries": total, "ttl_s": self.ttl, "path": self.path, "semantic": LLM_CACHE_SEMANTIC})
+        return out
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache()
+            except Exception as e:
+                print(f"[DEBUG] LLM cache disabled: {e}")
+                return None
+        return _cache
+
+
+def _lookup(cache: LLMCache, key: str, model: str, system: str, question: Optional[str],
+            scope: Optional[str], snapshot: Optional[str], context: Optional[str]) -> tuple:
+    hit = cache.get(key)
+    if hit is not None:
+        cache._count("exact_hits")
+        return hit, None
+    embedding = None
+    if LLM_CACHE_SEMANTIC and question and scope and snapshot:
+        embedding = _embed_question(question)
+        if embedding is not None:
+            hit = cache.get_similar(model, system, question, scope, snapshot, context, embedding)
+            if hit is not None:
+                cache._count("semantic_hits")
+                return hit, embedding
+    cache._count("misses")
+    return None, embedding
+
+
+def cached_completion(
+    model: str,
+    system: str,
+    prompt: str,
+    compute: Callable[[], Optional[str]],
+    question: Optional[str] = None,
+    scope: Optional[str] = None,
+    snapshot: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Return the cached response for this prompt, or call `compute` (the LLM) and store
+    its non-empty result. Pass question/scope/snapshot to enable the semantic tier.
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    key = cache_key(model, system, prompt)
+    context = context_hash(prompt, question) if question else None
+    try:
+        hit, embedding = _lookup(cache, key, model, system, question, scope, snapshot, context)
+    except Exception as e:
+        print(f"[DEBUG] LLM cache lookup failed: {e}")
+        hit, embedding = None, None
+    if hit is not None:
+        return hit
+    response = compute()
+    if response and response.strip():
+        try:
+            cache.put(key, model, system, response, question, scope, snapshot, embedding, context)
+        except Exception as e:
+            print(f"[DEBUG] LLM cache store failed: {e}")
+    return response
+
+
+async def acached_completion(
+    model: str,
+    system: str,
+    prompt: str,
+    compute: Callable[[], Awaitable[Optional[str]]],
+    question: Optional[str] = None,
+    scope: Optional[str] = None,
+    snapshot: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Async variant of cached_completion; cache I/O runs in a worker thread.
+    """
+    cache = get_cache()
+    if cache is None:
+        return await compute()
+    key = cache_key(model, system, prompt)
+    context = context_hash(prompt, question) if question else None
+    try:
+        hit, embedding = await asyncio.to_thread(
+            _lookup, cache, key, model, system, question, scope, snapshot, context
+        )
+    except Exception as e:
+        print(f"[DEBUG] LLM cache lookup failed: {e}")
+        hit, embedding = None, None
+    if hit is not None:
+        return hit
+    response = await compute()
+    if response and response.strip():
+        try:
+            await asyncio.to_thread(cache.put, key, model, system, response, question, scope, snapshot, embedding, context)
+        except Exception as e:
+            print(f"[DEBUG] LLM cache store failed: {e}")
+    return response
+
+
+def cache_stats() -> Dict[str, Any]:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def cached_stream(
+    model: str,
+    system: str,
+    prompt: str,
+    stream: Callable[[], Iterator[str]],
+    question: Optional[str] = None,
+    scope: Optional[str] = None,
+    snapshot: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Streaming variant of cached_completion: a cached response is yielded as one
+    chunk, otherwise the chunks of `stream()` are passed through and the joined
+    text is stored once the stream completes.
+    """
+    cache = get_cache()
+    if cache is None:
+        yield from stream()
+        return
+    key = cache_key(model, system, prompt)
+    context = context_hash(prompt, question) if question else None
+    try:
+        hit, embedding = _lookup(cache, key, model, system, question, scope, snapshot, context)
+    except Exception as e:
+        print(f"[DEBUG] LLM cache lookup failed: {e}")
+        hit, embedding = None, None
+    if hit is not None:
+        yield hit
+        return
+    parts: List[str] = []
+    for chunk in stream():
+        parts.append(chunk)
+        yield chunk
+    response = "".join(parts)
+    if response.strip():
+        try:
+            cache.put(key, model, system, response, question, scope, snapshot, embedding, context)
+        except Exception as e:
+            print(f"[DEBUG] LLM cache store failed: {e}")
@@ -1,17 +1,174 @@
 """
 GROQ LLM client helper.
+
+All LLM traffic goes through one pooled HTTP client per process (keep-alive,
+HTTP/2 when `h2` is installed), so calls reuse warm TLS connections instead of
+handshaking per request. Sync callers share one httpx.Client; async callers get
+one httpx.AsyncClient per event loop. Both are bounded by LLM_MAX_CONCURRENCY,
+and so are Groq SDK calls made through chat_completion().
 """
+from __future__ import annotations
+import asyncio
 import os
-from groq import Groq
+import threading
+import weakref
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+
+try:
+    from groq import Groq
+except ImportError:  # raw chat-completions calls still work without the SDK
+    Groq = None  # type: ignore
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_groq_client: Optional[Any] = None
+_sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+# Async clients and semaphores are bound to the loop they were created on
+_async_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "1").lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout(read: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(read or LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+def _api_key(api_key: Optional[str] = None) -> str:
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY not set. Please set it in your .env file or export it.")
+    return api_key
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Process-wide pooled sync HTTP client.
+    """
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(http2=_http2_enabled(), limits=_limits(), timeout=_timeout())
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Pooled async HTTP client for the running event loop.
+    """
+    state = _loop_state()
+    client = state.get("http")
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(http2=_http2_enabled(), limits=_limits(), timeout=_timeout())
+        state["http"] = client
+    return client
+
+
+def _loop_state() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    state = _async_state.get(loop)
+    if state is None:
+        state = {"slots": asyncio.Semaphore(LLM_MAX_CONCURRENCY)}
+        _async_state[loop] = state
+    return state
 
 
 def get_groq_client():
     """
     Get GROQ client instance.
-    Does not accept proxies parameter - just API key.
+    Does not accept proxies parameter - just API key. The client is cached and
+    shares the pooled HTTP connection.
     """
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise RuntimeError("GROQ_API_KEY not set. Please set it in your .env file or export it.")
-    return Groq(api_key=api_key)
+    global _groq_client
+    api_key = _api_key()
+    if Groq is None:
+        raise ImportError("groq library not installed. Run: pip install groq")
+    http_client = get_http_client()
+    with _lock:
+        if _groq_client is None or _groq_client.api_key != api_key:
+            _groq_client = Groq(api_key=api_key, http_client=http_client)
+        return _groq_client
+
+
+def chat_completion(client: Any, **kwargs: Any) -> Any:
+    """
+    client.chat.completions.create(**kwargs) under the same LLM_MAX_CONCURRENCY
+    slots as post_chat_completion. With stream=True the slot is held until the
+    returned stream is exhausted or closed.
+    """
+    if kwargs.get("stream"):
+        return _slotted_stream(client, kwargs)
+    with _sync_slots:
+        return client.chat.completions.create(**kwargs)
+
+
+def _slotted_stream(client: Any, kwargs: Dict[str, Any]) -> Iterator[Any]:
+    with _sync_slots:
+        yield from client.chat.completions.create(**kwargs)
+
+
+def _headers(api_key: Optional[str]) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {_api_key(api_key)}", "Content-Type": "application/json"}
 
+
+def post_chat_completion(body: Dict[str, Any], api_key: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    POST an OpenAI-compatible chat completion to Groq over the pooled client.
+    Raises httpx.HTTPError on transport or HTTP status errors.
+    """
+    with _sync_slots:
+        resp = get_http_client().post(
+            f"{GROQ_BASE_URL}/chat/completions", headers=_headers(api_key), json=body, timeout=_timeout(timeout)
+        )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def apost_chat_completion(body: Dict[str, Any], api_key: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Async variant of post_chat_completion, limited to LLM_MAX_CONCURRENCY in flight per loop.
+    """
+    state = _loop_state()
+    async with state["slots"]:
+        resp = await get_async_http_client().post(
+            f"{GROQ_BASE_URL}/chat/completions", headers=_headers(api_key), json=body, timeout=_timeout(timeout)
+        )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def close_clients() -> None:
+    """
+    Close the pooled sync client (async clients close with their event loop).
+    """
+    global _http_client, _groq_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _groq_client = None
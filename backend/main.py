@@ -1,38 +1,31 @@
 from __future__ import annotations
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-<<<<<<< HEAD
+from typing import List, Optional, Dict, Any, Tuple
 
 from fastapi import FastAPI, Depends, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-=======
-from pathlib import Path
-
-from fastapi import FastAPI, Depends, Query
-from fastapi.responses import JSONResponse
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 from pydantic import BaseModel
 from sqlalchemy import select, desc, text
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from .database import init_db, get_db
-<<<<<<< HEAD
-=======
-
-# Load environment variables from .env file at startup
-env_path = Path(__file__).resolve().parent.parent / ".env"
-load_dotenv(env_path)
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
+from .database import init_db, get_db, SessionLocal
 from .models import Event, KPI, CHI, Alert
-from .ingest import ensure_sources
+from .ingest import ensure_sources, ingest_events
+from .warmup import start_warmup, readiness
+from .dedup import dedup_records
+from .llm_client import close_clients as close_llm_clients
 from .chi import recompute_and_store_chi, compute_chi_for_region
-from .alerts import generate_alerts_for_regions
+from .alerts import generate_alerts_for_regions, incident_payload
+from .alert_rules import get_rule_engine, reload_rule_engine
+from .anomaly import get_detector
 from .simulator import simulate_outage
-<<<<<<< HEAD
-from .chatbot import answer_question, generate_alert_recommendations
+from .scenarios import ScenarioSpec, run_scenario
+from .chatbot import answer_question, generate_alert_recommendations, stream_answer
+from .streaming import SSE_HEADERS, sse_stream
 from .predict import forecast_chi
+from .alert_recommendations import claim_alert_ai, stored_ai_payload
 from .api_chat import router as chat_router
 from .ingest import main as ingest_main
 from .utils import clean_text, compute_sentiment, extract_keywords_texts, classify_topic_from_keywords
@@ -58,17 +51,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-=======
-from .chatbot import answer_question
-from .predict import forecast_chi
-from .alert_recommendations import generate_ai_recommendations_for_alert, generate_detailed_analysis_for_alert
-from .ingest import main as ingest_main
-from .utils import clean_text, compute_sentiment, extract_keywords_texts, classify_topic_from_keywords
-from .ingest import seed_events, seed_kpis, seed_runbook, ensure_sources
-
-
-app = FastAPI(title="T-Mobile CHI MVP", version="0.1.0")
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 
 
 class IngestEvent(BaseModel):
@@ -90,7 +72,6 @@ class QARequest(BaseModel):
     question: str
 
 
-<<<<<<< HEAD
 class IngestDocsRequest(BaseModel):
     documents: List[str]
     namespace: Optional[str] = "default"
@@ -101,6 +82,9 @@ class IngestReviewsRequest(BaseModel):
     to_db: bool = True
     namespace: Optional[str] = "default"
 
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
 @app.on_event("startup")
 def startup() -> None:
     # Load .env from project root (one level up from backend/)
@@ -109,51 +93,43 @@ def startup() -> None:
     load_dotenv(dotenv_path=env_path, override=True)
     # Also try loading from current directory
     load_dotenv(override=False)
-=======
-@app.on_event("startup")
-def startup() -> None:
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
     init_db()
     # ensure default sources exist
     with next(get_db()) as db:
         ensure_sources(db)
+    # Load the embedder and Pinecone index in the background; see /health/ready
+    start_warmup()
+    # Alerts left "pending" by a previous process would otherwise never get AI output
+    try:
+        from .alert_recommendations import requeue_pending_alert_ai
+        requeue_pending_alert_ai()
+    except Exception as e:
+        print(f"[Alert AI] Could not requeue pending alerts: {e}")
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    close_llm_clients()
 
-<<<<<<< HEAD
 try:
-    from .vectorstore import upsert_texts, upsert_items, chunk_text, query_text
+    from .vectorstore import upsert_texts, upsert_items, chunk_text, query_text, embed_queries, _query_batcher
 except Exception:
     upsert_texts = None  # type: ignore
     upsert_items = None  # type: ignore
     chunk_text = None  # type: ignore
     query_text = None  # type: ignore
+    embed_queries = None  # type: ignore
+    _query_batcher = None  # type: ignore
 
-=======
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 
 @app.post("/ingest")
 def ingest_event(payload: IngestEvent, db: Session = Depends(get_db)) -> dict:
-    ts = datetime.fromisoformat(payload.ts) if payload.ts else datetime.utcnow()
-    text_clean = clean_text(payload.text or "")
-    sentiment = compute_sentiment(text_clean)
-    keywords_list = extract_keywords_texts([text_clean], top_k=5)
-    keywords = keywords_list[0] if keywords_list else []
-    topic = classify_topic_from_keywords(keywords)
-    e = Event(
-        ts=ts,
-        region=payload.region,
-        source_id=None,
-        text=text_clean,
-        rating=payload.rating,
-        keywords=keywords,
-        sentiment=sentiment,
-        topic=topic,
-    )
-    db.add(e)
-    db.commit()
+    e = ingest_events(
+        db, [{"ts": payload.ts, "region": payload.region, "text": payload.text, "rating": payload.rating}]
+    )[0]
     return {"status": "ok", "id": e.id}
 
 
-<<<<<<< HEAD
 @app.post("/ingest_docs")
 def ingest_docs(payload: IngestDocsRequest) -> dict:
     if upsert_texts is None:
@@ -167,6 +143,22 @@ def ingest_docs(payload: IngestDocsRequest) -> dict:
     except Exception as e:
         return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
+@app.post("/embed")
+def embed(payload: EmbedRequest) -> dict:
+    """
+    Embed query strings. Concurrent calls are micro-batched into a single forward pass.
+    """
+    if embed_queries is None:
+        return {"status": "error", "message": "Vector store not available"}
+    texts = [t for t in (payload.texts or []) if (t or "").strip()]
+    if not texts:
+        return {"status": "error", "message": "No texts provided"}
+    try:
+        vectors = embed_queries(texts)
+        return {"status": "ok", "dimension": len(vectors[0]), "vectors": vectors, "batcher": _query_batcher.stats()}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
 @app.post("/ingest_reviews")
 def ingest_reviews(payload: IngestReviewsRequest, db: Session = Depends(get_db)) -> dict:
     """
@@ -195,17 +187,23 @@ def ingest_reviews(payload: IngestReviewsRequest, db: Session = Depends(get_db))
     if not records:
         return {"status": "error", "message": "No valid records found in file"}
     upserted_vectors = 0
+    duplicates_skipped = 0
     regions_changed: List[str] = []
     # Upsert to Pinecone
     if payload.to_pinecone:
         if upsert_items is None or chunk_text is None:
             return {"status": "error", "message": "Vector store not available"}
+        # Near-duplicate reviews (common in synthetic/social feeds) are embedded once
+        unique_records, dup_reviews = dedup_records(records)
         items = []
-        for rec in records:
+        for rec in unique_records:
             text = (rec.get("text") or "").strip()
             metadata = rec.get("metadata") or {}
-            for chunk in chunk_text(text, chunk_size=800, overlap=120):
+            for chunk in chunk_text(text, overlap=120):
                 items.append({"text": chunk, "metadata": metadata})
+        items, dup_chunks = dedup_records(items)
+        duplicates_skipped = dup_reviews + dup_chunks
+        print(f"[DEBUG] Dedup skipped {dup_reviews} reviews and {dup_chunks} chunks before embedding")
         if items:
             upserted_vectors = upsert_items(items, namespace=payload.namespace or "default")
     # Insert into DB as Events and recompute CHI
@@ -238,6 +236,7 @@ def ingest_reviews(payload: IngestReviewsRequest, db: Session = Depends(get_db))
     return {
         "status": "ok",
         "vectors_upserted": upserted_vectors,
+        "duplicates_skipped": duplicates_skipped,
         "regions_updated": regions_changed,
         "count_records": len(records),
     }
@@ -266,8 +265,6 @@ def get_sentiment_overall(hours: int = Query(24), db: Session = Depends(get_db))
     score = (avg + 1.0) * 50.0  # map [-1,1] -> [0,100]
     return {"score": round(score, 1), "samples": len(vals), "window_hours": hours}
 
-=======
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 @app.get("/chi")
 def get_chi(region: str = Query(...), db: Session = Depends(get_db)) -> dict:
     # If we have a recent CHI (<=5 minutes), return it; otherwise recompute
@@ -311,17 +308,18 @@ def get_regions_summary(db: Session = Depends(get_db)) -> dict:
 
 
 @app.get("/alerts")
-<<<<<<< HEAD
 def get_alerts(
     region: Optional[str] = Query(None),
     start: Optional[str] = Query(None, description="ISO datetime, e.g. 2025-11-09T00:00:00"),
     end: Optional[str] = Query(None, description="ISO datetime"),
+    include_ai_recommendations: bool = Query(False),
     db: Session = Depends(get_db),
 ) -> dict:
     """
     Return recent alerts. Optional filters:
     - region: filter by region name
     - start, end: ISO datetimes to bound by ts
+    - include_ai_recommendations: add the stored AI analysis of each alert
     """
     conditions = []
     if region:
@@ -343,24 +341,10 @@ def get_alerts(
         query = query.where(*conditions)
     query = query.order_by(desc(Alert.ts)).limit(200)
     rows = list(db.scalars(query))
-    return {
-        "alerts": [
-            {
-                "id": a.id,
-                "ts": a.ts.isoformat(),
-                "region": a.region,
-                "chi_before": a.chi_before,
-                "chi_after": a.chi_after,
-                "reason": a.reason,
-                "recommendation": a.recommendation,
-            }
-            for a in rows
-        ]
-=======
-def get_alerts(db: Session = Depends(get_db), include_ai_recommendations: bool = Query(False)) -> dict:
-    rows = list(
-        db.scalars(select(Alert).order_by(desc(Alert.ts)).limit(50))
-    )
+    if include_ai_recommendations:
+        # AI output is generated in the background when an alert is created and served
+        # from the row; older alerts and stale pending runs are queued, never generated inline
+        claim_alert_ai(db, rows)
     alerts_list = []
     for a in rows:
         alert_dict = {
@@ -371,15 +355,11 @@ def get_alerts(db: Session = Depends(get_db), include_ai_recommendations: bool =
             "chi_after": a.chi_after,
             "reason": a.reason,
             "recommendation": a.recommendation,
+            **incident_payload(a),
         }
-        
-        # Generate AI recommendations if requested
         if include_ai_recommendations:
-            ai_recommendations = generate_ai_recommendations_for_alert(db, a)
-            alert_dict["ai_recommendations"] = ai_recommendations
-        
+            alert_dict.update(stored_ai_payload(a))
         alerts_list.append(alert_dict)
-    
     return {"alerts": alerts_list}
 
 
@@ -387,12 +367,29 @@ def get_alerts(db: Session = Depends(get_db), include_ai_recommendations: bool =
 def get_alert_analysis(alert_id: int, db: Session = Depends(get_db)) -> dict:
     """
     Get detailed AI analysis for a specific alert.
+    Only the stored analysis is served; missing or failed ones are queued for the
+    background worker (with retry backoff), never generated inside the request.
     """
     alert = db.scalars(select(Alert).where(Alert.id == alert_id)).first()
     if not alert:
         return JSONResponse(status_code=404, content={"error": "Alert not found"})
     
-    analysis = generate_detailed_analysis_for_alert(db, alert)
+    claim_alert_ai(db, [alert])
+    if alert.ai_analysis:
+        analysis = alert.ai_analysis
+    else:
+        if alert.ai_status == "pending":
+            message = "AI analysis is being generated. Please check back shortly."
+        elif alert.ai_status == "unavailable":
+            message = "AI analysis is unavailable: no Groq API key is configured."
+        else:
+            message = "AI analysis could not be generated yet; it will be retried automatically."
+        analysis = {
+            "analysis": message,
+            "recommendations": [],
+            "root_causes": [],
+            "impact_assessment": "",
+        }
     return {
         "alert_id": alert_id,
         "region": alert.region,
@@ -400,8 +397,8 @@ def get_alert_analysis(alert_id: int, db: Session = Depends(get_db)) -> dict:
         "chi_before": alert.chi_before,
         "chi_after": alert.chi_after,
         "reason": alert.reason,
+        **stored_ai_payload(alert),
         **analysis
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
     }
 
 
@@ -420,31 +417,107 @@ def post_simulate(payload: SimulateRequest, db: Session = Depends(get_db)) -> di
     return {"status": "ok", "alerts_created": len(alerts)}
 
 
+@app.post("/scenarios/run")
+def post_scenario_run(spec: ScenarioSpec, db: Session = Depends(get_db)) -> dict:
+    """
+    Run a seeded multi-region scenario through ingest, CHI recompute and alerting.
+    Blocks until the scenario finishes and returns throughput metrics.
+    """
+    try:
+        return {"status": "ok", "metrics": run_scenario(db, spec)}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+
+@app.get("/incidents")
+def get_incidents(region: Optional[str] = Query(None), db: Session = Depends(get_db)) -> dict:
+    """
+    Open incidents (grouped alerts), most recently seen first.
+    """
+    query = select(Alert).where(Alert.status == "open")
+    if region:
+        query = query.where(Alert.region == region)
+    rows = list(db.scalars(query.order_by(desc(Alert.last_seen)).limit(200)))
+    return {
+        "incidents": [
+            {
+                "id": a.id,
+                "ts": a.ts.isoformat(),
+                "region": a.region,
+                "chi_before": a.chi_before,
+                "chi_after": a.chi_after,
+                "reason": a.reason,
+                **incident_payload(a),
+            }
+            for a in rows
+        ]
+    }
+
+
+@app.get("/anomalies")
+def get_anomalies(db: Session = Depends(get_db)) -> dict:
+    """
+    Online detector state per region and metric (EWMA baseline, z-score, CUSUM).
+    """
+    detector = get_detector()
+    detector.sync(db)
+    return {"regions": detector.snapshot(), "points": detector.points}
+
+
+@app.get("/alert_rules")
+def get_alert_rules() -> dict:
+    """
+    Active alert rules with per-market override count, hit counters and evaluation timing.
+    """
+    return get_rule_engine().stats()
+
+
+@app.post("/alert_rules/reload")
+def post_alert_rules_reload() -> JSONResponse:
+    """
+    Re-read the alert rules file; the active rules are kept if the new file is invalid.
+    """
+    try:
+        engine = reload_rule_engine()
+    except (OSError, ValueError, KeyError) as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    return JSONResponse(content={"status": "ok", "rules": len(engine.rules), "source": engine.source})
+
+
 @app.post("/qa")
 def post_qa(payload: QARequest, db: Session = Depends(get_db)) -> dict:
-<<<<<<< HEAD
     """Chat endpoint for AI assistant."""
-=======
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
     result = answer_question(db, payload.question)
     return result
 
 
-<<<<<<< HEAD
+@app.post("/qa/stream")
+def post_qa_stream(payload: QARequest):
+    """
+    Server-sent-event version of /qa: retrieval evidence first, then answer tokens,
+    then a "done" event carrying the /qa response body.
+    """
+    def events():
+        # The stream outlives the request's get_db dependency, so it owns its session
+        db = SessionLocal()
+        try:
+            yield from stream_answer(db, payload.question)
+        finally:
+            db.close()
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.get("/predict")
 def get_predict(region: str = Query(...), db: Session = Depends(get_db)) -> dict:
     """
     Predictive analytics endpoint.
-    Returns predicted CHI for next hour with confidence interval.
+    Returns predicted CHI for next hour with a prediction interval from the trend fit's residuals.
     """
-    from .predict import forecast_chi
-    
-    # Get current CHI
-    current_chi = db.scalars(
-        select(CHI).where(CHI.region == region).order_by(desc(CHI.ts)).limit(1)
-    ).first()
-    
-    if not current_chi:
+    from .predict import get_forecast_cache
+
+    cached = get_forecast_cache(db).forecasts(db, [region], horizon_minutes=60, step_minutes=15)
+    if region not in cached:
         return {
             "region": region,
             "current_chi": None,
@@ -452,29 +525,40 @@ def get_predict(region: str = Query(...), db: Session = Depends(get_db)) -> dict
             "confidence_interval": None,
             "trend": "unknown"
         }
-    
-    # Get forecast (next hour = 60 minutes)
-    forecast = forecast_chi(db, region, horizon_minutes=60, step_minutes=15)
-    
-    if not forecast:
-        return {
-            "region": region,
-            "current_chi": current_chi.score,
-            "predicted_chi": current_chi.score,
-            "confidence_interval": [current_chi.score - 5, current_chi.score + 5],
-            "trend": "stable"
-        }
-    
+    current, forecast = cached[region]
+    return _prediction_payload(region, current, forecast)
+
+
+@app.get("/predict/all")
+def get_predict_all(db: Session = Depends(get_db)) -> dict:
+    """
+    Next-hour CHI prediction for every region from the incremental forecast cache
+    (same per-region shape as /predict).
+    """
+    from .predict import get_forecast_cache
+
+    cached = get_forecast_cache(db).forecasts(db, horizon_minutes=60, step_minutes=15)
+    return {
+        "predictions": [
+            _prediction_payload(region, current, forecast)
+            for region, (current, forecast) in sorted(cached.items())
+        ]
+    }
+
+
+def _prediction_payload(region: str, current_score: float, forecast: List[Tuple[datetime, float, Optional[float], Optional[float]]]) -> dict:
+    from .predict import FORECAST_INTERVAL_LEVEL
+
     # Next hour prediction (last forecast point)
-    predicted_chi = forecast[-1][1]
-    current_score = current_chi.score
+    _, predicted_chi, lower, upper = forecast[-1]
     
-    # Calculate confidence interval (simplified - would use actual model uncertainty)
-    std_dev = abs(predicted_chi - current_score) * 0.3  # 30% of change as uncertainty
-    confidence_interval = [
-        max(0, predicted_chi - std_dev),
-        min(100, predicted_chi + std_dev)
-    ]
+    if lower is None or upper is None:
+        # Too few points to estimate residual variance
+        confidence_interval = [max(0, predicted_chi - 5), min(100, predicted_chi + 5)]
+        interval_level = None
+    else:
+        confidence_interval = [lower, upper]
+        interval_level = FORECAST_INTERVAL_LEVEL
     
     # Determine trend
     if predicted_chi > current_score + 2:
@@ -492,9 +576,10 @@ def get_predict(region: str = Query(...), db: Session = Depends(get_db)) -> dict
         "current_chi": current_score,
         "predicted_chi": round(predicted_chi, 1),
         "confidence_interval": [round(ci, 1) for ci in confidence_interval],
+        "interval_level": interval_level,
         "trend": trend,
         "early_warning": early_warning,
-        "forecast_points": [(t.isoformat(), round(s, 1)) for t, s in forecast]
+        "forecast_points": [(t.isoformat(), round(s, 1)) for t, s, _, _ in forecast]
     }
 
 
@@ -514,7 +599,7 @@ def get_pinecone_status() -> dict:
         
         # Check if vectorstore module can be imported
         try:
-            from .vectorstore import _get_index, _get_pinecone, _dim
+            from .vectorstore import _get_index, _get_pinecone, _dim, retrieval_cache_stats
         except Exception as e:
             return {
                 "status": "error",
@@ -524,9 +609,11 @@ def get_pinecone_status() -> dict:
         
         # Try to get Pinecone client
         try:
+            from .embedding_profiles import get_profile, index_name_for
             pc = _get_pinecone()
             index = _get_index()
-            index_name = os.getenv("PINECONE_INDEX", "t-mobile")
+            profile = get_profile()
+            index_name = index_name_for(profile)
             namespace = os.getenv("PINECONE_NAMESPACE", "default")
             
             # Try a simple query to verify connection
@@ -540,9 +627,11 @@ def get_pinecone_status() -> dict:
                 "status": "connected",
                 "index": index_name,
                 "namespace": namespace,
-                "dimension": _dim if _dim else 1024,
+                "dimension": _dim if _dim else profile["dim"],
+                "embedding_profile": profile["name"],
                 "metric": "cosine",
                 "test_query_success": len(test_query) >= 0,
+                "retrieval_cache": retrieval_cache_stats(),
                 "api_key_set": bool(os.getenv("PINECONE_API_KEY"))
             }
         except Exception as e:
@@ -559,8 +648,6 @@ def get_pinecone_status() -> dict:
         }
 
 
-=======
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
 @app.post("/seed")
 def post_seed(db: Session = Depends(get_db)) -> dict:
     """
@@ -619,15 +706,24 @@ def post_recompute(payload: RecomputeRequest, db: Session = Depends(get_db)) ->
     return {"status": "ok", "alerts_created": len(alerts)}
 
 
-<<<<<<< HEAD
 # Include chat router for recommendations endpoint
 app.include_router(chat_router)
 
 
 @app.get("/health")
 def health():
-    """Health check endpoint."""
-    return {"status": "ok"}
+    """Liveness check: the process is up and serving requests."""
+    return {"status": "ok", "ready": readiness()["ready"]}
 
-=======
->>>>>>> 50e2313a86442d215d6cdf6c59817b6a38090a95
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Readiness check: 200 once the embedder and index warm-up has finished, 503 before
+    or when the embedder failed to load. Point the load balancer here so traffic only
+    arrives once /qa is fast.
+    """
+    state = readiness()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content=state)
+    return state
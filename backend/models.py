@@ -80,9 +80,31 @@ class Alert(Base):
     chi_after: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     reason: Mapped[str] = mapped_column(Text)
     recommendation: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    # AI output, generated once in the background after the alert is created
+    ai_recommendations: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    ai_analysis: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    ai_model: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    ai_generated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # pending | ok | partial | empty | error | unavailable (None for alerts created before this existed)
+    ai_status: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    # When the current pending run was queued; stale pending rows are requeued
+    ai_requested_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Runs so far and when the last one fell short; partial/empty/error rows are retried with backoff
+    ai_attempts: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    ai_failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Incident grouping: comma-separated names of the rules that have fired in the incident; while
+    # any of them fires again in the same region the open row is updated in place
+    incident_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # open | resolved (None for alerts created before grouping existed)
+    status: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    last_seen: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    occurrences: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    resolved_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     __table_args__ = (
         Index("idx_alerts_region_ts", "region", "ts"),
+        Index("idx_alerts_status_region_key", "status", "region", "incident_key"),
+        Index("idx_alerts_status_last_seen", "status", "last_seen"),
     )
 
 
@@ -0,0 +1,437 @@
+"""
+Local Pinecone-compatible stand-in for tests, load tests and benchmarks.
+
+Implements the subset of the Pinecone REST API this project uses:
+- control plane: list_indexes, create_index, describe_index, delete_index
+- data plane: upsert, query (with metadata filter), fetch, delete, describe_index_stats
+
+Like Pinecone Local, the control plane listens on --port and every index gets
+its own data-plane port (--port + 1, + 2, ...). Vectors live in memory and are
+optionally persisted to --data-dir. Search is exact (brute force) with NumPy.
+
+Usage:
+  python -m backend.pinecone_local --port 5080 --data-dir .pinecone_local
+  export PINECONE_API_KEY=pclocal
+  export PINECONE_CONTROLLER_HOST=http://localhost:5080
+  export PINECONE_HOST=http://localhost:5081   # data plane of the first index
+"""
+from __future__ import annotations
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+def _match_filter(meta: Dict[str, Any], flt: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone metadata filter ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $exists, $and, $or).
+    """
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(_match_filter(meta, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_match_filter(meta, c) for c in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            values = value if isinstance(value, list) else [value]
+            if op == "$eq" and target not in values:
+                return False
+            if op == "$ne" and target in values:
+                return False
+            if op == "$in" and not any(v in target for v in values):
+                return False
+            if op == "$nin" and any(v in target for v in values):
+                return False
+            if op == "$exists" and (key in meta) != bool(target):
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if not isinstance(value, (int, float)):
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+class Namespace:
+    """
+    Vectors of one namespace in a growable float32 matrix with an id -> row map.
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.metadata: List[Dict[str, Any]] = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.count = 0
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        for vec in vectors:
+            values = np.asarray(vec.get("values") or [], dtype=np.float32)
+            if values.shape != (self.dim,):
+                raise ValueError(f"Vector dimension {values.shape[0] if values.ndim else 0} does not match the dimension of the index {self.dim}")
+            vid = str(vec["id"])
+            meta = vec.get("metadata") or {}
+            row = self.rows.get(vid)
+            if row is None:
+                if self.count == self.matrix.shape[0]:
+                    grown = np.zeros((max(64, self.count * 2), self.dim), dtype=np.float32)
+                    grown[: self.count] = self.matrix[: self.count]
+                    self.matrix = grown
+                row = self.count
+                self.count += 1
+                self.rows[vid] = row
+                self.ids.append(vid)
+                self.metadata.append(meta)
+            else:
+                self.metadata[row] = meta
+            self.matrix[row] = values
+        return len(vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        drop = set(ids)
+        keep = [i for i, vid in enumerate(self.ids) if vid not in drop]
+        self.matrix = self.matrix[keep].copy() if keep else np.zeros((0, self.dim), dtype=np.float32)
+        self.ids = [self.ids[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self.rows = {vid: i for i, vid in enumerate(self.ids)}
+        self.count = len(self.ids)
+
+    def query(self, vector: List[float], top_k: int, metric: str, flt: Optional[Dict[str, Any]],
+              include_values: bool, include_metadata: bool) -> List[Dict[str, Any]]:
+        if self.count == 0:
+            return []
+        data = self.matrix[: self.count]
+        q = np.asarray(vector, dtype=np.float32)
+        if metric == "cosine":
+            norms = np.linalg.norm(data, axis=1) * (np.linalg.norm(q) or 1.0)
+            scores = (data @ q) / np.where(norms == 0, 1.0, norms)
+        elif metric == "euclidean":
+            scores = -np.linalg.norm(data - q, axis=1)
+        else:
+            scores = data @ q
+        matches: List[Dict[str, Any]] = []
+        for row in np.argsort(-scores):
+            if flt and not _match_filter(self.metadata[row], flt):
+                continue
+            match: Dict[str, Any] = {"id": self.ids[row], "score": float(scores[row] if metric != "euclidean" else -scores[row])}
+            match["values"] = data[row].tolist() if include_values else []
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+            if len(matches) >= top_k:
+                break
+        return matches
+
+
+class LocalIndex:
+    def __init__(self, name: str, dimension: int, metric: str, port: int, spec: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.dimension = dimension
+        self.metric = metric
+        self.port = port
+        self.spec = spec or {"serverless": {"cloud": "aws", "region": "us-east-1"}}
+        self.namespaces: Dict[str, Namespace] = {}
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def describe(self, hostname: str) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "host": f"{hostname}:{self.port}",
+            "spec": self.spec,
+            "status": {"ready": True, "state": "Ready"},
+            "deletion_protection": "disabled",
+            "vector_type": "dense",
+        }
+
+    def ns(self, name: Optional[str]) -> Namespace:
+        key = name or ""
+        if key not in self.namespaces:
+            self.namespaces[key] = Namespace(self.dimension)
+        return self.namespaces[key]
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {k: {"vectorCount": v.count} for k, v in self.namespaces.items() if v.count}
+        return {
+            "namespaces": namespaces,
+            "dimension": self.dimension,
+            "indexFullness": 0.0,
+            "totalVectorCount": sum(v.count for v in self.namespaces.values()),
+        }
+
+    def save(self, data_dir: Path) -> None:
+        with self.lock:
+            arrays = {}
+            meta = {"name": self.name, "dimension": self.dimension, "metric": self.metric, "spec": self.spec, "namespaces": {}}
+            for i, (ns_name, ns) in enumerate(self.namespaces.items()):
+                arrays[f"ns{i}"] = ns.matrix[: ns.count]
+                meta["namespaces"][ns_name] = {"key": f"ns{i}", "ids": ns.ids, "metadata": ns.metadata}
+            self.dirty = False
+        np.savez(data_dir / f"{self.name}.npz", **arrays)
+        (data_dir / f"{self.name}.json").write_text(json.dumps(meta, default=str))
+
+    @classmethod
+    def load(cls, data_dir: Path, name: str, port: int) -> "LocalIndex":
+        meta = json.loads((data_dir / f"{name}.json").read_text())
+        idx = cls(meta["name"], int(meta["dimension"]), meta["metric"], port, meta.get("spec"))
+        arrays = np.load(data_dir / f"{name}.npz")
+        for ns_name, ns_meta in meta["namespaces"].items():
+            ns = idx.ns(ns_name)
+            matrix = arrays[ns_meta["key"]].astype(np.float32)
+            ns.matrix = matrix.copy()
+            ns.ids = list(ns_meta["ids"])
+            ns.metadata = list(ns_meta["metadata"])
+            ns.rows = {vid: i for i, vid in enumerate(ns.ids)}
+            ns.count = len(ns.ids)
+        return idx
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PineconeLocal/0.1"
+    local: "PineconeLocal"
+    index: Optional[LocalIndex] = None
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        if self.local.verbose:
+            super().log_message(fmt, *args)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {"error": {"code": status, "message": message}, "status": status})
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        try:
+            if self.index is not None:
+                self._data_plane(method, url.path, parse_qs(url.query))
+            else:
+                self._control_plane(method, url.path)
+        except (ValueError, KeyError) as e:
+            self._error(400, str(e))
+        except Exception as e:  # pragma: no cover
+            self._error(500, str(e))
+
+    def _control_plane(self, method: str, path: str) -> None:
+        parts = [p for p in path.split("/") if p]
+        hostname = f"http://{self.local.hostname}"
+        if parts == ["indexes"] and method == "GET":
+            self._send(200, {"indexes": [i.describe(hostname) for i in self.local.indexes.values()]})
+        elif parts == ["indexes"] and method == "POST":
+            body = self._body()
+            if body["name"] in self.local.indexes:
+                self._error(409, f"Resource {body['name']} already exists")
+                return
+            idx = self.local.create_index(body["name"], int(body["dimension"]), body.get("metric", "cosine"), body.get("spec"))
+            self._send(201, idx.describe(hostname))
+        elif len(parts) == 2 and parts[0] == "indexes":
+            idx = self.local.indexes.get(parts[1])
+            if idx is None:
+                self._error(404, f"Resource {parts[1]} not found")
+            elif method == "DELETE":
+                self.local.delete_index(parts[1])
+                self._send(202, {})
+            else:
+                self._send(200, idx.describe(hostname))
+        else:
+            self._error(404, f"Unknown route {method} {path}")
+
+    def _data_plane(self, method: str, path: str, query: Dict[str, List[str]]) -> None:
+        idx = self.index
+        assert idx is not None
+        if path == "/vectors/upsert" and method == "POST":
+            body = self._body()
+            with idx.lock:
+                n = idx.ns(body.get("namespace")).upsert(body.get("vectors") or [])
+                idx.dirty = True
+            self._send(200, {"upsertedCount": n})
+        elif path == "/query" and method == "POST":
+            body = self._body()
+            vector = body.get("vector")
+            with idx.lock:
+                ns = idx.ns(body.get("namespace"))
+                if vector is None and body.get("id") in ns.rows:
+                    vector = ns.matrix[ns.rows[body["id"]]].tolist()
+                matches = ns.query(
+                    vector or [0.0] * idx.dimension,
+                    int(body.get("topK", 10)),
+                    idx.metric,
+                    body.get("filter"),
+                    bool(body.get("includeValues")),
+                    bool(body.get("includeMetadata")),
+                )
+            self._send(200, {"matches": matches, "namespace": body.get("namespace") or "", "usage": {"readUnits": 1}})
+        elif path == "/vectors/fetch" and method == "GET":
+            ns_name = (query.get("namespace") or [""])[0]
+            with idx.lock:
+                ns = idx.ns(ns_name)
+                vectors = {
+                    vid: {"id": vid, "values": ns.matrix[ns.rows[vid]].tolist(), "metadata": ns.metadata[ns.rows[vid]]}
+                    for vid in query.get("ids", []) if vid in ns.rows
+                }
+            self._send(200, {"vectors": vectors, "namespace": ns_name, "usage": {"readUnits": 1}})
+        elif path == "/vectors/delete" and method == "POST":
+            body = self._body()
+            with idx.lock:
+                if body.get("deleteAll"):
+                    idx.namespaces.pop(body.get("namespace") or "", None)
+                else:
+                    idx.ns(body.get("namespace")).delete([str(i) for i in body.get("ids") or []])
+                idx.dirty = True
+            self._send(200, {})
+        elif path == "/describe_index_stats":
+            with idx.lock:
+                self._send(200, idx.stats())
+        else:
+            self._error(404, f"Unknown route {method} {path}")
+
+
+class PineconeLocal:
+    """
+    Control-plane server plus one data-plane server per index.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5080, data_dir: Optional[str] = None,
+                 hostname: str = "localhost", verbose: bool = False) -> None:
+        self.host = host
+        self.port = port
+        self.hostname = hostname
+        self.verbose = verbose
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.indexes: Dict[str, LocalIndex] = {}
+        self._next_port = port + 1
+        self._servers: List[Tuple[ThreadingHTTPServer, threading.Thread]] = []
+        self._stop = threading.Event()
+
+    def _serve(self, port: int, index: Optional[LocalIndex]) -> ThreadingHTTPServer:
+        handler = type("Handler", (_Handler,), {"local": self, "index": index})
+        server = ThreadingHTTPServer((self.host, port), handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self._servers.append((server, thread))
+        return server
+
+    def create_index(self, name: str, dimension: int, metric: str = "cosine", spec: Optional[Dict[str, Any]] = None) -> LocalIndex:
+        idx = LocalIndex(name, dimension, metric, self._next_port, spec)
+        self._next_port += 1
+        idx.server = self._serve(idx.port, idx)
+        self.indexes[name] = idx
+        idx.dirty = True
+        return idx
+
+    def delete_index(self, name: str) -> None:
+        idx = self.indexes.pop(name, None)
+        if idx and idx.server:
+            idx.server.shutdown()
+        if self.data_dir:
+            for suffix in (".npz", ".json"):
+                (self.data_dir / f"{name}{suffix}").unlink(missing_ok=True)
+
+    def save(self) -> None:
+        if not self.data_dir:
+            return
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        for idx in list(self.indexes.values()):
+            if idx.dirty:
+                idx.save(self.data_dir)
+
+    def _load(self) -> None:
+        if not self.data_dir or not self.data_dir.exists():
+            return
+        for meta_file in sorted(self.data_dir.glob("*.json")):
+            idx = LocalIndex.load(self.data_dir, meta_file.stem, self._next_port)
+            self._next_port += 1
+            idx.server = self._serve(idx.port, idx)
+            self.indexes[idx.name] = idx
+            print(f"[PineconeLocal] Loaded index '{idx.name}' ({idx.stats()['totalVectorCount']} vectors) on port {idx.port}")
+
+    def _persist_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.save()
+
+    def start(self, persist_interval: float = 5.0) -> None:
+        self._load()
+        self._serve(self.port, None)
+        if self.data_dir:
+            threading.Thread(target=self._persist_loop, args=(persist_interval,), daemon=True).start()
+        print(f"[PineconeLocal] Control plane on http://{self.hostname}:{self.port}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.save()
+        for server, _ in self._servers:
+            server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Pinecone-compatible stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=5080, help="Control-plane port; indexes use the following ports")
+    parser.add_argument("--hostname", default="localhost", help="Hostname advertised in index descriptions")
+    parser.add_argument("--data-dir", default=None, help="Persist indexes here (in-memory only if omitted)")
+    parser.add_argument("--index", action="append", default=[], help="Pre-create an index, e.g. t-mobile:1024[:cosine]")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    local = PineconeLocal(args.host, args.port, args.data_dir, args.hostname, args.verbose)
+    local.start()
+    for spec in args.index:
+        name, dim, *rest = spec.split(":")
+        if name not in local.indexes:
+            idx = local.create_index(name, int(dim), rest[0] if rest else "cosine")
+            print(f"[PineconeLocal] Index '{name}' ({dim}-d) on port {idx.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        local.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,259 @@
 from __future__ import annotations
+import os
+import threading
+import time
+import weakref
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from statistics import NormalDist
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 import numpy as np
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func
 from sqlalchemy.orm import Session
 
 from .models import CHI
 
 
-def forecast_chi(db: Session, region: str, horizon_minutes: int = 120, step_minutes: int = 15) -> List[Tuple[datetime, float]]:
+FORECAST_POINTS = 24
+FORECAST_INTERVAL_LEVEL = float(os.getenv("FORECAST_INTERVAL_LEVEL", "0.95"))
+# Seconds between full reloads of the forecast cache; 0 disables them
+FORECAST_RESYNC_S = float(os.getenv("FORECAST_RESYNC_S", "300"))
+
+# (timestamp, prediction, lower bound, upper bound)
+ForecastPoint = Tuple[datetime, float, Optional[float], Optional[float]]
+
+
+def recent_chi_series(
+    db: Session,
+    regions: Optional[List[str]] = None,
+    n: int = FORECAST_POINTS,
+    max_id: Optional[int] = None,
+) -> Dict[str, Tuple[List[datetime], List[float]]]:
     """
-    Simple linear regression on last N points to forecast next horizon.
+    Last `n` CHI points (ascending) for every region, or the given regions, in one ROW_NUMBER query.
+    """
+    rn = func.row_number().over(partition_by=CHI.region, order_by=desc(CHI.ts)).label("rn")
+    ranked = select(CHI.region, CHI.ts, CHI.score, rn)
+    if max_id is not None:
+        ranked = ranked.where(CHI.id <= max_id)
+    if regions is not None:
+        if not regions:
+            return {}
+        ranked = ranked.where(CHI.region.in_(regions))
+    ranked = ranked.subquery()
+    rows = db.execute(
+        select(ranked.c.region, ranked.c.ts, ranked.c.score)
+        .where(ranked.c.rn <= n)
+        .order_by(ranked.c.region, desc(ranked.c.rn))
+    ).all()
+    series: Dict[str, Tuple[List[datetime], List[float]]] = {}
+    for region, ts, score in rows:
+        times, scores = series.setdefault(region, ([], []))
+        times.append(ts)
+        scores.append(float(score))
+    return series
+
+
+def t_quantile(df: Any, level: float = FORECAST_INTERVAL_LEVEL) -> Any:
+    """
+    Two-sided Student-t critical value (normal approximation if SciPy is missing).
+    """
+    try:
+        from scipy.stats import t as student_t
+        return student_t.ppf((1 + level) / 2, df)
+    except ImportError:
+        return np.full(np.shape(df), NormalDist().inv_cdf((1 + level) / 2))
+
+
+def ols_forecast(n: Any, s0: Any, s1: Any, s2: Any, x0: Any, q: Any) -> Tuple[Any, Any]:
+    """
+    Linear-trend forecast at x0 and its prediction-interval half width, from the sums
+    of a window with x = 0..n-1: s0 = sum(y), s1 = sum(x*y), s2 = sum(y*y).
+    Works elementwise on NumPy arrays; q is the t critical value for n - 2 dof.
+    """
+    sx = n * (n - 1) / 2.0
+    sxx_c = (n - 1) * n * (n + 1) / 12.0  # sum((x - mean(x))^2)
+    slope = (s1 - sx * s0 / n) / sxx_c
+    intercept = (s0 - slope * sx) / n
+    pred = slope * x0 + intercept
+    sse = np.maximum(s2 - intercept * s0 - slope * s1, 0.0)
+    resid_sd = np.sqrt(sse / (n - 2))
+    half = q * resid_sd * np.sqrt(1.0 + 1.0 / n + (x0 - sx / n) ** 2 / sxx_c)
+    return pred, half
+
+
+class _RegionFit:
+    """
+    Sliding window of the last `n` CHI points with running least-squares sums
+    (x = 0..len-1), updated in O(1) per point. Forecasts are memoized until the next point.
+    """
+    __slots__ = ("times", "scores", "s0", "s1", "s2", "updates", "forecasts")
+
+    def __init__(self, n: int) -> None:
+        self.times: Deque[datetime] = deque(maxlen=n)
+        self.scores: Deque[float] = deque(maxlen=n)
+        self.s0 = 0.0  # sum(y)
+        self.s1 = 0.0  # sum(x * y)
+        self.s2 = 0.0  # sum(y * y)
+        self.updates = 0
+        self.forecasts: Dict[Tuple[int, int], List[ForecastPoint]] = {}
+
+    def add(self, ts: datetime, y: float) -> None:
+        n = len(self.scores)
+        if n == self.scores.maxlen:
+            # Drop the oldest point and shift every x down by one
+            y0 = self.scores[0]
+            self.s1 = self.s1 - (self.s0 - y0) + (n - 1) * y
+            self.s0 = self.s0 - y0 + y
+            self.s2 = self.s2 - y0 * y0 + y * y
+        else:
+            self.s1 += n * y
+            self.s0 += y
+            self.s2 += y * y
+        self.times.append(ts)
+        self.scores.append(y)
+        self.updates += 1
+        if self.updates % 1000 == 0:
+            # Recompute from the window now and then so rounding error cannot build up
+            self.s0 = float(sum(self.scores))
+            self.s1 = float(sum(i * v for i, v in enumerate(self.scores)))
+            self.s2 = float(sum(v * v for v in self.scores))
+        self.forecasts.clear()
+
+    def forecast(self, horizon_minutes: int, step_minutes: int) -> List[ForecastPoint]:
+        """
+        (ts, prediction, lower, upper) per step; bounds are None below 4 points (persistence).
+        """
+        key = (horizon_minutes, step_minutes)
+        cached = self.forecasts.get(key)
+        if cached is not None:
+            return cached
+        n = len(self.scores)
+        offsets = [timedelta(minutes=step_minutes * i) for i in range(1, int(horizon_minutes / step_minutes) + 1)]
+        if n == 0:
+            out: List[ForecastPoint] = []
+        elif n < 4:
+            out = [(self.times[-1] + o, self.scores[-1], None, None) for o in offsets]
+        else:
+            x0 = n - 1 + np.arange(1, len(offsets) + 1, dtype=float)
+            pred, half = ols_forecast(n, self.s0, self.s1, self.s2, x0, t_quantile(n - 2))
+            out = [
+                (self.times[-1] + o, float(np.clip(p, 0.0, 100.0)), float(np.clip(p - h, 0.0, 100.0)), float(np.clip(p + h, 0.0, 100.0)))
+                for o, p, h in zip(offsets, pred, half)
+            ]
+        self.forecasts[key] = out
+        return out
+
+
+class ForecastCache:
+    """
+    Per-region forecast state for one database. `sync` consumes only CHI rows with an
+    id above the last one seen, so reads between writes return memoized forecasts.
+    The id watermark is exact on SQLite (one writer, ids commit in order). With
+    concurrent writers (Postgres) a lower id can commit after a higher one was read
+    and be skipped, so the state is also rebuilt every `resync_s` seconds.
     """
-    rows = list(
-        db.scalars(
-            select(CHI).where(CHI.region == region).order_by(desc(CHI.ts)).limit(24)
-        )
-    )
-    if len(rows) < 4:
-        # naive persistence
-        if rows:
-            last = rows[0]
-            times = [last.ts + timedelta(minutes=step_minutes * i) for i in range(1, int(horizon_minutes / step_minutes) + 1)]
-            return [(t, float(last.score)) for t in times]
-        return []
-
-    # Order ascending by time
-    rows = list(reversed(rows))
-    y = np.array([r.score for r in rows], dtype=float)
-    # Time as 0..N-1
-    x = np.arange(len(rows), dtype=float)
-    x = np.vstack([x, np.ones_like(x)]).T
-    # Least squares
-    coeff, _, _, _ = np.linalg.lstsq(x, y, rcond=None)
-    slope, intercept = float(coeff[0]), float(coeff[1])
-
-    last_ts = rows[-1].ts
-    num_steps = int(horizon_minutes / step_minutes)
-    forecasts: List[Tuple[datetime, float]] = []
-    base_idx = len(rows) - 1
-    for i in range(1, num_steps + 1):
-        t = last_ts + timedelta(minutes=step_minutes * i)
-        idx = base_idx + i
-        pred = slope * idx + intercept
-        forecasts.append((t, float(np.clip(pred, 0.0, 100.0))))
-    return forecasts
 
+    def __init__(self, n: int = FORECAST_POINTS, resync_s: float = FORECAST_RESYNC_S) -> None:
+        self.n = n
+        self.resync_s = resync_s
+        self._fits: Dict[str, _RegionFit] = {}
+        self._watermark: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.rows_applied = 0
+        self.rebuilds = 0
+
+    def _load(self, db: Session, regions: Optional[List[str]], max_id: int) -> None:
+        for region, (times, scores) in recent_chi_series(db, regions, self.n, max_id=max_id).items():
+            fit = _RegionFit(self.n)
+            for ts, y in zip(times, scores):
+                fit.add(ts, y)
+            self._fits[region] = fit
+
+    def sync(self, db: Session) -> None:
+        with self._lock:
+            due = self.resync_s > 0 and time.monotonic() - self._loaded_at >= self.resync_s
+            if self._watermark is None or due:
+                self._watermark = db.scalar(select(func.max(CHI.id))) or 0
+                self._fits = {}
+                self._load(db, None, self._watermark)
+                self._loaded_at = time.monotonic()
+                return
+            rows = db.execute(
+                select(CHI.id, CHI.region, CHI.ts, CHI.score).where(CHI.id > self._watermark).order_by(CHI.id)
+            ).all()
+            if not rows:
+                return
+            stale = set()
+            for _, region, ts, score in rows:
+                fit = self._fits.get(region)
+                if fit is None:
+                    fit = self._fits[region] = _RegionFit(self.n)
+                if region in stale or (fit.times and ts < fit.times[-1]):
+                    # A back-dated point changes the window's order; reload that region
+                    stale.add(region)
+                    continue
+                fit.add(ts, float(score))
+            self._watermark = rows[-1][0]
+            self.rows_applied += len(rows)
+            if stale:
+                self.rebuilds += len(stale)
+                self._load(db, sorted(stale), self._watermark)
+
+    def forecasts(
+        self,
+        db: Session,
+        regions: Optional[List[str]] = None,
+        horizon_minutes: int = 120,
+        step_minutes: int = 15,
+    ) -> Dict[str, Tuple[float, List[ForecastPoint]]]:
+        """
+        {region: (latest score, [(ts, prediction, lower, upper), ...])} for every region
+        with data, or the given ones.
+        """
+        self.sync(db)
+        with self._lock:
+            names = self._fits.keys() if regions is None else [r for r in regions if r in self._fits]
+            return {
+                r: (self._fits[r].scores[-1], self._fits[r].forecast(horizon_minutes, step_minutes))
+                for r in names
+                if self._fits[r].scores
+            }
 
+
+_caches: "weakref.WeakKeyDictionary[Any, ForecastCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_forecast_cache(db: Session) -> ForecastCache:
+    """
+    Forecast cache for the engine behind `db`.
+    """
+    engine = db.get_bind()
+    with _caches_lock:
+        cache = _caches.get(engine)
+        if cache is None:
+            cache = _caches[engine] = ForecastCache()
+        return cache
+
+
+def forecast_chi_all(
+    db: Session,
+    regions: Optional[List[str]] = None,
+    horizon_minutes: int = 120,
+    step_minutes: int = 15,
+) -> Dict[str, List[Tuple[datetime, float]]]:
+    """
+    Forecasts for every region (or the given ones), served from the incremental forecast cache.
+    """
+    cached = get_forecast_cache(db).forecasts(db, regions, horizon_minutes, step_minutes)
+    return {region: [(ts, pred) for ts, pred, _, _ in forecast] for region, (_, forecast) in cached.items()}
+
+
+def forecast_chi(db: Session, region: str, horizon_minutes: int = 120, step_minutes: int = 15) -> List[Tuple[datetime, float]]:
+    """
+    Simple linear regression on last N points to forecast next horizon.
+    """
+    return forecast_chi_all(db, [region], horizon_minutes, step_minutes).get(region, [])
@@ -0,0 +1,145 @@
+"""
+Token budgeting for LLM prompt context.
+
+Evidence snippets are deduplicated (a snippet whose words are mostly contained
+in an already selected one and whose numbers all appear there is dropped, which
+also catches overlapping chunks while keeping rows that differ only in figures),
+ranked by relevance and packed into the model's context budget, most relevant first.
+The first snippet that does not fit is cut on a word boundary if enough room
+is left; everything after it is dropped.
+"""
+from __future__ import annotations
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .chunking import approx_token_counts
+
+# Tokens of retrieved context allowed per call (instructions and question excluded)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+PROMPT_MIN_ITEM_TOKENS = int(os.getenv("PROMPT_MIN_ITEM_TOKENS", "24"))
+# Fraction of a snippet's words already present in a selected snippet that marks it redundant
+PROMPT_OVERLAP_THRESHOLD = float(os.getenv("PROMPT_OVERLAP_THRESHOLD", "0.8"))
+
+_MODEL_BUDGETS: Dict[str, int] = {
+    "llama-3.1-8b-instant": 2000,
+    "llama-3.1-70b-versatile": 4000,
+    "llama-3.3-70b-versatile": 4000,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WS_RE = re.compile(r"\s+")
+
+
+def _env_budgets() -> Dict[str, int]:
+    # PROMPT_BUDGETS="llama-3.1-8b-instant=1500,llama-3.3-70b-versatile=6000"
+    out: Dict[str, int] = {}
+    for part in os.getenv("PROMPT_BUDGETS", "").split(","):
+        name, sep, value = part.strip().rpartition("=")
+        if sep and name:
+            try:
+                out[name.strip()] = int(value)
+            except ValueError:
+                print(f"[DEBUG] Ignoring invalid PROMPT_BUDGETS entry: {part!r}")
+    return out
+
+
+def budget_for(model: Optional[str]) -> int:
+    """
+    Context token budget for a model: PROMPT_BUDGETS, then the built-in table, then PROMPT_TOKEN_BUDGET.
+    """
+    if model:
+        budgets = {**_MODEL_BUDGETS, **_env_budgets()}
+        if model in budgets:
+            return budgets[model]
+    return PROMPT_TOKEN_BUDGET
+
+
+def estimate_tokens(text: str) -> int:
+    return approx_token_counts([text or ""])[0]
+
+
+def _relevance(query_terms: set, text: str) -> float:
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(_WORD_RE.findall(text.lower()))) / len(query_terms)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def _overlap_key(text: str) -> Tuple[set, set]:
+    # Numbers are compared exactly, not as words: "Dallas CHI 61.0" and "Dallas CHI 62.1"
+    # share every word but are different rows
+    lowered = text.lower()
+    return set(_WORD_RE.findall(_NUM_RE.sub(" ", lowered))), set(_NUM_RE.findall(lowered))
+
+
+def _is_duplicate(key: Tuple[set, set], kept: List[Tuple[set, set]], threshold: float) -> bool:
+    words, numbers = key
+    # Wordless snippets (punctuation, emoji) would trivially "overlap" everything
+    if not words:
+        return False
+    return any(
+        len(words & other_words) >= threshold * len(words) and numbers <= other_numbers
+        for other_words, other_numbers in kept
+    )
+
+
+def pack_context(
+    texts: Sequence[str],
+    budget: int,
+    scores: Optional[Sequence[float]] = None,
+    query: Optional[str] = None,
+    min_item_tokens: int = PROMPT_MIN_ITEM_TOKENS,
+    overlap_threshold: float = PROMPT_OVERLAP_THRESHOLD,
+) -> List[Tuple[int, str]]:
+    """
+    Select snippets for a prompt. Returns (original index, possibly truncated text)
+    pairs in rank order.
+
+    Rank is `scores` (higher first) when given, plus query-term overlap when `query`
+    is given; ties keep the input order, which is usually the retriever's ranking.
+    """
+    query_terms = set(_WORD_RE.findall((query or "").lower()))
+    candidates: List[Tuple[float, int, str]] = []
+    for i, text in enumerate(texts):
+        text = _WS_RE.sub(" ", (text or "").strip())
+        if not text:
+            continue
+        score = (scores[i] if scores is not None else 0.0) + _relevance(query_terms, text)
+        candidates.append((score, i, text))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+
+    counts = approx_token_counts([c[2] for c in candidates])
+    kept: List[Tuple[int, str]] = []
+    kept_keys: List[Tuple[set, set]] = []
+    used = duplicates = 0
+    for (score, i, text), n in zip(candidates, counts):
+        key = _overlap_key(text)
+        if _is_duplicate(key, kept_keys, overlap_threshold):
+            duplicates += 1
+            continue
+        kept_keys.append(key)
+        if used + n <= budget:
+            kept.append((i, text))
+            used += n
+            continue
+        room = budget - used
+        if room >= min_item_tokens:
+            kept.append((i, _truncate(text, room)))
+            used += room
+        break
+    if len(kept) < len(candidates):
+        print(f"[DEBUG] Prompt budget: kept {len(kept)}/{len(candidates)} snippets, "
+              f"~{used}/{budget} tokens, {duplicates} duplicate(s) dropped")
+    return kept
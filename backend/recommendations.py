@@ -2,7 +2,10 @@
 GROQ-based recommendation generator for alerts.
 """
 import json
-from .llm_client import get_groq_client
+from typing import Iterator
+from .llm_client import chat_completion, get_groq_client
+from .llm_cache import cached_completion, cached_stream
+from .streaming import StreamEvent
 
 MODEL = "llama-3.1-8b-instant"  # fast + concise for runbooks
 
@@ -35,8 +38,23 @@ def groq_recommendations(context: dict) -> str:
       'time': '2025-11-09 17:28'
     }
     """
-    client = get_groq_client()
-    
+    messages = _messages(context)
+
+    def call() -> str:
+        client = get_groq_client()
+        resp = chat_completion(
+            client,
+            model=MODEL, 
+            temperature=0.2,
+            messages=messages,
+        )
+        return resp.choices[0].message.content.strip()
+
+    # Identical incident context within the TTL reuses the previous answer
+    return cached_completion(MODEL, SYSTEM, messages[1]["content"], call)
+
+
+def _messages(context: dict) -> list:
     # Format context nicely for the prompt
     context_str = f"""Region: {context.get('region', 'Unknown')}
 Current CHI: {context.get('current_chi', 0):.1f}
@@ -52,15 +70,10 @@ Time: {context.get('time', 'N/A')}"""
         "1) <step>\n2) <step>\n3) <step>\n4) <step> (optional)\n5) <step> (optional)\n\n"
         f"Incident Details:\n{context_str}"
     )
-    resp = client.chat.completions.create(
-        model=MODEL, 
-        temperature=0.2,
-        messages=[
-            {"role": "system", "content": SYSTEM},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return resp.choices[0].message.content.strip()
+    return [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": prompt}
+    ]
 
 
 def get_recommendations(context: dict) -> tuple[str, str]:
@@ -81,3 +94,41 @@ def get_recommendations(context: dict) -> tuple[str, str]:
         print(f"[DEBUG] Traceback: {traceback.format_exc()}")
         return FALLBACK, "fallback"
 
+
+def stream_recommendations(context: dict) -> Iterator[StreamEvent]:
+    """
+    Streaming variant of get_recommendations: ("evidence", context), then ("token", {"text": ...})
+    increments, then ("done", {"recommendations", "source"}) as /recommendations returns.
+    """
+    yield "evidence", {"context": context}
+    messages = _messages(context)
+
+    def stream() -> Iterator[str]:
+        client = get_groq_client()
+        resp = chat_completion(
+            client,
+            model=MODEL,
+            temperature=0.2,
+            messages=messages,
+            stream=True,
+        )
+        for chunk in resp:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    parts = []
+    try:
+        for chunk in cached_stream(MODEL, SYSTEM, messages[1]["content"], stream):
+            parts.append(chunk)
+            yield "token", {"text": chunk}
+    except Exception as e:
+        print(f"[DEBUG] GROQ recommendations stream failed: {e}")
+        yield "done", {"recommendations": FALLBACK, "source": "fallback"}
+        return
+    text = "".join(parts).strip()
+    if len(text) > 10:
+        yield "done", {"recommendations": text, "source": "groq"}
+    else:
+        print(f"[DEBUG] GROQ returned empty/invalid response, using fallback")
+        yield "done", {"recommendations": FALLBACK, "source": "fallback"}
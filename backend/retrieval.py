@@ -0,0 +1,284 @@
+"""
+Hybrid retrieval: BM25 over recent events, alerts, runbooks and CHI fused with
+Pinecone dense search using reciprocal rank fusion.
+The sparse index is kept up to date incrementally and also backs the
+retrieval-only Q&A path, so no vectorizer is refit per question. It holds the
+last SPARSE_LOOKBACK_HOURS of events, alerts and CHI, capped at SPARSE_MAX_DOCS
+documents (oldest evicted first) so load-generator bursts cannot grow it unbounded.
+"""
+from __future__ import annotations
+import heapq
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .models import Event, Alert, Runbook, CHI
+from .sparse_index import SparseIndex, tokenize
+from .utils import clean_text
+
+try:
+    from .vectorstore import query_text as pine_query
+except Exception:  # pragma: no cover
+    pine_query = None  # type: ignore
+
+
+RRF_K = 60
+SPARSE_LOOKBACK_HOURS = int(os.getenv("SPARSE_LOOKBACK_HOURS", "24"))
+SPARSE_MAX_DOCS = int(os.getenv("SPARSE_MAX_DOCS", "100000"))
+
+# Tokens that look like identifiers: tower IDs, device models, error codes ("TWR-1042", "iPhone 15", "S24")
+_IDENTIFIER_RE = re.compile(r"\b(?=[\w-]*\d)(?=[\w-]*[a-zA-Z])[\w-]{2,}\b|\b(?:[A-Z][a-z]+|i[A-Z][a-z]+)\s\d{1,3}\b|\"[^\"]+\"")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+_sparse = SparseIndex()
+_sync_lock = threading.Lock()
+_last_event_id = 0
+_last_alert_id = 0
+_last_alert_seen = datetime.min  # newest Alert.last_seen indexed
+_last_chi_id = 0
+_runbook_count = -1
+# doc_id -> ts, used to evict events/alerts that fall out of the lookback window
+_doc_ts: Dict[str, datetime] = {}
+
+
+def _event_doc(e: Event) -> Tuple[str, str, Dict[str, Any]]:
+    text = f"[{e.region}] {e.topic or 'other'} {e.text}"
+    display = f"[{e.region}] sent={(e.sentiment or 0.0):.2f} topic={e.topic or 'other'} text={e.text[:240]}"
+    return f"event:{e.id}", text, {"kind": "event", "text": display, "region": e.region, "ts": e.ts,
+                                   "review": e.text}
+
+
+def _alert_doc(a: Alert) -> Tuple[str, str, Dict[str, Any]]:
+    display = f"[{a.region}] {a.reason} | recs: {', '.join(a.recommendation or [])}"
+    return f"alert:{a.id}", display, {"kind": "alert", "text": display, "region": a.region, "ts": a.ts}
+
+
+def _runbook_doc(r: Runbook) -> Tuple[str, str, Dict[str, Any]]:
+    display = f"Runbook for {r.issue}: steps={'; '.join(r.steps)}"
+    return f"runbook:{r.id}", display, {"kind": "runbook", "text": display, "region": None, "ts": None}
+
+
+def _chi_doc(c: CHI) -> Tuple[str, str, Dict[str, Any]]:
+    drivers = c.drivers_json or {}
+    display = (f"[{c.region}] CHI={c.score:.1f} sentiment={drivers.get('sentiment', 0):.2f} "
+               f"kpi={drivers.get('kpi_health', 0):.2f} top={', '.join(drivers.get('top_keywords', [])[:5])}")
+    # One document per region: a newer CHI row replaces the previous one
+    return f"chi:{c.region}", display, {"kind": "chi", "text": display, "region": c.region, "ts": c.ts}
+
+
+def _new_rows(db: Session, model, last_id: int, start: datetime, limit: int) -> list:
+    # Newest `limit` rows above the watermark, ascending; older ones would be evicted anyway
+    rows = list(
+        db.scalars(
+            select(model)
+            .where(model.id > last_id, model.ts >= start)
+            .order_by(model.id.desc())
+            .limit(limit)
+        )
+    )
+    rows.reverse()
+    return rows
+
+
+def sync_sparse_index(
+    db: Session, lookback_hours: int = SPARSE_LOOKBACK_HOURS, max_docs: int = SPARSE_MAX_DOCS
+) -> SparseIndex:
+    """
+    Bring the sparse index up to date with the DB.
+    Only rows with ids above the last seen high-water mark are read, so the cost
+    is proportional to what arrived since the previous call. At most `max_docs`
+    timestamped documents are kept; the oldest are evicted first.
+    """
+    global _last_event_id, _last_alert_id, _last_alert_seen, _last_chi_id, _runbook_count
+    start = datetime.utcnow() - timedelta(hours=lookback_hours)
+    with _sync_lock:
+        events = _new_rows(db, Event, _last_event_id, start, max_docs)
+        for e in events:
+            doc_id, text, payload = _event_doc(e)
+            _sparse.add(doc_id, text, payload)
+            _doc_ts[doc_id] = e.ts
+        if events:
+            _last_event_id = events[-1].id
+
+        alerts = _new_rows(db, Alert, _last_alert_id, start, max_docs)
+        # Open incidents updated in place keep their id, so re-add them by last_seen
+        alerts += list(
+            db.scalars(
+                select(Alert).where(
+                    Alert.status == "open",
+                    Alert.last_seen > _last_alert_seen,
+                    Alert.id <= _last_alert_id,
+                )
+            )
+        )
+        for a in alerts:
+            doc_id, text, payload = _alert_doc(a)
+            _sparse.add(doc_id, text, payload)
+            _doc_ts[doc_id] = a.last_seen or a.ts
+        if alerts:
+            _last_alert_id = max(_last_alert_id, max(a.id for a in alerts))
+            _last_alert_seen = max([_last_alert_seen] + [a.last_seen for a in alerts if a.last_seen is not None])
+
+        chi_rows = _new_rows(db, CHI, _last_chi_id, start, max_docs)
+        for c in chi_rows:
+            doc_id, text, payload = _chi_doc(c)
+            _sparse.add(doc_id, text, payload)
+            _doc_ts[doc_id] = c.ts
+        if chi_rows:
+            _last_chi_id = chi_rows[-1].id
+
+        runbook_count = db.scalar(select(func.count()).select_from(Runbook)) or 0
+        if runbook_count != _runbook_count:
+            for r in db.scalars(select(Runbook)):
+                doc_id, text, payload = _runbook_doc(r)
+                _sparse.add(doc_id, text, payload)
+            _runbook_count = runbook_count
+
+        expired = [d for d, ts in _doc_ts.items() if ts < start]
+        excess = len(_doc_ts) - len(expired) - max_docs
+        if excess > 0:
+            live = ((d, ts) for d, ts in _doc_ts.items() if ts >= start)
+            expired.extend(d for d, _ in heapq.nsmallest(excess, live, key=lambda kv: kv[1]))
+        for doc_id in expired:
+            _sparse.remove(doc_id)
+            del _doc_ts[doc_id]
+    return _sparse
+
+
+def search_context(db: Session, question: str, top_k: int = 8) -> List[Tuple[str, str]]:
+    """
+    Retrieval-only lookup over the maintained sparse index.
+    Returns (type, text) pairs, best first.
+    """
+    index = sync_sparse_index(db)
+    docs: List[Tuple[str, str]] = []
+    for doc_id, _ in index.search(question, top_k=top_k):
+        payload = index.get(doc_id) or {}
+        docs.append((payload.get("kind", "event"), payload.get("text", "")))
+    return docs
+
+
+def _keyword_terms(question: str) -> List[str]:
+    terms: List[str] = []
+    for m in _IDENTIFIER_RE.findall(question or ""):
+        terms.extend(tokenize(m.strip('"')))
+    return terms
+
+
+def _review_key(text: str) -> str:
+    # Events store clean_text(review), Pinecone metadata the raw review; both map to this key
+    return "review:" + " ".join(clean_text(text or "").lower().split())[:200]
+
+
+def _sparse_search(question: str, top_k: int, region_filter: Optional[str]) -> List[Dict[str, Any]]:
+    hits = _sparse.search(question, top_k=top_k * 3 if region_filter else top_k)
+    out: List[Dict[str, Any]] = []
+    for doc_id, score in hits:
+        payload = _sparse.get(doc_id) or {}
+        out.append({
+            "id": doc_id,
+            "dedup_key": _review_key(payload["review"]) if payload.get("review") else doc_id,
+            "kind": payload.get("kind", "event"),
+            "score": score,
+            "text": payload.get("text", ""),
+            "metadata": {"region": payload.get("region") or ""},
+        })
+    if region_filter:
+        rf = region_filter.lower()
+        filtered = [h for h in out if (h["metadata"].get("region") or "").lower().split(",")[0].strip() == rf]
+        # Same soft behaviour as the dense filter: fall back to unfiltered hits
+        out = filtered or out
+    return out[:top_k]
+
+
+def _dense_search(question: str, top_k: int, region_filter: Optional[str], issue_type_filter: Optional[str]) -> List[Dict[str, Any]]:
+    if pine_query is None:
+        return []
+    matches = pine_query(question, top_k=top_k, namespace="default",
+                         region_filter=region_filter, issue_type_filter=issue_type_filter)
+    return [
+        {
+            "id": m.get("id"),
+            "dedup_key": _review_key(m.get("text", "")) if m.get("text") else m.get("id"),
+            "kind": "review",
+            "score": m.get("score", 0.0),
+            "text": m.get("text", ""),
+            "metadata": m.get("metadata", {}) or {},
+        }
+        for m in matches
+    ]
+
+
+def _fuse(result_lists: List[Tuple[str, List[Dict[str, Any]]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Reciprocal rank fusion: score(d) = sum over lists of 1 / (RRF_K + rank).
+    Documents are keyed by `dedup_key`: the cleaned review text for event rows and
+    Pinecone reviews (so a review stored in both is counted once), the doc id otherwise.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for source, results in result_lists:
+        for rank, item in enumerate(results, 1):
+            key = item.get("dedup_key") or " ".join((item.get("text") or "").lower().split())[:200]
+            if not key:
+                continue
+            entry = fused.get(key)
+            if entry is None:
+                entry = dict(item)
+                entry["rrf_score"] = 0.0
+                entry["sources"] = []
+                fused[key] = entry
+            entry["rrf_score"] += 1.0 / (RRF_K + rank)
+            entry["sources"].append(source)
+    ranked = sorted(fused.values(), key=lambda x: x["rrf_score"], reverse=True)
+    return ranked[:top_k]
+
+
+def hybrid_search(
+    db: Session,
+    question: str,
+    top_k: int = 5,
+    region_filter: Optional[str] = None,
+    issue_type_filter: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run sparse (BM25) and dense (Pinecone) retrieval in parallel and fuse the rankings.
+    Questions that name identifiers (tower IDs, device models) are answered from the
+    sparse index alone when it has hits, so the embedding model is never loaded for them.
+    Returns [{id, dedup_key, kind, text, metadata, score, rrf_score, sources}].
+    """
+    if not (question or "").strip():
+        return []
+    try:
+        sync_sparse_index(db)
+    except Exception as e:
+        print(f"[DEBUG] Sparse index sync failed: {e}")
+
+    keyword_terms = _keyword_terms(question)
+    if keyword_terms:
+        sparse_hits = _sparse_search(question, top_k, region_filter)
+        # Only skip dense search when the identifier itself was found, not just common words
+        if any(set(keyword_terms) & set(tokenize(h["text"])) for h in sparse_hits):
+            print(f"[DEBUG] Keyword query answered from sparse index ({len(sparse_hits)} hits)")
+            return _fuse([("sparse", sparse_hits)], top_k)
+
+    sparse_future = _executor.submit(_sparse_search, question, top_k, region_filter)
+    dense_future = _executor.submit(_dense_search, question, top_k, region_filter, issue_type_filter)
+    results: List[Tuple[str, List[Dict[str, Any]]]] = []
+    try:
+        results.append(("dense", dense_future.result()))
+    except Exception as e:
+        print(f"[ERROR] Pinecone query failed: {e}")
+    try:
+        results.append(("sparse", sparse_future.result()))
+    except Exception as e:
+        print(f"[ERROR] Sparse query failed: {e}")
+    fused = _fuse(results, top_k)
+    print(f"[DEBUG] Hybrid retrieval: {sum(len(r) for _, r in results)} candidates -> {len(fused)} fused")
+    return fused
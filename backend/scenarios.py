@@ -0,0 +1,315 @@
+"""
+Multi-region scenario engine and load generator.
+
+A ScenarioSpec describes an incident: regions, ramp shape of the negative-event
+rate, topic mix, KPI degradation curve and positive background noise. The run
+is split into ticks of `tick_seconds` simulated time. Each tick's events and
+KPIs go through the live ingest path (ingest.ingest_events / ingest_kpis), and
+every `recompute_every_ticks` ticks CHI is recomputed and alerts generated, as
+the service does. All randomness comes from `seed`.
+
+Timestamps are wall-clock at emission unless `start` is set (backfill at
+start + simulated offset). A backfill scores CHI as of the end of the simulated
+tick, so the CHI windows see the backfilled events, but it does not generate
+alerts: alerting compares the newest CHI rows and suppresses by wall-clock time,
+so it cannot replay the past. `target_events_per_second` throttles emission;
+without it the run measures end-to-end throughput.
+
+    python -m backend.scenarios spec.json
+    python -m backend.scenarios --regions Dallas Seattle --minutes 30 --rate 20 --seed 7
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from .alerts import generate_alerts_for_regions
+from .chi import recompute_and_store_chi
+from .ingest import ingest_events, ingest_kpis
+from .simulator import latest_kpis
+
+Ramp = Literal["step", "linear", "exponential", "spike"]
+
+TOPIC_TEMPLATES: Dict[str, List[str]] = {
+    "outage": [
+        "Massive outage in {region}! No service!",
+        "Network down in {region}, can't make calls.",
+        "Tower down near {region}, no coverage at all.",
+    ],
+    "speed": [
+        "Data is super slow in {region}, unusable.",
+        "High latency and ping spikes in {region}.",
+        "Video keeps buffering in {region}, terrible speed.",
+    ],
+    "billing": [
+        "Unexpected charge on my billing statement, {region} store can't help.",
+        "Billing error again, still waiting on a credit in {region}.",
+    ],
+    "support": [
+        "Support agent in {region} closed my ticket without help.",
+        "Waited an hour for support in {region}, bad experience.",
+    ],
+}
+
+POSITIVE_TEMPLATES = [
+    "Great speeds in {region} today, love it!",
+    "Kudos to the crew in {region}, service is excellent.",
+    "Amazing coverage in {region}, super happy.",
+    "Fast and awesome network in {region}, thank you!",
+]
+
+
+class KPICurve(BaseModel):
+    base_download_mbps: float = 120.0  # used when a region has no stored KPI
+    base_latency_ms: float = 35.0
+    download_drop: float = Field(0.5, ge=0.0, le=1.0)  # fraction lost at full intensity
+    latency_rise: float = Field(1.0, ge=0.0)  # fractional increase at full intensity
+    noise: float = Field(0.03, ge=0.0)  # relative Gaussian noise per sample
+    ramp: Optional[Ramp] = None  # defaults to the scenario ramp
+
+
+class ScenarioSpec(BaseModel):
+    name: str = "scenario"
+    regions: List[str]
+    start: Optional[datetime] = None
+    duration_minutes: float = Field(30.0, gt=0)
+    tick_seconds: float = Field(60.0, gt=0)
+    ramp: Ramp = "linear"
+    ramp_minutes: float = Field(10.0, gt=0)
+    event_rate_per_minute: float = Field(10.0, ge=0)  # negative events per region at peak
+    topic_mix: Dict[str, float] = {"outage": 0.5, "speed": 0.3, "billing": 0.1, "support": 0.1}
+    background_rate_per_minute: float = Field(2.0, ge=0)  # positive events per region
+    kpi: KPICurve = KPICurve()
+    recompute_every_ticks: int = Field(5, ge=0)  # 0 = only once at the end
+    target_events_per_second: Optional[float] = Field(None, gt=0)
+    seed: int = 0
+
+
+def ramp_curve(shape: str, minutes: np.ndarray, ramp_minutes: float) -> np.ndarray:
+    """
+    Incident intensity in [0, 1] at each simulated minute.
+    """
+    x = np.asarray(minutes, dtype=float) / ramp_minutes
+    if shape == "step":
+        return np.ones_like(x)
+    if shape == "linear":
+        return np.clip(x, 0.0, 1.0)
+    if shape == "exponential":
+        return 1.0 - np.exp(-3.0 * x)
+    if shape == "spike":
+        return np.where(x <= 1.0, x, np.exp(-(x - 1.0)))
+    raise ValueError(f"Unknown ramp shape: {shape!r}")
+
+
+def _base_kpis(db: Session, regions: List[str], curve: KPICurve) -> Dict[str, tuple]:
+    latest = latest_kpis(db, regions)
+    return {
+        r: (latest[r].download_mbps, latest[r].latency_ms) if r in latest
+        else (curve.base_download_mbps, curve.base_latency_ms)
+        for r in regions
+    }
+
+
+class ScenarioPlan:
+    """
+    Every random draw of a run, made up front from the seed: per-tick counts,
+    topic/template choices and KPI samples. Same spec and seed, same scenario.
+    """
+
+    def __init__(self, spec: ScenarioSpec, base_kpis: Dict[str, tuple]) -> None:
+        rng = np.random.default_rng(spec.seed)
+        self.spec = spec
+        self.n_ticks = max(1, math.ceil(spec.duration_minutes * 60 / spec.tick_seconds))
+        tick_minutes = spec.tick_seconds / 60.0
+        self.offsets = np.arange(self.n_ticks) * spec.tick_seconds
+        minutes = self.offsets / 60.0
+        intensity = ramp_curve(spec.ramp, minutes, spec.ramp_minutes)
+        kpi_intensity = ramp_curve(spec.kpi.ramp or spec.ramp, minutes, spec.ramp_minutes)
+        n_regions = len(spec.regions)
+
+        self.negative = rng.poisson(
+            np.outer(intensity, np.full(n_regions, spec.event_rate_per_minute * tick_minutes))
+        )
+        self.positive = rng.poisson(spec.background_rate_per_minute * tick_minutes, size=(self.n_ticks, n_regions))
+
+        topics = [t for t, w in spec.topic_mix.items() if w > 0 and t in TOPIC_TEMPLATES]
+        if spec.event_rate_per_minute > 0 and not topics:
+            raise ValueError(f"topic_mix needs a positive weight for one of {sorted(TOPIC_TEMPLATES)}")
+        weights = np.array([spec.topic_mix[t] for t in topics], dtype=float)
+        self.topics = topics
+        total_neg = int(self.negative.sum())
+        self.topic_idx = rng.choice(len(topics), size=total_neg, p=weights / weights.sum()) if total_neg else np.empty(0, int)
+        # Template choice as a uniform draw scaled by each topic's template count
+        self.template_u = rng.random(total_neg)
+        self.positive_idx = rng.integers(0, len(POSITIVE_TEMPLATES), size=int(self.positive.sum()))
+        self.jitter = rng.random(total_neg + int(self.positive.sum())) * spec.tick_seconds
+
+        base = np.array([base_kpis[r] for r in spec.regions], dtype=float).reshape(n_regions, 2)
+        noise = rng.normal(1.0, spec.kpi.noise, size=(self.n_ticks, n_regions, 2))
+        self.download = np.maximum(0.1, base[:, 0] * (1.0 - spec.kpi.download_drop * kpi_intensity[:, None]) * noise[..., 0])
+        self.latency = np.maximum(1.0, base[:, 1] * (1.0 + spec.kpi.latency_rise * kpi_intensity[:, None]) * noise[..., 1])
+
+        self._neg_pos = 0
+        self._pos_pos = 0
+
+    @property
+    def total_events(self) -> int:
+        return int(self.negative.sum() + self.positive.sum())
+
+    def tick(self, i: int, tick_start: datetime, backfill: bool) -> tuple:
+        """
+        Event and KPI records for tick i (ticks must be consumed in order).
+        """
+        spec = self.spec
+        events: List[dict] = []
+        kpis: List[dict] = []
+        j = self._neg_pos + self._pos_pos
+        for r, region in enumerate(spec.regions):
+            for _ in range(int(self.negative[i, r])):
+                templates = TOPIC_TEMPLATES[self.topics[self.topic_idx[self._neg_pos]]]
+                text = templates[int(self.template_u[self._neg_pos] * len(templates))]
+                events.append({"region": region, "text": text.format(region=region)})
+                self._neg_pos += 1
+            for _ in range(int(self.positive[i, r])):
+                text = POSITIVE_TEMPLATES[self.positive_idx[self._pos_pos]]
+                events.append({"region": region, "text": text.format(region=region)})
+                self._pos_pos += 1
+            kpis.append({
+                "ts": tick_start,
+                "region": region,
+                "download_mbps": float(self.download[i, r]),
+                "latency_ms": float(self.latency[i, r]),
+            })
+        for k, e in enumerate(events):
+            # Live runs stamp at emission; backfill spreads events across the tick
+            e["ts"] = tick_start + timedelta(seconds=float(self.jitter[j + k])) if backfill else tick_start
+        return events, kpis
+
+
+def _percentile_ms(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else 0.0
+
+
+def run_scenario(db: Session, spec: ScenarioSpec) -> Dict[str, object]:
+    """
+    Stream a scenario through ingest, CHI recompute and alerting; returns throughput metrics.
+    Backfill runs (spec.start set) score CHI at simulated time and skip alerting.
+    """
+    regions = list(dict.fromkeys(spec.regions))
+    spec = spec.model_copy(update={"regions": regions})
+    plan = ScenarioPlan(spec, _base_kpis(db, regions, spec.kpi))
+    backfill = spec.start is not None
+    print(f"[DEBUG] Scenario {spec.name!r}: {plan.n_ticks} tick(s), {len(regions)} region(s), "
+          f"~{plan.total_events} events, seed={spec.seed}")
+
+    timings = {"ingest_s": 0.0, "kpi_s": 0.0, "chi_s": 0.0, "alerts_s": 0.0, "throttle_s": 0.0}
+    tick_latency: List[float] = []
+    counts = {"events": 0, "kpis": 0, "chi_rows": 0, "alerts": 0}
+    alerted_regions: Dict[str, int] = {}
+
+    def recompute(as_of: Optional[datetime]) -> None:
+        t0 = time.perf_counter()
+        counts["chi_rows"] += len(recompute_and_store_chi(db, regions, as_of=as_of))
+        t1 = time.perf_counter()
+        alerts = [] if backfill else generate_alerts_for_regions(db, regions)
+        timings["chi_s"] += t1 - t0
+        timings["alerts_s"] += time.perf_counter() - t1
+        counts["alerts"] += len(alerts)
+        for a in alerts:
+            alerted_regions[a.region] = alerted_regions.get(a.region, 0) + 1
+
+    run_start = time.perf_counter()
+    tick_end: Optional[datetime] = None
+    for i in range(plan.n_ticks):
+        tick_start = spec.start + timedelta(seconds=float(plan.offsets[i])) if backfill else datetime.utcnow()
+        events, kpis = plan.tick(i, tick_start, backfill)
+        if backfill:
+            tick_end = tick_start + timedelta(seconds=spec.tick_seconds)
+
+        t0 = time.perf_counter()
+        ingest_events(db, events)
+        t1 = time.perf_counter()
+        ingest_kpis(db, kpis)
+        t2 = time.perf_counter()
+        timings["ingest_s"] += t1 - t0
+        timings["kpi_s"] += t2 - t1
+        tick_latency.append(t2 - t0)
+        counts["events"] += len(events)
+        counts["kpis"] += len(kpis)
+
+        if spec.recompute_every_ticks and (i + 1) % spec.recompute_every_ticks == 0:
+            recompute(tick_end)
+
+        if spec.target_events_per_second:
+            # Pace so cumulative emission never runs ahead of the target rate
+            ahead = counts["events"] / spec.target_events_per_second - (time.perf_counter() - run_start)
+            if ahead > 0:
+                time.sleep(ahead)
+                timings["throttle_s"] += ahead
+
+    if not spec.recompute_every_ticks or plan.n_ticks % spec.recompute_every_ticks:
+        recompute(tick_end)
+    elapsed = time.perf_counter() - run_start
+    busy = max(elapsed - timings["throttle_s"], 1e-9)
+
+    return {
+        "name": spec.name,
+        "seed": spec.seed,
+        "ticks": plan.n_ticks,
+        "regions": len(regions),
+        "mode": "backfill" if backfill else "live",
+        "chi_as_of": tick_end.isoformat() if tick_end else None,
+        "alerting": "skipped (backfill)" if backfill else "enabled",
+        **counts,
+        "alerts_by_region": alerted_regions,
+        "elapsed_s": round(elapsed, 3),
+        "events_per_s": round(counts["events"] / elapsed, 1) if elapsed else 0.0,
+        "events_per_busy_s": round(counts["events"] / busy, 1),
+        "tick_ingest_p50_ms": _percentile_ms(tick_latency, 50),
+        "tick_ingest_p95_ms": _percentile_ms(tick_latency, 95),
+        **{k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a synthetic multi-region scenario through ingest, CHI and alerting")
+    parser.add_argument("spec", nargs="?", help="JSON file with a ScenarioSpec")
+    parser.add_argument("--regions", nargs="+", help="regions (when no spec file is given)")
+    parser.add_argument("--minutes", type=float, default=30.0, help="simulated duration")
+    parser.add_argument("--ramp", default="linear", choices=["step", "linear", "exponential", "spike"])
+    parser.add_argument("--rate", type=float, default=10.0, help="peak negative events per region per minute")
+    parser.add_argument("--target-eps", type=float, default=None, help="throttle to this many events per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            spec = ScenarioSpec.model_validate(json.load(f))
+    elif args.regions:
+        spec = ScenarioSpec(
+            regions=args.regions,
+            duration_minutes=args.minutes,
+            ramp=args.ramp,
+            event_rate_per_minute=args.rate,
+            target_events_per_second=args.target_eps,
+            seed=args.seed,
+        )
+    else:
+        parser.error("give a spec file or --regions")
+
+    from .database import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as db:
+        print(json.dumps(run_scenario(db, spec), indent=2))
+
+
+if __name__ == "__main__":
+    main()
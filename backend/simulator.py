@@ -1,8 +1,13 @@
 from __future__ import annotations
+import argparse
+import os
+import time
 from datetime import datetime, timedelta
-from typing import List
-import random
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 
+import numpy as np
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from .models import Event, KPI
@@ -18,6 +23,106 @@ NEGATIVE_TEMPLATES = [
     "Anyone else having issues in {region}?",
 ]
 
+OUTAGE_KEYWORDS = ["outage", "down", "slow", "latency"]
+
+# Rows per INSERT batch; everything still goes into one transaction
+SIMULATOR_BATCH_ROWS = int(os.getenv("SIMULATOR_BATCH_ROWS", "50000"))
+
+
+def latest_kpis(db: Session, regions: Sequence[str]) -> Dict[str, KPI]:
+    """
+    Most recent KPI row per region, in one query.
+    """
+    latest = (
+        select(KPI.region, func.max(KPI.ts).label("ts"))
+        .where(KPI.region.in_(list(regions)))
+        .group_by(KPI.region)
+        .subquery()
+    )
+    rows = db.scalars(
+        select(KPI).join(latest, (KPI.region == latest.c.region) & (KPI.ts == latest.c.ts))
+    ).all()
+    return {k.region: k for k in rows}
+
+
+def _insert_batches(db: Session, model, rows: Iterable[dict], batch: int) -> int:
+    # Rows are consumed lazily so large scenarios never materialize all dicts at once
+    rows = iter(rows)
+    total = 0
+    while True:
+        chunk = list(islice(rows, batch))
+        if not chunk:
+            return total
+        db.connection().execute(model.__table__.insert(), chunk)
+        total += len(chunk)
+
+
+def _event_rows(
+    regions: Sequence[str], minutes: List[datetime], rate: int, rng: np.random.Generator
+) -> Iterator[dict]:
+    minute_idx = np.repeat(np.arange(len(minutes)), rate).tolist()
+    for region in regions:
+        texts = [clean_text(t.format(region=region)) for t in NEGATIVE_TEMPLATES]
+        sentiments = [min(-0.5, compute_sentiment(t) - 0.3) for t in texts]
+        template_idx = rng.integers(0, len(texts), size=len(minute_idx)).tolist()
+        for m, t in zip(minute_idx, template_idx):
+            yield {
+                "ts": minutes[m],
+                "region": region,
+                "source_id": None,
+                "text": texts[t],
+                "rating": None,
+                "keywords": OUTAGE_KEYWORDS,
+                "sentiment": sentiments[t],
+                "topic": "outage",
+            }
+
+
+def simulate_outage_bulk(
+    db: Session,
+    regions: Sequence[str],
+    impact_percent: int = 50,
+    duration_minutes: int = 30,
+    event_rate_per_minute: int = 3,
+    seed: Optional[int] = None,
+    start: Optional[datetime] = None,
+    batch_rows: int = SIMULATOR_BATCH_ROWS,
+) -> Dict[str, int]:
+    """
+    Generate an outage scenario for `regions` as arrays and bulk-insert it in one transaction.
+
+    Per region and minute: `event_rate_per_minute` negative events from random templates
+    and one KPI row degraded by `impact_percent` from the region's latest KPI (fetched once).
+    Text cleaning and sentiment run once per template, not per event.
+    """
+    regions = list(dict.fromkeys(regions))
+    rng = np.random.default_rng(seed)
+    start = start or datetime.utcnow()
+    minutes = [start + timedelta(minutes=i) for i in range(duration_minutes)]
+    factor = impact_percent / 100.0
+
+    kpis: List[dict] = []
+    base = latest_kpis(db, regions) if duration_minutes > 0 else {}
+    for region in regions:
+        latest = base.get(region)
+        if latest is None:
+            continue
+        download = max(0.1, latest.download_mbps * (1.0 - factor))
+        latency = latest.latency_ms * (1.0 + factor)
+        kpis.extend(
+            {"ts": ts, "region": region, "download_mbps": download, "latency_ms": latency}
+            for ts in minutes
+        )
+
+    try:
+        n_events = _insert_batches(db, Event, _event_rows(regions, minutes, event_rate_per_minute, rng), batch_rows)
+        n_kpis = _insert_batches(db, KPI, kpis, batch_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"regions": len(regions), "events": n_events, "kpis": n_kpis}
+
 
 def simulate_outage(
     db: Session,
@@ -25,47 +130,42 @@ def simulate_outage(
     impact_percent: int = 50,
     duration_minutes: int = 30,
     event_rate_per_minute: int = 3,
-) -> List[Event]:
+) -> int:
     """
     Inject synthetic negative events and degrade KPIs. impact_percent reduces download and increases latency.
+    Returns the number of events created.
     """
-    now = datetime.utcnow()
-    created: List[Event] = []
-    for i in range(duration_minutes):
-        ts = now + timedelta(minutes=i)
-        for _ in range(event_rate_per_minute):
-            txt = random.choice(NEGATIVE_TEMPLATES).format(region=region)
-            txt = clean_text(txt)
-            sent = min(-0.5, compute_sentiment(txt) - 0.3)
-            e = Event(
-                ts=ts,
-                region=region,
-                source_id=None,
-                text=txt,
-                rating=None,
-                keywords=["outage", "down", "slow", "latency"],
-                sentiment=sent,
-                topic="outage",
-            )
-            db.add(e)
-            created.append(e)
-        # KPI degradation
-        # Fetch latest KPI to base from
-        latest = (
-            db.query(KPI)
-            .filter(KPI.region == region)
-            .order_by(KPI.ts.desc())
-            .first()
+    result = simulate_outage_bulk(
+        db,
+        [region],
+        impact_percent=impact_percent,
+        duration_minutes=duration_minutes,
+        event_rate_per_minute=event_rate_per_minute,
+    )
+    return result["events"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-generate a synthetic outage (load-test data)")
+    parser.add_argument("regions", nargs="+", help="regions to degrade")
+    parser.add_argument("--impact", type=int, default=50, help="percent KPI degradation")
+    parser.add_argument("--minutes", type=int, default=30, help="scenario duration")
+    parser.add_argument("--rate", type=int, default=3, help="events per region per minute")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for template choice")
+    args = parser.parse_args()
+
+    from .database import SessionLocal, init_db
+
+    init_db()
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        result = simulate_outage_bulk(
+            db, args.regions, args.impact, args.minutes, args.rate, seed=args.seed
         )
-        if latest:
-            degraded = KPI(
-                ts=ts,
-                region=region,
-                download_mbps=max(0.1, latest.download_mbps * (1.0 - impact_percent / 100.0)),
-                latency_ms=latest.latency_ms * (1.0 + impact_percent / 100.0),
-            )
-            db.add(degraded)
-    db.commit()
-    return created
+    elapsed = time.perf_counter() - t0
+    print(f"[DEBUG] Simulated {result['events']} events and {result['kpis']} KPI rows "
+          f"for {result['regions']} region(s) in {elapsed:.2f}s")
 
 
+if __name__ == "__main__":
+    main()
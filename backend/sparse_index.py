@@ -0,0 +1,134 @@
+from __future__ import annotations
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+
+# Keeps identifiers such as "twr-1042", "pixel_8" or "5g" together as one token
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokenizer for the sparse index.
+    Compound identifiers are emitted whole and as their parts, so both
+    "twr-1042" and "1042" match the same document.
+    """
+    tokens: List[str] = []
+    for tok in TOKEN_RE.findall((text or "").lower()):
+        if tok in ENGLISH_STOP_WORDS:
+            continue
+        tokens.append(tok)
+        if any(sep in tok for sep in "-_."):
+            for part in re.split(r"[-_.]", tok):
+                if part and part not in ENGLISH_STOP_WORDS:
+                    tokens.append(part)
+    return tokens
+
+
+class SparseIndex:
+    """
+    In-memory BM25 inverted index that is updated one document at a time.
+    Documents can be added, replaced and removed without rebuilding the index,
+    so it can track a moving window of events and alerts. IDF is computed per
+    query term from the posting list length, so writes never invalidate anything.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {doc_id: tf}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._payloads: Dict[str, Any] = {}
+        self._total_len = 0
+        self._version = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def get(self, doc_id: str) -> Any:
+        return self._payloads.get(doc_id)
+
+    def doc_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._doc_len.keys())
+
+    def add(self, doc_id: str, text: str, payload: Any = None) -> None:
+        """
+        Index `text` under `doc_id`, replacing any previous version of the document.
+        """
+        tf = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._doc_len:
+                self._remove_locked(doc_id)
+            for term, cnt in tf.items():
+                self._postings[term][doc_id] = cnt
+            length = sum(tf.values())
+            self._doc_terms[doc_id] = set(tf.keys())
+            self._doc_len[doc_id] = length
+            self._payloads[doc_id] = payload
+            self._total_len += length
+            self._version += 1
+
+    def add_many(self, docs: Iterable[Tuple[str, str, Any]]) -> None:
+        for doc_id, text, payload in docs:
+            self.add(doc_id, text, payload)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            if doc_id in self._doc_len:
+                self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id, set()):
+            plist = self._postings.get(term)
+            if plist is None:
+                continue
+            plist.pop(doc_id, None)
+            if not plist:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+        self._payloads.pop(doc_id, None)
+        self._version += 1
+
+    def _idf(self, term: str, n_docs: int) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) if df else 0.0
+
+    def search(self, query: str, top_k: int = 10, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Returns up to `top_k` (doc_id, bm25_score) pairs, best first.
+        """
+        q_terms = set(tokenize(query))
+        if not q_terms:
+            return []
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs if n_docs else 0.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in q_terms:
+                plist = self._postings.get(term)
+                if not plist:
+                    continue
+                idf = self._idf(term, n_docs)
+                for doc_id, tf in plist.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[doc_id] / max(avg_len, 1e-9))
+                    scores[doc_id] += idf * (tf * (self.k1 + 1.0)) / (tf + norm)
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
+        return [(d, s) for d, s in ranked if s > min_score]
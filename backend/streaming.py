@@ -0,0 +1,101 @@
+"""
+Server-sent-event helpers for streaming LLM answers.
+
+Streams are sequences of (event, data) pairs:
+- "evidence": retrieval results, sent before the LLM is called
+- "token": {"text": ...} increments of the answer as they arrive
+- "done": the same JSON body the non-streaming endpoint returns
+- "error": {"message": ...}
+"""
+from __future__ import annotations
+import json
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+StreamEvent = Tuple[str, Any]
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Disable proxy buffering (nginx) so tokens reach the client as they are produced
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_stream(events: Iterable[StreamEvent]) -> Iterator[str]:
+    """
+    Serialize events as SSE; an exception mid-stream becomes a final "error" event.
+    """
+    try:
+        for event, data in events:
+            yield sse_event(event, data)
+    except Exception as e:
+        print(f"[DEBUG] Stream failed: {e}")
+        yield sse_event("error", {"message": str(e)})
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONStringFieldStream:
+    """
+    Incrementally extract the string value of one top-level key from a JSON object
+    that is still being generated, so a JSON-mode completion can be shown as it streams.
+    """
+
+    def __init__(self, key: str) -> None:
+        self._marker = f'"{key}"'
+        self._buf = ""
+        self._pos: Optional[int] = None  # index just after the opening quote of the value
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add raw completion text; return newly decoded characters of the value.
+        """
+        if self._done or not chunk:
+            return ""
+        self._buf += chunk
+        if self._pos is None:
+            i = self._buf.find(self._marker)
+            if i < 0:
+                return ""
+            j = i + len(self._marker)
+            while j < len(self._buf) and self._buf[j] in " \t\r\n:":
+                j += 1
+            if j >= len(self._buf):
+                return ""
+            if self._buf[j] != '"':
+                self._done = True  # not a string value
+                return ""
+            self._pos = j + 1
+        out = []
+        i = self._pos
+        while i < len(self._buf):
+            c = self._buf[i]
+            if c == "\\":
+                if i + 1 >= len(self._buf):
+                    break  # wait for the rest of the escape
+                esc = self._buf[i + 1]
+                if esc == "u":
+                    if i + 6 > len(self._buf):
+                        break
+                    try:
+                        out.append(chr(int(self._buf[i + 2:i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if c == '"':
+                self._done = True
+                i += 1
+                break
+            out.append(c)
+            i += 1
+        self._pos = i
+        return "".join(out)
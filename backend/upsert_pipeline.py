@@ -0,0 +1,125 @@
+"""
+Pipelined Pinecone upserts.
+
+Embedding batch N+1 on the calling thread overlaps with upserting batch N on a
+thread pool. Upsert requests are sized from the actual payload so they stay
+under Pinecone's request limits, and failed requests are retried with
+exponential backoff (or split in half when the server says they are too large).
+"""
+from __future__ import annotations
+import json
+import os
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
+
+# Pinecone limits: 2 MB per upsert request, 1000 vectors per request
+MAX_REQUEST_BYTES = int(os.getenv("PINECONE_MAX_REQUEST_BYTES", str(2 * 1024 * 1024)))
+MAX_VECTORS_PER_REQUEST = int(os.getenv("PINECONE_MAX_VECTORS_PER_REQUEST", "1000"))
+# Leave headroom for request envelope and JSON/proto encoding differences
+PAYLOAD_SAFETY = 0.8
+UPSERT_WORKERS = int(os.getenv("PINECONE_UPSERT_WORKERS", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("PINECONE_UPSERT_MAX_RETRIES", "5"))
+
+
+def estimate_vector_bytes(vec: Dict[str, Any]) -> int:
+    """
+    Approximate serialized size of one vector: ~12 bytes per float as JSON,
+    plus id and metadata.
+    """
+    values = vec.get("values") or []
+    meta = vec.get("metadata") or {}
+    return 12 * len(values) + len(str(vec.get("id", ""))) + len(json.dumps(meta, default=str)) + 32
+
+
+def split_by_payload(
+    vectors: Sequence[Dict[str, Any]],
+    max_bytes: int = MAX_REQUEST_BYTES,
+    max_count: int = MAX_VECTORS_PER_REQUEST,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack vectors into requests that respect both the byte and the count limit.
+    """
+    budget = int(max_bytes * PAYLOAD_SAFETY)
+    batches: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    size = 0
+    for vec in vectors:
+        vb = estimate_vector_bytes(vec)
+        if current and (size + vb > budget or len(current) >= max_count):
+            batches.append(current)
+            current, size = [], 0
+        current.append(vec)
+        size += vb
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_too_large(err: Exception) -> bool:
+    msg = str(err).lower()
+    status = getattr(err, "status", None) or getattr(err, "status_code", None)
+    return status == 413 or "too large" in msg or ("exceeds" in msg and "size" in msg)
+
+
+def upsert_with_retry(index: Any, vectors: List[Dict[str, Any]], namespace: str, max_retries: int = UPSERT_MAX_RETRIES) -> int:
+    """
+    Upsert one request, retrying transient failures with exponential backoff and jitter.
+    A request rejected as too large is split in half and each half retried.
+    """
+    attempt = 0
+    while True:
+        try:
+            index.upsert(vectors=vectors, namespace=namespace)
+            return len(vectors)
+        except Exception as e:
+            if _is_too_large(e) and len(vectors) > 1:
+                mid = len(vectors) // 2
+                print(f"[DEBUG] Upsert of {len(vectors)} vectors too large, splitting")
+                return (
+                    upsert_with_retry(index, vectors[:mid], namespace, max_retries)
+                    + upsert_with_retry(index, vectors[mid:], namespace, max_retries)
+                )
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = min(30.0, 0.5 * (2 ** (attempt - 1))) * (0.5 + random.random())
+            print(f"[DEBUG] Upsert failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def pipelined_upsert(
+    index: Any,
+    namespace: str,
+    records: Sequence[Any],
+    build_vectors: Callable[[List[Any]], List[Dict[str, Any]]],
+    embed_batch_size: int = 64,
+    workers: int = UPSERT_WORKERS,
+    progress: bool = True,
+) -> int:
+    """
+    Embed `records` in batches of `embed_batch_size` via `build_vectors` (which returns
+    Pinecone vector dicts) while previous batches are upserted on `workers` threads.
+    Returns the number of vectors upserted.
+    """
+    if not records:
+        return 0
+    namespace = namespace or "default"
+    total = 0
+    max_in_flight = max(1, workers * 2)
+    in_flight: List[Future] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pinecone-upsert") as pool:
+        for i in range(0, len(records), embed_batch_size):
+            batch = list(records[i:i + embed_batch_size])
+            vectors = build_vectors(batch)
+            for request in split_by_payload(vectors):
+                in_flight.append(pool.submit(upsert_with_retry, index, request, namespace))
+            # Backpressure: don't let embedding run arbitrarily far ahead of upserts
+            while len(in_flight) > max_in_flight:
+                total += in_flight.pop(0).result()
+            if progress:
+                print(f"[DEBUG] Embedded {min(i + embed_batch_size, len(records))}/{len(records)}, {len(in_flight)} upserts in flight")
+        for fut in in_flight:
+            total += fut.result()
+    return total
@@ -18,6 +18,12 @@ except ImportError:
 
 from sentence_transformers import SentenceTransformer
 
+from .embedding_service import EmbeddingBatcher
+from .embedding_profiles import get_profile, index_name_for, load_model, load_tokenizer, query_prefix, passage_prefix
+from .upsert_pipeline import pipelined_upsert
+from .chunking import approx_token_counts, chunk_text as _chunk_text, tokenizer_counter
+from .cache import TTLCache
+
 try:
     # Modern Pinecone SDK
     from pinecone import Pinecone, ServerlessSpec
@@ -35,24 +41,34 @@ except Exception as e:
     ServerlessSpec = None  # type: ignore
 
 _embedder: Optional[SentenceTransformer] = None
+_tokenizer: Optional[Any] = None
+_tokenizer_failed = False
 _pc: Optional[Any] = None
 _index: Optional[Any] = None
 _dim: Optional[int] = None
+# Query embeddings from concurrent requests are coalesced into one forward pass
+_query_batcher = EmbeddingBatcher(lambda texts: _load_embedder().encode(texts, normalize_embeddings=True))
+# Bumped on every upsert from this process; part of the retrieval cache key so
+# cached results never outlive an ingest. The TTL covers ingests from other processes.
+_index_version = 0
+_retrieval_cache = TTLCache(
+    maxsize=int(os.getenv("RETRIEVAL_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("RETRIEVAL_CACHE_TTL", "300")),
+)
 
 
 def _load_embedder() -> SentenceTransformer:
     global _embedder, _dim
     if _embedder is None:
-        # Default to 1024-dim multilingual model to match common Pinecone presets
-        model_name = os.getenv("EMBEDDINGS_MODEL", "intfloat/multilingual-e5-large")
-        _embedder = SentenceTransformer(model_name)
-        # all-MiniLM-L6-v2 output dimension is 384
+        # Profile picks the model, loader (torch/int8/onnx) and expected dimension
+        profile = get_profile()
+        print(f"[DEBUG] Loading embedding profile '{profile['name']}' ({profile['model']})")
+        _embedder = load_model(profile)
         try:
             test_vec = _embedder.encode(["dim_check"], normalize_embeddings=True)
             _dim = int(test_vec.shape[1])
         except Exception:
-            # Fallback to the common dim for e5-large
-            _dim = 1024
+            _dim = int(profile["dim"])
     return _embedder
 
 
@@ -68,7 +84,10 @@ def _get_pinecone() -> Any:
             )
         if Pinecone is None:
             raise RuntimeError("Pinecone SDK not installed. Run: pip install pinecone")
-        _pc = Pinecone(api_key=api_key)
+        # PINECONE_CONTROLLER_HOST points the control plane at a stand-in such as
+        # backend/pinecone_local.py; index hosts are then discovered from it
+        controller = os.getenv("PINECONE_CONTROLLER_HOST")
+        _pc = Pinecone(api_key=api_key, host=controller) if controller else Pinecone(api_key=api_key)
     return _pc
 
 
@@ -79,7 +98,7 @@ def _get_index() -> Any:
     pc = _get_pinecone()
     _load_embedder()
     assert _dim is not None
-    index_name = os.getenv("PINECONE_INDEX", "t-mobile")
+    index_name = index_name_for(get_profile())
     existing = {idx["name"] for idx in pc.list_indexes()}
     if index_name not in existing:
         cloud = os.getenv("PINECONE_CLOUD", "aws")
@@ -96,22 +115,49 @@ def _get_index() -> Any:
     return _index
 
 
-def chunk_text(text: str, chunk_size: int = 800, overlap: int = 120) -> List[str]:
-    text = (text or "").strip()
-    if not text:
-        return []
-    chunks: List[str] = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(n, start + chunk_size)
-        chunks.append(text[start:end])
-        if end >= n:
-            break
-        start = end - overlap
-        if start < 0:
-            start = 0
-    return chunks
+def _chunk_tokenizer() -> Tuple[Optional[Any], int]:
+    """
+    Tokenizer and max sequence length for chunking. Reuses the embedder's when it is
+    already loaded, otherwise loads just the tokenizer, not the model weights.
+    """
+    global _tokenizer, _tokenizer_failed
+    if _embedder is not None:
+        return getattr(_embedder, "tokenizer", None), int(getattr(_embedder, "max_seq_length", None) or 512)
+    if _tokenizer is None:
+        if _tokenizer_failed:
+            return None, 512
+        try:
+            _tokenizer = load_tokenizer(get_profile())
+        except Exception as e:
+            print(f"[DEBUG] Tokenizer unavailable, approximating token counts: {e}")
+            _tokenizer_failed = True
+            return None, 512
+    # Some tokenizers report a huge sentinel instead of a real limit
+    return _tokenizer, min(int(getattr(_tokenizer, "model_max_length", 512) or 512), 512)
+
+
+def chunk_text(text: str, chunk_size: Optional[int] = None, overlap: int = 120) -> List[str]:
+    """
+    Sentence-aware chunks that fit the embedder's max sequence length (minus the
+    prefix and special tokens). `chunk_size` optionally caps chunks in characters
+    as well; `overlap` is in characters (~4 per token).
+    """
+    prefix = passage_prefix(get_profile())
+    tokenizer, max_seq = _chunk_tokenizer()
+    count = tokenizer_counter(tokenizer) if tokenizer is not None else approx_token_counts
+    reserved = 2 + (count([prefix])[0] if prefix else 0)  # [CLS]/[SEP] plus "passage: "
+    max_tokens = max(16, max_seq - reserved)
+    overlap_tokens = max(0, min(max_tokens // 4, overlap // 4))
+    return _chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens, count_tokens=count, max_chars=chunk_size)
+
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """
+    Embed query strings through the shared micro-batching scheduler.
+    """
+    prefix = query_prefix(get_profile())
+    vectors = _query_batcher.encode([prefix + q for q in queries])
+    return [v.tolist() for v in vectors]
 
 
 def upsert_texts(texts: List[str], namespace: str = "default", metadata: Optional[Dict[str, Any]] = None) -> int:
@@ -119,43 +165,78 @@ def upsert_texts(texts: List[str], namespace: str = "default", metadata: Optiona
         return 0
     embedder = _load_embedder()
     index = _get_index()
-    vectors = embedder.encode(texts, normalize_embeddings=True)
-    items = []
-    for i, vec in enumerate(vectors):
-        meta = {"text": texts[i]}
-        if metadata:
-            meta.update(metadata)
-        items.append(
-            {
-                "id": str(uuid.uuid4()),
-                "values": vec.tolist(),
-                "metadata": meta,
-            }
-        )
-    index.upsert(vectors=items, namespace=namespace)
-    return len(items)
+
+    def build(batch: List[str]) -> List[Dict[str, Any]]:
+        vectors = embedder.encode(batch, normalize_embeddings=True)
+        items = []
+        for text, vec in zip(batch, vectors):
+            meta = {"text": text}
+            if metadata:
+                meta.update(metadata)
+            items.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "values": vec.tolist(),
+                    "metadata": meta,
+                }
+            )
+        return items
+
+    try:
+        return pipelined_upsert(index, namespace, texts, build, progress=False)
+    finally:
+        # Even a partially failed upsert may have changed the index
+        _bump_index_version()
+
+
+def _bump_index_version() -> None:
+    global _index_version
+    _index_version += 1
+    _retrieval_cache.clear()
+
+
+def retrieval_cache_stats() -> Dict[str, Any]:
+    stats = _retrieval_cache.stats()
+    stats["index_version"] = _index_version
+    return stats
 
 
 def query_text(query: str, top_k: int = 8, namespace: str = "default", region_filter: Optional[str] = None, issue_type_filter: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Query Pinecone with optional region and issue_type filtering.
     If filters are provided and return 0 results, falls back to unfiltered query.
+    Results are cached per (query, top_k, namespace, filters, index version).
     """
     if not (query or "").strip():
         return []
-    
-    embedder = _load_embedder()
-    index = _get_index()
-    index_name = os.getenv("PINECONE_INDEX", "t-mobile")
-    
-    # E5 models expect "query: " prefix for queries
-    model_name = os.getenv("EMBEDDINGS_MODEL", "intfloat/multilingual-e5-large")
-    if "e5" in model_name.lower():
-        query_prefixed = "query: " + query
+    key = (
+        " ".join(query.split()),
+        top_k,
+        namespace,
+        region_filter,
+        issue_type_filter,
+        index_name_for(get_profile()),
+        _index_version,
+    )
+    cached = _retrieval_cache.get(key)
+    if cached is not None:
+        print(f"[DEBUG] Retrieval cache hit ({len(cached)} results)")
     else:
-        query_prefixed = query
+        cached = _query_pinecone(query, top_k, namespace, region_filter, issue_type_filter)
+        # Don't cache results computed against an index that changed mid-query
+        if key[-1] == _index_version:
+            _retrieval_cache.set(key, cached)
+    # Callers annotate result dicts (e.g. fusion scores), so hand out copies
+    return [dict(r) for r in cached]
+
+
+def _query_pinecone(query: str, top_k: int, namespace: str, region_filter: Optional[str], issue_type_filter: Optional[str]) -> List[Dict[str, Any]]:
+    index = _get_index()
+    profile = get_profile()
+    index_name = index_name_for(profile)
+    model_name = profile["model"]
     
-    qv = embedder.encode([query_prefixed], normalize_embeddings=True)[0].tolist()
+    qv = embed_queries([query])[0]
     
     # Debug logging
     print(f"[DEBUG] Pinecone query: index={index_name}, namespace={namespace}, top_k={top_k}, region_filter={region_filter}, issue_type_filter={issue_type_filter}")
@@ -275,27 +356,29 @@ def upsert_items(items_in: List[Dict[str, Any]], namespace: str = "default") ->
     embedder = _load_embedder()
     index = _get_index()
     # Use "passage: " prefix for E5 models (same as ingestion script)
-    model_name = os.getenv("EMBEDDINGS_MODEL", "intfloat/multilingual-e5-large")
-    if "e5" in model_name.lower():
-        prefixed_texts = [("passage: " + t) for t in texts]
-        vectors = embedder.encode(prefixed_texts, normalize_embeddings=True)
-    else:
-        vectors = embedder.encode(texts, normalize_embeddings=True)
-    payload = []
-    for i, vec in enumerate(vectors):
-        meta = {"text": texts[i]}  # Store original text without prefix
-        meta.update(metas[i] or {})
-        payload.append(
-            {
-                "id": ids[i] or str(uuid.uuid4()),
-                "values": vec.tolist(),
-                "metadata": meta,
-            }
-        )
+    prefix = passage_prefix(get_profile())
+
+    def build(batch: List[int]) -> List[Dict[str, Any]]:
+        vectors = embedder.encode([prefix + texts[i] for i in batch], normalize_embeddings=True)
+        payload = []
+        for i, vec in zip(batch, vectors):
+            meta = {"text": texts[i]}  # Store original text without prefix
+            meta.update(metas[i] or {})
+            payload.append(
+                {
+                    "id": ids[i] or str(uuid.uuid4()),
+                    "values": vec.tolist(),
+                    "metadata": meta,
+                }
+            )
+        return payload
+
     # Ensure namespace is "default" (not empty)
     final_namespace = namespace if namespace else "default"
-    print(f"[DEBUG] Upserting {len(payload)} vectors to namespace='{final_namespace}'")
-    index.upsert(vectors=payload, namespace=final_namespace)
-    return len(payload)
+    print(f"[DEBUG] Upserting {len(texts)} vectors to namespace='{final_namespace}'")
+    try:
+        return pipelined_upsert(index, final_namespace, list(range(len(texts))), build, progress=False)
+    finally:
+        _bump_index_version()
 
 
@@ -0,0 +1,98 @@
+"""
+Background warm-up of the embedding model and Pinecone index handle.
+
+Started from the app's startup hook so the process becomes live immediately,
+while readiness (see /health/ready) only flips once the first /qa would be fast.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_WARMUP_QUERIES = "roaming issues overseas|billing charges unexpected|slow data speeds"
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_state: Dict[str, Any] = {
+    "status": "pending",  # pending | running | ready | degraded | failed | disabled
+    "started_at": None,
+    "finished_at": None,
+    "steps": {},
+}
+
+
+def _warmup_queries() -> List[str]:
+    raw = os.getenv("WARMUP_QUERIES", DEFAULT_WARMUP_QUERIES)
+    return [q.strip() for q in raw.split("|") if q.strip()]
+
+
+def _step(name: str, fn) -> bool:
+    t0 = time.perf_counter()
+    try:
+        fn()
+        _state["steps"][name] = {"ok": True, "seconds": round(time.perf_counter() - t0, 3)}
+        print(f"[Warmup] {name} ready in {_state['steps'][name]['seconds']}s")
+        return True
+    except Exception as e:
+        _state["steps"][name] = {"ok": False, "seconds": round(time.perf_counter() - t0, 3), "error": str(e)[:300]}
+        print(f"[Warmup] {name} failed: {e}")
+        return False
+
+
+def _run() -> None:
+    _state["status"] = "running"
+    _state["started_at"] = datetime.utcnow().isoformat()
+    ok = True
+    try:
+        from .vectorstore import _load_embedder, _get_index, query_text
+    except Exception as e:
+        _state["steps"]["import"] = {"ok": False, "seconds": 0.0, "error": str(e)[:300]}
+        required_ok = False
+    else:
+        # Every /qa embeds its question, so the embedder is required; Pinecone is optional
+        required_ok = _step("embedder", _load_embedder)
+        index_ok = _step("index", _get_index)
+        ok = index_ok and ok
+        queries = _warmup_queries()
+        if queries and index_ok:
+            namespace = os.getenv("PINECONE_NAMESPACE", "default")
+            ok = _step("warm_queries", lambda: [query_text(q, top_k=3, namespace=namespace) for q in queries]) and ok
+    _state["finished_at"] = datetime.utcnow().isoformat()
+    # Degraded still counts as ready: only optional components (e.g. no Pinecone key
+    # configured) failed. A failed embedder leaves the instance not ready.
+    if not required_ok:
+        _state["status"] = "failed"
+    else:
+        _state["status"] = "ready" if ok else "degraded"
+
+
+def start_warmup() -> None:
+    """
+    Start the warm-up thread once. Set WARMUP_ENABLED=0 to skip it (ready immediately).
+    """
+    global _thread
+    with _lock:
+        if _thread is not None or _state["status"] == "disabled":
+            return
+        if os.getenv("WARMUP_ENABLED", "1").lower() in ("0", "false", "no"):
+            _state["status"] = "disabled"
+            return
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+        _thread.start()
+
+
+def is_ready() -> bool:
+    return _state["status"] in ("ready", "degraded", "disabled")
+
+
+def readiness() -> Dict[str, Any]:
+    return {
+        "ready": is_ready(),
+        "status": _state["status"],
+        "started_at": _state["started_at"],
+        "finished_at": _state["finished_at"],
+        "steps": dict(_state["steps"]),
+    }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding profiles on tmobile_reviews.jsonl: retrieval quality vs. speed.
+
+For every profile this reports:
+- load time of the model
+- passage throughput (docs/sec, batched) and single-query latency (p50/p95)
+- recall@k: a query built from a review's metadata (region, device, issue,
+  keywords) should retrieve that review in the top k
+- label precision@k: share of the top k with the same issue_type
+- overlap@k with the reference profile's top k (how closely a cheaper
+  profile reproduces what e5-large would retrieve)
+
+Search is brute-force cosine in NumPy, so no Pinecone index is needed.
+
+Usage:
+  python benchmark_embeddings.py --profiles e5-large,e5-large-int8,e5-small
+  python benchmark_embeddings.py tmobile_reviews.jsonl --limit 2000 --queries 300 --k 1,5,10 --json bench.json
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.embedding_profiles import PROFILES, get_profile, load_model, passage_prefix, query_prefix
+
+
+def load_reviews(path: str, limit: Optional[int]) -> List[Dict]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if isinstance(rec, dict) and rec.get("text"):
+                out.append(rec)
+            if limit and len(out) >= limit:
+                break
+    return out
+
+
+def build_query(rec: Dict) -> str:
+    meta = rec.get("metadata") or {}
+    parts = [
+        str(meta.get("region") or ""),
+        str(meta.get("device") or ""),
+        str(meta.get("issue_type") or "").replace("_", " "),
+        ", ".join(meta.get("keywords") or []),
+    ]
+    return " ".join(p for p in parts if p).strip()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q)) if values else 0.0
+
+
+def bench_profile(name: str, docs: List[Dict], query_idx: List[int], ks: List[int], batch_size: int) -> Dict:
+    profile = get_profile(name)
+    t0 = time.perf_counter()
+    model = load_model(profile)
+    load_s = time.perf_counter() - t0
+
+    p_prefix, q_prefix = passage_prefix(profile), query_prefix(profile)
+    texts = [p_prefix + d["text"] for d in docs]
+    t0 = time.perf_counter()
+    doc_vecs = np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+    passage_s = time.perf_counter() - t0
+
+    queries = [q_prefix + build_query(docs[i]) for i in query_idx]
+    # Warm one call so first-call overhead is not counted as query latency
+    model.encode([queries[0]], normalize_embeddings=True)
+    latencies_ms: List[float] = []
+    q_vecs = []
+    for q in queries:
+        t0 = time.perf_counter()
+        q_vecs.append(model.encode([q], normalize_embeddings=True)[0])
+        latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+    q_mat = np.asarray(q_vecs, dtype=np.float32)
+
+    max_k = max(ks)
+    sims = q_mat @ doc_vecs.T
+    top = np.argsort(-sims, axis=1)[:, :max_k]
+    targets = np.asarray(query_idx)
+    labels = np.asarray([(d.get("metadata") or {}).get("issue_type") or "" for d in docs])
+
+    result = {
+        "profile": name,
+        "model": profile["model"],
+        "dim": int(doc_vecs.shape[1]),
+        "load_s": round(load_s, 2),
+        "passages_per_s": round(len(docs) / passage_s, 1) if passage_s > 0 else None,
+        "query_p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "query_p95_ms": round(_percentile(latencies_ms, 95), 2),
+    }
+    for k in ks:
+        hit = (top[:, :k] == targets[:, None]).any(axis=1)
+        result[f"recall@{k}"] = round(float(hit.mean()), 4)
+        same_label = labels[top[:, :k]] == labels[targets][:, None]
+        result[f"label_precision@{k}"] = round(float(same_label.mean()), 4)
+    result["_top"] = top
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=str(Path(__file__).resolve().parent / "tmobile_reviews.jsonl"))
+    parser.add_argument("--profiles", default="e5-large,e5-large-int8,e5-small",
+                        help=f"Comma-separated profiles; first is the reference. Available: {', '.join(PROFILES)}")
+    parser.add_argument("--limit", type=int, default=2000, help="Max reviews to index")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--k", default="1,5,10", help="Comma-separated k values")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--json", dest="json_out", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    docs = load_reviews(args.path, args.limit)
+    if not docs:
+        raise SystemExit(f"No reviews found in {args.path}")
+    ks = sorted({int(k) for k in args.k.split(",") if k.strip()})
+    rng = random.Random(args.seed)
+    query_idx = rng.sample(range(len(docs)), min(args.queries, len(docs)))
+    names = [n.strip() for n in args.profiles.split(",") if n.strip()]
+    print(f"Loaded {len(docs)} reviews, {len(query_idx)} queries, profiles: {', '.join(names)}")
+
+    results = []
+    reference_top = None
+    for name in names:
+        print(f"\n[{name}] benchmarking...")
+        try:
+            res = bench_profile(name, docs, query_idx, ks, args.batch_size)
+        except Exception as e:
+            print(f"[{name}] skipped: {e}")
+            continue
+        top = res.pop("_top")
+        if reference_top is None:
+            reference_top = top
+        else:
+            for k in ks:
+                overlap = [len(set(a[:k]) & set(b[:k])) / k for a, b in zip(top, reference_top)]
+                res[f"overlap@{k}"] = round(float(np.mean(overlap)), 4)
+        results.append(res)
+        print(json.dumps(res, indent=2))
+
+    if results:
+        cols = ["profile", "dim", "load_s", "passages_per_s", "query_p50_ms", "query_p95_ms"] + [f"recall@{k}" for k in ks]
+        print("\n" + " | ".join(cols))
+        for r in results:
+            print(" | ".join(str(r.get(c, "")) for c in cols))
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, indent=2))
+        print(f"\nWrote {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,20 @@ Env:
   # Only needed if index doesn't exist (auto-create):
   export PINECONE_CLOUD=aws
   export PINECONE_REGION=us-east-1
+  # Optional: embedding profile (see backend/embedding_profiles.py); smaller
+  # profiles write to their own index, e.g. t-mobile-e5-small
+  export EMBEDDINGS_PROFILE=e5-large
 Usage:
   python ingest_to_pinecone_e5.py /path/to/tmobile_reviews.jsonl
 """
-import os, sys, json, time
+import os, sys, json
 from typing import List, Dict
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 
+from backend.embedding_profiles import get_profile, index_name_for, load_model, passage_prefix
+from backend.upsert_pipeline import pipelined_upsert, split_by_payload, upsert_with_retry
+from backend.dedup import dedup_records
+
 BATCH_SIZE = 64
 
 def load_jsonl(path: str) -> List[Dict]:
@@ -35,14 +41,16 @@ def load_jsonl(path: str) -> List[Dict]:
 
 def get_index():
     api_key = os.environ.get("PINECONE_API_KEY")
-    index_name = os.environ.get("PINECONE_INDEX", "t-mobile")  # Default to t-mobile
+    profile = get_profile()
+    index_name = index_name_for(profile)  # PINECONE_INDEX (default t-mobile), suffixed for smaller profiles
     namespace = os.environ.get("PINECONE_NAMESPACE", "default")  # Always use "default"
     if not api_key:
         raise SystemExit("Set PINECONE_API_KEY env var.")
     if not index_name:
         raise SystemExit("Set PINECONE_INDEX env var (or it defaults to 't-mobile').")
     print(f"[DEBUG] Using index: {index_name}, namespace: {namespace}")
-    pc = Pinecone(api_key=api_key)
+    controller = os.environ.get("PINECONE_CONTROLLER_HOST")  # e.g. local stand-in
+    pc = Pinecone(api_key=api_key, host=controller) if controller else Pinecone(api_key=api_key)
     # Auto-create index if missing
     existing = {idx["name"] for idx in pc.list_indexes()}
     if index_name not in existing:
@@ -50,24 +58,26 @@ def get_index():
         region = os.environ.get("PINECONE_REGION", "us-east-1")
         pc.create_index(
             name=index_name,
-            dimension=1024,
+            dimension=profile["dim"],
             metric="cosine",
             spec=ServerlessSpec(cloud=cloud, region=region),
         )
     # Return index handle and chosen namespace
-    return pc.Index(index_name), namespace
+    host = os.environ.get("PINECONE_HOST")
+    return (pc.Index(index_name, host=host) if host else pc.Index(index_name)), namespace
 
 def build_model():
-    # intfloat/multilingual-e5-large outputs 1024-d vectors
+    # Default profile is intfloat/multilingual-e5-large (1024-d)
     # E5 expects 'passage: ' for documents and 'query: ' for queries
-    return SentenceTransformer("intfloat/multilingual-e5-large")
+    return load_model(get_profile())
 
 def embed_passages(model, texts: List[str]) -> List[List[float]]:
-    prefixed = [("passage: " + t) for t in texts]
+    prefix = passage_prefix(get_profile())
+    prefixed = [(prefix + t) for t in texts]
     # normalize for cosine metric
     return model.encode(prefixed, convert_to_numpy=True, normalize_embeddings=True).tolist()
 
-def upsert_batch(index, namespace: str, model, batch: List[Dict]):
+def build_vectors(model, batch: List[Dict]) -> List[Dict]:
     texts = [r["text"] for r in batch]
     vecs = embed_passages(model, texts)
     pine_vecs = []
@@ -88,10 +98,15 @@ def upsert_batch(index, namespace: str, model, batch: List[Dict]):
             "values": v,
             "metadata": md
         })
+    return pine_vecs
+
+def upsert_batch(index, namespace: str, model, batch: List[Dict]):
+    pine_vecs = build_vectors(model, batch)
     # Ensure namespace is "default" (not empty)
     final_namespace = namespace if namespace else "default"
     print(f"[DEBUG] Upserting {len(pine_vecs)} vectors to namespace='{final_namespace}'")
-    index.upsert(vectors=pine_vecs, namespace=final_namespace)
+    for request in split_by_payload(pine_vecs):
+        upsert_with_retry(index, request, final_namespace)
 
 def main():
     if len(sys.argv) < 2:
@@ -99,14 +114,15 @@ def main():
     path = sys.argv[1]
     data = load_jsonl(path)
     print(f"Loaded {len(data)} docs.")
+    # Skip near-duplicate reviews before spending embedding time on them (DEDUP_ENABLED=0 to disable)
+    data, dropped = dedup_records(data)
+    print(f"Dedup: {dropped} near-duplicates skipped, {len(data)} to embed.")
     index, namespace = get_index()
     print(f"Using namespace='{namespace}'")
     model = build_model()
-    for i in range(0, len(data), BATCH_SIZE):
-        chunk = data[i:i+BATCH_SIZE]
-        upsert_batch(index, namespace, model, chunk)
-        print(f"Upserted {i+len(chunk)}/{len(data)}")
-        time.sleep(0.1)  # be gentle
+    # Embedding of batch N+1 overlaps with threaded upserts of batch N; retries/backoff replace the fixed sleep
+    upserted = pipelined_upsert(index, namespace, data, lambda batch: build_vectors(model, batch), embed_batch_size=BATCH_SIZE)
+    print(f"Upserted {upserted}/{len(data)}")
     print("Done.")
 
 if __name__ == "__main__":
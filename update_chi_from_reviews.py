@@ -31,7 +31,9 @@ from backend.utils import clean_text, compute_sentiment, extract_keywords_texts,
 
 # Import Pinecone functions
 try:
-    from ingest_to_pinecone_e5 import get_index, embed_passages, upsert_batch
+    from ingest_to_pinecone_e5 import get_index, build_vectors
+    from backend.upsert_pipeline import pipelined_upsert
+    from backend.dedup import dedup_records
     PINECONE_AVAILABLE = True
 except Exception as e:
     print(f"[WARNING] Pinecone not available: {e}")
@@ -70,24 +72,21 @@ def upsert_to_pinecone(records: List[Dict[str, Any]]) -> int:
     
     try:
         index, namespace = get_index()
-        index_name = os.getenv("PINECONE_INDEX", "t-mobile")
+        from backend.embedding_profiles import get_profile, index_name_for, load_model
+        index_name = index_name_for(get_profile())
         print(f"[INFO] Upserting to Pinecone index: {index_name}, namespace: {namespace}")
         
-        # Load embedding model
-        from sentence_transformers import SentenceTransformer
-        model_name = os.getenv("EMBEDDINGS_MODEL", "intfloat/multilingual-e5-large")
-        print(f"[INFO] Loading embedding model: {model_name}")
-        model = SentenceTransformer(model_name)
+        # Load embedding model for the configured profile
+        profile = get_profile()
+        print(f"[INFO] Loading embedding model: {profile['model']} (profile: {profile['name']})")
+        model = load_model(profile)
         
-        # Prepare batches
-        batch_size = 10
-        total_upserted = 0
+        # Near-duplicate reviews are embedded once (all reviews still go to the DB)
+        records, dropped = dedup_records(records)
+        print(f"[INFO] Dedup skipped {dropped} near-duplicate reviews")
         
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i + batch_size]
-            print(f"[INFO] Processing batch {i//batch_size + 1}/{(len(records) + batch_size - 1)//batch_size}")
-            upsert_batch(index, namespace, model, batch)
-            total_upserted += len(batch)
+        # Embed in batches of 64 while earlier batches upsert in parallel
+        total_upserted = pipelined_upsert(index, namespace, records, lambda batch: build_vectors(model, batch), embed_batch_size=64)
         
         print(f"[INFO] Successfully upserted {total_upserted} reviews to Pinecone")
         return total_upserted